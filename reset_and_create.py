@@ -1,12 +1,8 @@
+import argparse
 import random
 import sys
-from sqlalchemy import text
 from src.backend.app.database import SessionLocal, engine
-from src.backend.app import models, auth
-
-# --- CONFIGURATION ---
-SUP_PHOTO = "https://cdn-icons-png.flaticon.com/512/206/206853.png"
-OFFICER_PHOTO = "https://cdn-icons-png.flaticon.com/512/727/727399.png"
+from src.backend.app import seeding
 
 # --- FIXED NAMES ---
 NORTH_OFFICERS = [
@@ -30,118 +26,75 @@ def get_random_coords(region):
         long = random.uniform(73.9000, 74.0500)
     return lat, long
 
-def reset_database():
-    """Interactive Switch Case for Reset Mode"""
-    print("\n⚠️  DATABASE RESET MENU ⚠️")
-    print("----------------------------")
-    print("1. [TRUNCATE] Clean Data Only (Fast, NO Redeploy needed)")
-    print("2. [DROP]     Destroy Everything (Hard Reset, MUST Redeploy Backend)")
-    print("----------------------------")
-    
-    choice = input("👉 Select Option (1 or 2): ").strip()
-
-    with engine.connect() as conn:
-        if choice == "1":
-            print("\n🧹 TRUNCATING tables (Keeping structure)...")
-            # Truncate deletes rows but keeps the table alive. 'RESTART IDENTITY' resets IDs to 1.
-            conn.execute(text("TRUNCATE TABLE notification_logs, pings, deployments, users RESTART IDENTITY CASCADE"))
-            conn.commit()
-            print("✅ Tables emptied.")
-            return "truncate"
-
-        elif choice == "2":
-            print("\n🔥 DROPPING all tables (Nuclear Option)...")
-            conn.execute(text("DROP TABLE IF EXISTS notification_logs CASCADE"))
-            conn.execute(text("DROP TABLE IF EXISTS pings CASCADE"))
-            conn.execute(text("DROP TABLE IF EXISTS deployments CASCADE"))
-            conn.execute(text("DROP TABLE IF EXISTS users CASCADE"))
-            conn.commit()
-            print("✅ Tables destroyed.")
-            return "drop"
-        
-        else:
-            print("❌ Invalid selection. Exiting.")
-            sys.exit()
-
-def create_data():
-    # 1. Ask User & Reset DB
-    mode = reset_database()
-    
-    # 2. If DROP mode was used, we must re-create tables
-    if mode == "drop":
+def reset_database(choice=None):
+    """Reset mode from --mode, or the interactive menu when it isn't given"""
+    if choice is None:
+        print("\n⚠️  DATABASE RESET MENU ⚠️")
+        print("----------------------------")
+        print("1. [TRUNCATE] Clean Data Only (Fast, restart the backend afterwards)")
+        print("2. [DROP]     Destroy Everything (Hard Reset, MUST Redeploy Backend)")
+        print("----------------------------")
+        choice = {"1": "truncate", "2": "drop"}.get(input("👉 Select Option (1 or 2): ").strip())
+
+    if choice == "truncate":
+        print("\n🧹 Clearing tables (Keeping structure)...")
+        # Row deletes instead of Postgres-only TRUNCATE ... RESTART IDENTITY, so SQLite works too
+        seeding.clear_tables(engine)
+        print("✅ Tables emptied.")
+        return "truncate"
+
+    elif choice == "drop":
+        print("\n🔥 DROPPING all tables (Nuclear Option)...")
         print("🏗️  Re-creating table structure...")
-        models.Base.metadata.create_all(bind=engine)
-    
-    db = SessionLocal()
+        seeding.recreate_tables(engine)
+        print("✅ Tables rebuilt.")
+        return "drop"
 
-    # 3. Create Supervisors
-    print("👮 Creating Supervisors...")
-    head = models.User(username="head", hashed_password=auth.get_password_hash("admin"), role="head_officer", profile_photo=SUP_PHOTO)
-    sup_n = models.User(username="sup_north", hashed_password=auth.get_password_hash("sup1"), role="supervisor", profile_photo=SUP_PHOTO)
-    sup_s = models.User(username="sup_south", hashed_password=auth.get_password_hash("sup2"), role="supervisor", profile_photo=SUP_PHOTO)
-    
-    db.add_all([head, sup_n, sup_s])
-    db.commit()
-
-    # 4. Create Officers with Smart Status Logic
-    print("🚓 Creating Officers with Synced Status...")
-    
-    roster = [(name, "north", sup_n) for name in NORTH_OFFICERS] + \
-             [(name, "south", sup_s) for name in SOUTH_OFFICERS]
-
-    for name, region, supervisor in roster:
-        status_type = random.choice(STATUS_OPTIONS)
+    else:
+        print("❌ Invalid selection. Exiting.")
+        sys.exit()
+
+def build_roster():
+    """Supervisors plus the fixed officer names with a random status each"""
+    roster = [
+        {"username": "head", "password": "admin", "role": "head_officer"},
+        {"username": "sup_north", "password": "sup1", "role": "supervisor"},
+        {"username": "sup_south", "password": "sup2", "role": "supervisor"},
+    ]
+    for name, region in [(n, "north") for n in NORTH_OFFICERS] + [(n, "south") for n in SOUTH_OFFICERS]:
+        status = random.choice(STATUS_OPTIONS)
         lat, long = get_random_coords(region)
-        
-        on_leave = (status_type == "on_leave")
-        req_leave = (status_type == "req_leave")
-        
-        if on_leave:
-            lat, long = None, None
+        roster.append({"username": name, "password": "pass", "supervisor": f"sup_{region}", "status": status, "lat": lat, "long": long})
+    return roster
 
-        user = models.User(
-            username=name,
-            hashed_password=auth.get_password_hash("pass"),
-            role="field_officer",
-            supervisor_id=supervisor.id,
-            last_known_lat=lat,
-            last_known_long=long,
-            is_on_leave=on_leave,
-            leave_requested=req_leave,
-            profile_photo=OFFICER_PHOTO
-        )
-        db.add(user)
-        db.flush()
+def create_data(mode=None):
+    # 1. Reset DB
+    mode = reset_database(mode)
 
-        if status_type in ["safe", "risk"] and not on_leave:
-            target_lat, target_long = lat, long
-            if status_type == "risk":
-                target_lat = lat + 0.02 # Force mismatch
-
-            deploy = models.Deployment(
-                officer_id=user.id,
-                target_lat=target_lat, target_long=target_long, radius_meters=500.0,
-                current_lat=lat, current_long=long,
-                status="deployed" if status_type == "safe" else "out_of_bounds",
-                is_active=True
-            )
-            db.add(deploy)
-            print(f"   -> {name}: {status_type.upper()} (Synced)")
-        else:
-            print(f"   -> {name}: {status_type.upper()}")
+    # 2. Bulk insert: one hash per distinct sample password, one executemany per table
+    print("👮 Creating Supervisors and Officers...")
+    roster = build_roster()
+    db = SessionLocal()
+    try:
+        seeding.seed_roster(db, roster, share_hashes=True)
+    finally:
+        db.close()
+    for row in roster[3:]:
+        print(f"   -> {row['username']}: {row['status'].upper()}")
 
-    db.commit()
     print("\n✅ SUCCESS: Data Refreshed!")
     if mode == "drop":
         print("⚠️  REMINDER: You used DROP mode. You MUST redeploy your backend on Render now!")
     else:
-        print("🚀 TRUNCATE mode used. No redeploy needed. Refresh your dashboard!")
+        # The backend keeps cached responses and in-memory indexes that only a restart reloads
+        print("🚀 TRUNCATE mode used. Restart the backend before using the dashboard again!")
 
     print("🔗 Login Credentials:")
     print("   - Head Officer: username='head', password='admin'")
     print("   - Supervisors:  username='sup_north', password='sup1' | username='sup_south', password='sup2'")
     print("   - Field Officers: username='<Officer_Name>', password='pass' (e.g., 'Amit_Verma')")    
-    db.close()
 
 if __name__ == "__main__":
-    create_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Reset the database and load the sample roster.")
+    parser.add_argument("--mode", choices=["truncate", "drop"], help="skip the menu (for scripts and CI)")
+    create_data(parser.parse_args().mode)
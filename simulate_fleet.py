@@ -0,0 +1,273 @@
+"""
+Synthetic fleet load test.
+
+Seeds a fleet of officers, supervisors and deployments across the North/South
+Goa jurisdictions in bulk, then drives concurrent traffic against the API and
+reports throughput and latency percentiles per endpoint.
+
+    python simulate_fleet.py --officers 5000 --duration 60 --concurrency 200 --reset
+
+Without --url a uvicorn server is started on --port against --database-url and
+stopped afterwards. With --url the traffic goes to an already running server,
+which must share the database (for the seeded users) and JWT_SECRET (tokens are
+minted locally instead of paying argon2 for thousands of logins).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+DEFAULT_DATABASE_URL = "sqlite:///./fleet_sim.db"
+
+# Traffic mix per virtual user: (weight, action)
+OFFICER_MIX = [(70, "checkin"), (10, "pings"), (8, "me"), (1, "broadcast")]
+SUPERVISOR_MIX = [(60, "status"), (25, "logs"), (10, "leave"), (5, "leave_review")]
+SUPERVISOR_SHARE = 0.1  # fraction of workers acting as command staff
+
+GPS_STEP_DEG = 0.0004   # ~45 m random-walk step per check-in
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("--officers", type=int, default=1000)
+    p.add_argument("--supervisors", type=int, default=1, help="supervisors per jurisdiction")
+    p.add_argument("--deployed", type=float, default=0.6, help="fraction of officers with an active deployment")
+    p.add_argument("--duration", type=float, default=30, help="seconds of traffic")
+    p.add_argument("--concurrency", type=int, default=50, help="concurrent virtual users")
+    p.add_argument("--think", type=float, default=0.0, help="mean pause between a virtual user's requests, seconds")
+    p.add_argument("--database-url", default=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    p.add_argument("--url", help="drive an already running server instead of starting one")
+    p.add_argument("--port", type=int, default=8077)
+    p.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    p.add_argument("--seed-only", action="store_true")
+    p.add_argument("--no-seed", action="store_true", help="reuse the fleet already in the database")
+    p.add_argument("--json", help="also write the report to this file")
+    p.add_argument("--random-seed", type=int, default=7)
+    return p.parse_args()
+
+
+# --- SEEDING ---
+
+def seed_fleet(args):
+    from src.backend.app import database, migrations, models, seeding
+    from reset_and_create import STATUS_OPTIONS, get_random_coords
+
+    if args.reset:
+        seeding.recreate_tables(database.engine)
+    else:
+        migrations.upgrade(database.engine)
+    db = database.SessionLocal()
+    try:
+        if db.query(models.User.id).first():
+            sys.exit("Database already has users; pass --reset to replace them or --no-seed to reuse them.")
+        started = time.perf_counter()
+        roster = [{"username": "head", "password": "admin", "role": "head_officer"}]
+        supervisors = {}
+        for region, pw in (("north", "sup1"), ("south", "sup2")):
+            supervisors[region] = [f"sup_{region}" if i == 0 else f"sup_{region}_{i + 1}" for i in range(args.supervisors)]
+            roster += [{"username": name, "password": pw, "role": "supervisor"} for name in supervisors[region]]
+        for n in range(args.officers):
+            region = "north" if n % 2 == 0 else "south"
+            status = random.choice(STATUS_OPTIONS)
+            if status in ("safe", "risk") and random.random() > args.deployed:
+                status = "free"
+            lat, long = get_random_coords(region)
+            roster.append({"username": f"unit_{region[0]}{n:06d}", "password": "pass", "supervisor": supervisors[region][n // 2 % args.supervisors],
+                           "status": status, "lat": lat, "long": long})
+        result = seeding.seed_roster(db, roster, share_hashes=True)
+        print(f"Seeded {result['users']} users and {result['deployments']} deployments in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+def load_fleet():
+    """Every user with a locally minted token; officers carry their last known fix for the random walk."""
+    from src.backend.app import auth, database, models
+    db = database.SessionLocal()
+    try:
+        users = db.query(models.User.id, models.User.username, models.User.role, models.User.last_known_lat, models.User.last_known_long).all()
+    finally:
+        db.close()
+    fleet = {"officers": [], "command": []}
+    for uid, name, role, lat, long in users:
+        entry = {"id": uid, "username": name, "token": auth.create_access_token({"sub": name, "role": role}), "lat": lat, "long": long}
+        fleet["officers" if role == "field_officer" else "command"].append(entry)
+    return fleet
+
+
+# --- SERVER ---
+
+def start_server(args):
+    env = dict(os.environ, DATABASE_URL=args.database_url)
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "src.backend.app.main:app", "--port", str(args.port), "--log-level", "warning"], env=env)
+    return proc, f"http://127.0.0.1:{args.port}"
+
+
+async def wait_ready(client, proc=None, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            sys.exit("Server exited during startup.")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    sys.exit("Server did not become ready in time.")
+
+
+# --- TRAFFIC ---
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # endpoint -> latencies (s)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client, label, method, path, token, **kw):
+        headers = {"Authorization": f"Bearer {token}", **kw.pop("headers", {})}
+        t = time.perf_counter()
+        try:
+            r = await client.request(method, path, headers=headers, **kw)
+        except Exception:
+            self.errors[label] += 1
+            self.statuses[label]["exc"] += 1
+            return None
+        self.samples[label].append(time.perf_counter() - t)
+        self.statuses[label][r.status_code] += 1
+        if r.status_code >= 500:
+            self.errors[label] += 1
+        return r
+
+    def report(self, elapsed):
+        rows = []
+        for label in sorted(self.samples, key=lambda k: -len(self.samples[k])):
+            lat = sorted(self.samples[label])
+            pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000
+            rows.append({"endpoint": label, "requests": len(lat), "rps": len(lat) / elapsed, "errors": self.errors[label],
+                         "p50_ms": pct(0.50), "p90_ms": pct(0.90), "p99_ms": pct(0.99), "max_ms": lat[-1] * 1000,
+                         "statuses": {str(k): v for k, v in self.statuses[label].items()}})
+        return rows
+
+
+def pick(mix):
+    return random.choices([a for _, a in mix], weights=[w for w, _ in mix])[0]
+
+
+async def officer_user(client, rec, officers, stop, think):
+    while not stop.is_set():
+        o = random.choice(officers)
+        action = pick(OFFICER_MIX)
+        if action == "checkin" and o["lat"] is not None:
+            o["lat"] += random.gauss(0, GPS_STEP_DEG)
+            o["long"] += random.gauss(0, GPS_STEP_DEG)
+            await rec.call(client, "POST /checkin", "POST", "/checkin", o["token"], json={"latitude": o["lat"], "longitude": o["long"]})
+        elif action == "pings":
+            await rec.call(client, "GET /pings/active", "GET", "/pings/active", o["token"])
+        elif action == "me":
+            await rec.call(client, "GET /officer/me", "GET", "/officer/me", o["token"])
+        elif action == "broadcast" and o["lat"] is not None:
+            await rec.call(client, "POST /ping/broadcast", "POST", "/ping/broadcast", o["token"], json={"message": "Backup requested"})
+        if think:
+            await asyncio.sleep(random.expovariate(1 / think))
+        else:
+            await asyncio.sleep(0)
+
+
+async def command_user(client, rec, staff, stop, think):
+    roster, etags = {}, {}  # per staff member: last /status/all body and ETag, like the dashboard
+    while not stop.is_set():
+        s = random.choice(staff)
+        action = pick(SUPERVISOR_MIX)
+        if action == "status":
+            headers = {"If-None-Match": etags[s["id"]]} if s["id"] in etags else {}
+            r = await rec.call(client, "GET /status/all", "GET", "/status/all", s["token"], headers=headers)
+            if r is not None and r.status_code == 200:
+                roster[s["id"]], etags[s["id"]] = r.json(), r.headers.get("etag")
+        elif action == "logs":
+            await rec.call(client, "GET /logs", "GET", "/logs", s["token"], params={"limit": 20})
+        elif roster.get(s["id"]):
+            units = roster[s["id"]]
+            if action == "leave_review":
+                pending = [u for u in units if u["leave_requested"]]
+                if pending:
+                    u = random.choice(pending)
+                    verb = random.choice(["approve", "deny"])
+                    await rec.call(client, f"POST /leave/{verb}/{{oid}}", "POST", f"/leave/{verb}/{u['id']}", s["token"])
+                    u["leave_requested"] = False
+            else:
+                # Grant leave to an available unit, or recall someone already on leave
+                u = random.choice(units)
+                verb = "revoke" if u["status_color"] == "blue" else "grant"
+                await rec.call(client, f"POST /leave/{verb}/{{oid}}", "POST", f"/leave/{verb}/{u['id']}", s["token"])
+                u["status_color"] = "yellow" if verb == "revoke" else "blue"
+        if think:
+            await asyncio.sleep(random.expovariate(1 / think))
+        else:
+            await asyncio.sleep(0)
+
+
+async def drive(args, base_url, proc=None):
+    import httpx
+    fleet = load_fleet()
+    if not fleet["officers"] or not fleet["command"]:
+        sys.exit("No fleet to drive; seed one first.")
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_ready(client, proc)
+        rec, stop = Recorder(), asyncio.Event()
+        n_command = max(1, round(args.concurrency * SUPERVISOR_SHARE))
+        tasks = [asyncio.create_task(command_user(client, rec, fleet["command"], stop, args.think)) for _ in range(n_command)]
+        tasks += [asyncio.create_task(officer_user(client, rec, fleet["officers"], stop, args.think)) for _ in range(args.concurrency - n_command)]
+        print(f"Driving {len(fleet['officers'])} officers / {len(fleet['command'])} staff with {len(tasks)} virtual users for {args.duration:.0f}s against {base_url}")
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        return rec.report(time.perf_counter() - started), time.perf_counter() - started
+
+
+def print_report(rows, elapsed):
+    total = sum(r["requests"] for r in rows)
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.0f} req/s)")
+    print(f"{'endpoint':32} {'reqs':>8} {'rps':>8} {'err':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in rows:
+        print(f"{r['endpoint']:32} {r['requests']:8d} {r['rps']:8.1f} {r['errors']:5d} {r['p50_ms']:8.1f} {r['p90_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}")
+
+
+def main():
+    args = parse_args()
+    random.seed(args.random_seed)
+    # Must be set before the app modules are imported; they bind the engine at import
+    os.environ["DATABASE_URL"] = args.database_url
+    if not args.no_seed:
+        seed_fleet(args)
+    if args.seed_only:
+        return
+
+    proc = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        proc, base_url = start_server(args)
+    try:
+        rows, elapsed = asyncio.run(drive(args, base_url, proc))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    print_report(rows, elapsed)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"args": vars(args), "elapsed_s": elapsed, "endpoints": rows}, fh, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,92 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import contextvars
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from . import database, models
+from .services.metrics_service import REGISTRY
+from .services.request_metrics import timed
 import os
 
 SECRET_KEY = os.getenv("JWT_SECRET", "secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE = int(os.getenv("AUTH_HASH_QUEUE", "64"))
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+@timed("argon2")
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+@timed("argon2")
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class HashPoolBusy(Exception):
+    """Raised when the password hashing queue is full; callers should answer 503."""
+
+
+class PasswordHashPool:
+    """
+    Dedicated, size-limited pool for argon2 work.
+
+    At most `workers` hashes run at once and `queue` more may wait; beyond
+    that submissions are rejected immediately instead of piling up, so a login
+    storm can't take over the request threadpool. argon2-cffi releases the GIL
+    while hashing, so plain threads get real parallelism here.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue=HASH_QUEUE):
+        self.capacity = workers + queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = REGISTRY.counter("auth_hash_rejected_total", "Password hash jobs refused because the queue was full")
+        self.wait_seconds = REGISTRY.histogram("auth_hash_seconds", "Queue wait plus argon2 time per password hash job")
+        REGISTRY.gauge("auth_hash_in_flight", "Password hash jobs running or queued", lambda: self._in_flight)
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected.inc()
+                raise HashPoolBusy()
+            self._in_flight += 1
+        started = time.perf_counter()
+
+        def done(_):
+            with self._lock:
+                self._in_flight -= 1
+            self.wait_seconds.observe(time.perf_counter() - started)
+
+        # Run in the caller's context so the hash is charged to the request that asked for it
+        future = self._executor.submit(contextvars.copy_context().run, fn, *args)
+        future.add_done_callback(done)
+        return asyncio.wrap_future(future)
+
+    async def verify(self, plain_password, hashed_password):
+        return await self._submit(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password):
+        return await self._submit(get_password_hash, password)
+
+
+hash_pool = PasswordHashPool()
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -28,12 +94,130 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+class PrincipalCache:
+    """
+    Bounded TTL/LRU cache of authenticated user rows, keyed by token subject.
+
+    Entries are column snapshots, not live ORM objects, so each request gets
+    its own instance attached to its own session and can mutate it safely.
+    Writers must invalidate (or patch) entries when a user row changes; ORM
+    flushes of User objects are caught automatically below and applied on commit.
+    """
+
+    def __init__(self, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._entries = OrderedDict()  # username -> (expires_at, snapshot)
+        self._names = {}               # user id -> username
+        self._generation = {}          # username -> bumped on every invalidation
+        self._lock = threading.Lock()
+        self.hits = REGISTRY.counter("auth_principal_cache_hits_total", "Principal lookups served from cache")
+        self.misses = REGISTRY.counter("auth_principal_cache_misses_total", "Principal lookups that hit the database")
+        REGISTRY.gauge("auth_principal_cache_hit_ratio", "Share of principal lookups served from cache", self.hit_ratio)
+        REGISTRY.gauge("auth_principal_cache_entries", "Cached principals", lambda: len(self._entries))
+
+    def hit_ratio(self):
+        total = self.hits.value() + self.misses.value()
+        return self.hits.value() / total if total else 0.0
+
+    def lookup(self, username):
+        """Return (snapshot or None, generation); pass the generation back to store()."""
+        with self._lock:
+            gen = self._generation.get(username, 0)
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(username)
+                self.hits.inc()
+                return entry[1], gen
+            if entry is not None:
+                self._drop(username)
+        self.misses.inc()
+        return None, gen
+
+    def store(self, user, generation):
+        snapshot = {c.key: getattr(user, c.key) for c in models.User.__mapper__.column_attrs}
+        with self._lock:
+            # An invalidation raced with our database read: don't cache what may be stale
+            if self._generation.get(user.username, 0) != generation:
+                return
+            self._entries[user.username] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(user.username)
+            self._names[user.id] = user.username
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def patch(self, user_id, **fields):
+        """Update cached columns in place, e.g. positions written by the location flusher."""
+        with self._lock:
+            entry = self._entries.get(self._names.get(user_id))
+            if entry is not None:
+                entry[1].update(fields)
+
+    def invalidate(self, username=None, user_id=None):
+        with self._lock:
+            username = username or self._names.get(user_id)
+            if username is None:
+                return
+            self._generation[username] = self._generation.get(username, 0) + 1
+            self._drop(username)
+
+    def _drop(self, username):
+        entry = self._entries.pop(username, None)
+        if entry is not None:
+            self._names.pop(entry[1]["id"], None)
+
+    def clear(self):
+        with self._lock:
+            for username in list(self._entries):
+                self._generation[username] = self._generation.get(username, 0) + 1
+            self._entries.clear()
+            self._names.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+_PENDING_INVALIDATIONS = "principal_cache_pending"
+
+def invalidate_on_commit(session: Session, user_id):
+    """
+    Drop the user's cached principal once `session` commits. Invalidating any
+    earlier lets a concurrent request re-cache the old committed row under
+    the new generation.
+    """
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(user_id)
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_users(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, models.User):
+            invalidate_on_commit(session, obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        principal_cache.invalidate(user_id=user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop(_PENDING_INVALIDATIONS, None)
+
+
+def _attach(db: Session, snapshot):
+    user = db.identity_map.get(db.identity_key(models.User, snapshot["id"]))
+    if user is not None:
+        return user
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)  # persistent-without-SELECT once added
+    db.add(user)
+    return user
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -41,8 +225,30 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
+    return username
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    username = token_subject(token)
+    snapshot, generation = principal_cache.lookup(username)
+    if snapshot is not None:
+        return _attach(db, snapshot)
     user = db.query(models.User).filter(models.User.username == username).first()
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    principal_cache.store(user, generation)
+    return user
+
+def _find_user(db: Session, username):
+    return db.query(models.User).filter(models.User.username == username).first()
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db=Depends(database.get_hot_db)):
+    """get_current_user for async endpoints: the user comes back bound to the request's (async or sync) session."""
+    username = token_subject(token)
+    snapshot, generation = principal_cache.lookup(username)
+    if snapshot is not None:
+        return _attach(db.sync_session if isinstance(db, AsyncSession) else db, snapshot)
+    user = await database.run_db(db, _find_user, username)
+    if user is None:
+        raise credentials_exception
+    principal_cache.store(user, generation)
+    return user
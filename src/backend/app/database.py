@@ -1,20 +1,125 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from .services.metrics_service import REGISTRY
 
 # Load env vars
 load_dotenv(dotenv_path="config/.env")
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./police_geofencing.db")
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+# Pool profile (Postgres; file-backed SQLite uses the same pool)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# SQLite connect-time pragmas: WAL lets readers run alongside the single writer,
+# and writers wait out the lock instead of failing with "database is locked"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
 # Handle SQLite specific thread check
-connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if IS_SQLITE else {}
+
+POOL_WAIT = REGISTRY.histogram("db_pool_checkout_seconds", "Time spent waiting for a pooled connection")
+POOL_TIMEOUTS = REGISTRY.counter("db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT")
+
+
+class _TimedCheckout:
+    """Records how long each checkout waits on the pool, labelled by engine."""
+    label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(engine=self.label)
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, engine=self.label)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    label = "async"
+
+
+def engine_options(poolclass):
+    if IS_SQLITE and make_url(DATABASE_URL).database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite keeps SQLAlchemy's single-connection pool
+    return {
+        "poolclass": poolclass, "pool_size": POOL_SIZE, "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT, "pool_recycle": POOL_RECYCLE, "pool_pre_ping": POOL_PRE_PING and not IS_SQLITE,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **engine_options(TimedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async path for the hot endpoints: same database through its asyncio driver.
+# Off by default on SQLite, where every query still funnels through one file
+# and aiosqlite's per-connection thread hop costs more than it saves
+# (tests/bench_concurrency.py, 1k clients: /officer/me 102 -> 83 req/s,
+# /pings/active 77 -> 64, /status/all 28 -> 26 on the async engine).
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+DB_ASYNC = os.getenv("DB_ASYNC", "0" if IS_SQLITE else "1") == "1"
+
+def async_database_url(url):
+    """The async-driver form of a sync URL, or None when no asyncio driver is known for its backend."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}") if driver else None
+
+if DB_ASYNC and not ASYNC_DATABASE_URL:
+    ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+    if ASYNC_DATABASE_URL is None:
+        if os.getenv("DB_ASYNC") == "1":
+            raise RuntimeError(f"DB_ASYNC=1 but no asyncio driver is known for {make_url(DATABASE_URL).get_backend_name()!r}; set ASYNC_DATABASE_URL or DB_ASYNC=0.")
+        DB_ASYNC = False  # unknown backend: everything stays on the sync engine
+
+async_engine, AsyncSessionLocal = None, None
+if DB_ASYNC:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args, **engine_options(TimedAsyncQueuePool))
+    # expire_on_commit=False: attributes can't be lazily reloaded outside an await
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Engines the hot endpoints may run on (for instrumentation and shutdown)
+engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+
+if IS_SQLITE:
+    for e in engines:
+        event.listen(e, "connect", apply_sqlite_pragmas)
+
+REGISTRY.gauge("db_pool_checked_out", "Connections currently checked out of the sync pool", lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+REGISTRY.gauge("db_async_pool_checked_out", "Connections currently checked out of the async pool", lambda: async_engine.pool.checkedout() if async_engine is not None and hasattr(async_engine.pool, "checkedout") else 0)
+
 Base = declarative_base()
 
 def get_db():
@@ -22,4 +127,36 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# A sync session used from an async endpoint keeps its pooled connection across
+# awaits, so admit only as many as the pool can hand out; the rest queue here
+# instead of timing out in the pool
+SYNC_HOT_SESSIONS = asyncio.Semaphore(POOL_SIZE + POOL_MAX_OVERFLOW)
+
+async def get_sync_hot_db():
+    async with SYNC_HOT_SESSIONS:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+# Session dependency of the hot async endpoints; use run_db/commit_db so they work with either kind
+get_hot_db = get_async_db if DB_ASYNC else get_sync_hot_db
+
+async def run_db(db, fn, *args):
+    """fn(sync_session, *args) off the event loop: greenlet-bridged for an AsyncSession, else in the threadpool."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+async def commit_db(db):
+    if isinstance(db, AsyncSession):
+        await db.commit()
+    else:
+        await run_in_threadpool(db.commit)
@@ -1,103 +1,133 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy import desc, or_
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import func, insert, select, union_all
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
-import math
+import asyncio
+import json
 
 # --- FIX: Import models correctly ---
-from . import models, auth, database
-from .services import geofencing_service
-
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
-
-SUP_PHOTO = "https://cdn-icons-png.flaticon.com/512/206/206853.png"
-OFFICER_PHOTO = "https://cdn-icons-png.flaticon.com/512/727/727399.png"
+from . import models, auth, database, migrations, seeding
+from .services import geofencing_service, checkin_service
+from .services.position_index import officer_index
+from .services.location_buffer import location_buffer
+from .services.retention_service import retention_worker
+from .services.event_service import event_bus
+from .services.geofence_state import geofence_engine, stage_transition_logs, publish_transition_events
+from .services import zone_service, pagination, track_service, cluster_service
+from .services.zone_service import zone_index
+from .services.cluster_service import cluster_cache
+from .services.response_cache import response_cache, ROSTER_ALL, GLOBAL_LOGS, roster_topic, log_topic
+from .services.dispatch_service import dispatch_index
+from .services import dispatch_service
+from .services.metrics_service import REGISTRY
+from .services import request_metrics
+
+# Create tables / add new columns to an existing database
+migrations.upgrade(database.engine)
+
+# Every published change invalidates the cached GET responses it is visible in
+event_bus.add_listener(response_cache.on_event)
+# ...and keeps the free-unit dispatch index current
+event_bus.add_listener(dispatch_index.on_event)
+
+# README demo users, seeded into an empty database
+DEFAULT_ROSTER = [
+    {"username": "head", "password": "admin", "role": "head_officer"},
+    {"username": "sup_north", "password": "sup1", "role": "supervisor"},
+    {"username": "sup_south", "password": "sup2", "role": "supervisor"},
+    {"username": "Amit_Verma", "password": "123", "supervisor": "sup_north", "status": "safe", "lat": 15.5300, "long": 73.8000},
+    {"username": "Vikram_Rao", "password": "123", "supervisor": "sup_north", "status": "risk", "lat": 15.5600, "long": 73.8250},
+    {"username": "Arjun_Reddy", "password": "123", "supervisor": "sup_south", "status": "free", "lat": 15.3000, "long": 73.9800},
+    {"username": "MS_Dhoni", "password": "123", "supervisor": "sup_south", "status": "on_leave"},
+]
+
+# Default jurisdictions (same outlines the dashboard draws), owned by the demo supervisors
+JURISDICTIONS = {
+    "NORTH": ("sup_north", [[15.8, 73.6], [15.8, 74.2], [15.44, 74.2], [15.44, 73.6]]),
+    "SOUTH": ("sup_south", [[15.44, 73.6], [15.44, 74.2], [14.9, 74.2], [14.9, 73.6]]),
+}
 
 app = FastAPI(title="Police Geofencing API")
 
+# Per-route latency, SQL statement counts and db/argon2/haversine time on /metrics
+app.add_middleware(request_metrics.RequestMetricsMiddleware)
+for engine in database.engines: request_metrics.instrument_engine(engine)
+
 
 def seed_default_accounts():
     db = database.SessionLocal()
     try:
         if db.query(models.User).first():
             return
+        seeding.seed_roster(db, DEFAULT_ROSTER, share_hashes=True)
+        print("Seeded default login accounts for the README demo users.")
+    finally:
+        db.close()
+
+
+def load_position_index():
+    db = database.SessionLocal()
+    try:
+        rows = db.query(models.User.id, models.User.last_known_lat, models.User.last_known_long).filter(
+            models.User.role == "field_officer", models.User.last_known_lat != None
+        ).all()
+        officer_index.rebuild(rows)
+    finally:
+        db.close()
+
+
+def load_dispatch_index():
+    db = database.SessionLocal()
+    try:
+        active = db.query(models.Deployment.officer_id).filter(models.Deployment.is_active == True)
+        rows = db.query(
+            models.User.id, models.User.supervisor_id, models.User.last_known_lat, models.User.last_known_long,
+            (models.User.is_on_leave == False) & (models.User.leave_requested == False) & models.User.id.not_in(active),
+        ).filter(models.User.role == "field_officer").all()
+        dispatch_index.rebuild(rows)
+    finally:
+        db.close()
+
+
+def load_geofence_state():
+    db = database.SessionLocal()
+    try:
+        rows = db.query(
+            models.Deployment.id, models.Deployment.officer_id, models.User.supervisor_id,
+            models.Deployment.target_lat, models.Deployment.target_long, models.Deployment.radius_meters,
+            models.User.last_known_lat, models.User.last_known_long, models.Zone.polygon,
+        ).join(models.User, models.User.id == models.Deployment.officer_id).outerjoin(
+            models.Zone, models.Zone.id == models.Deployment.zone_id
+        ).filter(models.Deployment.is_active == True).order_by(models.Deployment.id).all()
+        geofence_engine.load([(*r[:8], json.loads(r[8]) if r[8] else None) for r in rows])
+    finally:
+        db.close()
 
-        head = models.User(
-            username="head",
-            hashed_password=auth.get_password_hash("admin"),
-            role="head_officer",
-            profile_photo=SUP_PHOTO,
-        )
-        sup_n = models.User(
-            username="sup_north",
-            hashed_password=auth.get_password_hash("sup1"),
-            role="supervisor",
-            profile_photo=SUP_PHOTO,
-        )
-        sup_s = models.User(
-            username="sup_south",
-            hashed_password=auth.get_password_hash("sup2"),
-            role="supervisor",
-            profile_photo=SUP_PHOTO,
-        )
-
-        db.add_all([head, sup_n, sup_s])
-        db.flush()
-
-        roster = [
-            ("Amit_Verma", sup_n, "safe", 15.5300, 73.8000),
-            ("Vikram_Rao", sup_n, "risk", 15.5600, 73.8250),
-            ("Arjun_Reddy", sup_s, "free", 15.3000, 73.9800),
-            ("MS_Dhoni", sup_s, "on_leave", None, None),
-        ]
-
-        for username, supervisor, status, lat, long in roster:
-            user = models.User(
-                username=username,
-                hashed_password=auth.get_password_hash("123"),
-                role="field_officer",
-                supervisor_id=supervisor.id,
-                last_known_lat=lat,
-                last_known_long=long,
-                is_on_leave=(status == "on_leave"),
-                leave_requested=False,
-                profile_photo=OFFICER_PHOTO,
-            )
-            db.add(user)
-            db.flush()
-
-            if status == "safe":
-                db.add(
-                    models.Deployment(
-                        officer_id=user.id,
-                        target_lat=lat,
-                        target_long=long,
-                        radius_meters=500.0,
-                        current_lat=lat,
-                        current_long=long,
-                        status="deployed",
-                        is_active=True,
-                    )
-                )
-            elif status == "risk":
-                db.add(
-                    models.Deployment(
-                        officer_id=user.id,
-                        target_lat=lat + 0.02,
-                        target_long=long,
-                        radius_meters=500.0,
-                        current_lat=lat,
-                        current_long=long,
-                        status="out_of_bounds",
-                        is_active=True,
-                    )
-                )
 
+def seed_jurisdictions():
+    db = database.SessionLocal()
+    try:
+        if db.query(models.Zone).filter(models.Zone.kind == "jurisdiction").first():
+            return
+        for name, (owner, polygon) in JURISDICTIONS.items():
+            sup = db.query(models.User).filter(models.User.username == owner).first()
+            db.add(new_zone(name, "jurisdiction", polygon, sup.id if sup else None))
         db.commit()
-        print("Seeded default login accounts for the README demo users.")
+    finally:
+        db.close()
+
+
+def load_zone_index():
+    db = database.SessionLocal()
+    try:
+        # Deployment polygons left behind by deployments ended before they were cleaned up
+        retire_zones(db, {z for (z,) in db.query(models.Zone.id).filter(models.Zone.kind == "deployment")}); db.commit()
+        zone_index.rebuild(db.query(models.Zone).all())
     finally:
         db.close()
 
@@ -105,34 +135,148 @@ def seed_default_accounts():
 @app.on_event("startup")
 def on_startup():
     seed_default_accounts()
+    seed_jurisdictions()
+    load_zone_index()
+    load_position_index()
+    load_dispatch_index()
+    load_geofence_state()
+    location_buffer.start(database.SessionLocal)
+    retention_worker.start(database.SessionLocal)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await run_in_threadpool(retention_worker.stop)
+    await run_in_threadpool(location_buffer.stop)
+    if database.async_engine is not None: await database.async_engine.dispose()
 
 # --- INTERNAL HELPERS ---
-def calculate_distance(lat1, lon1, lat2, lon2):
-    if not lat1 or not lon1 or not lat2 or not lon2: return 999999
-    R = 6371000 # meters
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlam = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlam/2)**2
-    c = 2*math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R*c
+def current_position(o: models.User):
+    """Newest known position: a buffered check-in wins over the persisted row."""
+    return location_buffer.position(o.id, (o.last_known_lat, o.last_known_long))
 
 def log_event(db: Session, level: str, message: str, user_id: int = None):
-    db.add(models.NotificationLog(level=level, message=message, user_id=user_id))
-    db.commit()
+    events = stage_logs(db, level, message, [user_id]); db.commit()
+    publish_logs(events)
+
+def stage_logs(db: Session, level: str, message: str, user_ids):
+    """One log row per user in a single executemany (caller commits); returns the events to publish afterwards."""
+    now = datetime.utcnow()
+    rows = [{"level": level, "message": message, "user_id": uid, "timestamp": now} for uid in user_ids]
+    if not rows: return []
+    created = db.execute(insert(models.NotificationLog).returning(models.NotificationLog.id, models.NotificationLog.user_id), rows).all()
+    return [(uid, {"id": i, "timestamp": now, "level": level, "message": message}) for i, uid in created]
+
+def publish_logs(events):
+    for user_id, data in events: event_bus.publish("log", data, officer_id=user_id)
+
+def publish_officers(db: Session, officer_ids):
+    """Push the recomputed roster rows of officers touched by a write to stream subscribers."""
+    for o, row in build_roster(db, [models.User.id.in_(list(officer_ids))]):
+        event_bus.publish("officer", row.model_dump(), officer_id=o.id, supervisor_id=o.supervisor_id)
+
+def new_zone(name: str, kind: str, polygon, supervisor_id: int = None):
+    min_lat, min_long, max_lat, max_long = zone_service.bounding_box(polygon)
+    return models.Zone(name=name, kind=kind, polygon=json.dumps([list(p) for p in polygon]), supervisor_id=supervisor_id,
+                       min_lat=min_lat, min_long=min_long, max_lat=max_lat, max_long=max_long)
+
+def index_zone(zone: models.Zone):
+    zone_index.add(zone_service.IndexedZone(zone.id, zone.name, zone.kind, [tuple(p) for p in json.loads(zone.polygon)], zone.supervisor_id))
+
+def end_deployments(db: Session, officer_ids):
+    """Deactivate the officers' active deployments (caller commits, then calls forget_deployments); returns the retired zone ids."""
+    D = models.Deployment
+    zone_ids = {z for (z,) in db.query(D.zone_id).filter(D.officer_id.in_(officer_ids), D.is_active == True, D.zone_id != None)}
+    db.query(D).filter(D.officer_id.in_(officer_ids), D.is_active == True).update({"is_active": False}, synchronize_session=False)
+    return retire_zones(db, zone_ids)
+
+def retire_zones(db: Session, zone_ids):
+    """Delete deployment polygons that no active deployment uses any more (caller commits, then unindexes); returns their ids."""
+    D, Z = models.Deployment, models.Zone
+    if not zone_ids: return []
+    in_use = db.query(D.zone_id).filter(D.zone_id.in_(zone_ids), D.is_active == True)
+    retired = [z for (z,) in db.query(Z.id).filter(Z.id.in_(zone_ids), Z.kind == "deployment", Z.id.not_in(in_use))]
+    if not retired: return []
+    db.query(D).filter(D.zone_id.in_(retired)).update({"zone_id": None}, synchronize_session=False)
+    db.query(Z).filter(Z.id.in_(retired)).delete(synchronize_session=False)
+    return retired
+
+def forget_deployments(officer_ids, zone_ids=()):
+    """After the commit that ended them: drop the deployments' geofence state and unindex their retired polygons."""
+    for oid in officer_ids: geofence_engine.drop(oid)
+    for zid in zone_ids: zone_index.remove(zid)
+
+def in_jurisdiction(u: models.User, lat: float, long: float):
+    """Head officers are global; supervisors are bound to their jurisdiction zones, if they have any."""
+    if u.role != "supervisor": return True
+    if any(z.supervisor_id == u.id for z in zone_index.containing(lat, long, "jurisdiction")): return True
+    return not any(z.supervisor_id == u.id for z in zone_index.zones("jurisdiction"))
+
+def ping_payload(ping: models.Ping, sender: str):
+    """Capture a flushed ping as a stream event before commit expires its attributes."""
+    return ping.receiver_id, {"id": ping.id, "sender": sender, "message": ping.message, "lat": ping.lat, "long": ping.long, "timestamp": ping.timestamp}
+
+def publish_pings(payloads):
+    for receiver_id, data in payloads: event_bus.publish("ping", data, receiver_id=receiver_id)
+
+def find_login(username: str):
+    """Short-lived session: a login must not hold a pooled connection while it waits for argon2."""
+    db = database.SessionLocal()
+    try: return db.query(models.User).filter(models.User.username == username).first()
+    finally: db.close()
+
+def page_cursors(before: Optional[str], since: Optional[str]):
+    try: return tuple(pagination.decode_cursor(c) if c else None for c in (before, since))
+    except ValueError: raise HTTPException(400, "Invalid cursor.")
+
+def log_row(log: models.NotificationLog):
+    return {"id": log.id, "timestamp": log.timestamp, "level": log.level, "message": log.message, "cursor": pagination.encode_cursor(log.timestamp, log.id)}
+
+def log_timeline(db: Session, user_id: int, limit: int, before=None, since=None):
+    """Personal plus global logs, newest first, optionally bounded by decoded keyset cursors (since= pages start right after the cursor)."""
+    # UNION ALL of two (user_id, timestamp) index range scans; an OR would walk the whole log table
+    L = models.NotificationLog
+    window, order = pagination.keyset(L.timestamp, L.id, before, since), pagination.page_order(L.timestamp, L.id, since)
+    sides = [select(L.id).where(cond, *window).order_by(*order).limit(limit).subquery() for cond in (L.user_id == user_id, L.user_id == None)]
+    ids = union_all(*[select(side.c.id) for side in sides]).subquery()
+    return pagination.as_newest_first(db.query(L).join(ids, L.id == ids.c.id).order_by(*order).limit(limit), since)
+
+def render_json(content):
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+async def serve_cached(request: Request, topics, build):
+    """
+    Answer a GET through the versioned response cache: 304 when the client's
+    ETag is still current, the stored bytes when another viewer already built
+    them, otherwise build (sync builds run in the threadpool) and store.
+    """
+    query = request.url.query
+    entry, version = response_cache.lookup(topics, query)
+    outcome = "hit"
+    if entry is None:
+        content = await build() if asyncio.iscoroutinefunction(build) else await run_in_threadpool(build)
+        entry, outcome = response_cache.store(topics, query, version, render_json(content)), "miss"
+    return response_cache.respond(entry, request.headers.get("if-none-match"), outcome)
 
 # --- SCHEMAS ---
 class UserLogin(BaseModel): username: str; password: str
 class CheckInRequest(BaseModel): latitude: float; longitude: float
-class BulkDeployRequest(BaseModel): officer_ids: List[int]; latitude: float; longitude: float; radius: float
+class CheckInRecord(BaseModel): officer_id: int; latitude: float; longitude: float; timestamp: Optional[datetime] = None
+class BatchCheckInRequest(BaseModel): records: List[CheckInRecord]
+class BulkDeployRequest(BaseModel): officer_ids: List[int]; latitude: float; longitude: float; radius: float; polygon: Optional[List[List[float]]] = None
+class ZoneCreateRequest(BaseModel): name: str; polygon: List[List[float]]; supervisor_id: Optional[int] = None
+class DispatchSuggestion(BaseModel): id: int; username: str; lat: float; long: float; distance_m: float; eta_minutes: float
+class ZoneResponse(BaseModel): id: int; name: str; kind: str; polygon: List[List[float]]; supervisor_id: Optional[int]
 class PingRequest(BaseModel): receiver_id: int; message: str
 class BroadcastPingRequest(BaseModel): message: str
-class PingResponse(BaseModel): id: int; sender: str; message: str; lat: float; long: float; timestamp: datetime
-class LogResponse(BaseModel): timestamp: datetime; level: str; message: str
+# `cursor` marks the row's place in its timeline; pass it back as before= (older page) or since= (newer rows)
+class PingResponse(BaseModel): id: int; sender: str; message: str; lat: float; long: float; timestamp: datetime; cursor: Optional[str] = None
+class LogResponse(BaseModel): id: int; timestamp: datetime; level: str; message: str; cursor: Optional[str] = None
 
 class OfficerDashboardData(BaseModel):
-    status: str; message: str; target_lat: Optional[float]; target_long: Optional[float]; radius: Optional[float]
+    id: int; status: str; message: str; target_lat: Optional[float]; target_long: Optional[float]; radius: Optional[float]
     current_lat: Optional[float]; current_long: Optional[float]; profile_photo: str; pings_enabled: bool
+    zone_polygon: Optional[List[List[float]]] = None
 
 class OfficerStatusResponse(BaseModel):
     id: int; username: str; current_lat: Optional[float]; current_long: Optional[float]
@@ -141,48 +285,59 @@ class OfficerStatusResponse(BaseModel):
 # --- ENDPOINTS ---
 
 @app.post("/auth/login")
-def login(creds: UserLogin, db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.username == creds.username).first()
-    if not user or not auth.verify_password(creds.password, user.hashed_password):
+async def login(creds: UserLogin):
+    # Async so a login never holds a threadpool slot while argon2 runs in its own bounded pool
+    user = await run_in_threadpool(find_login, creds.username)
+    try: valid = user is not None and await auth.hash_pool.verify(creds.password, user.hashed_password)
+    except auth.HashPoolBusy: raise HTTPException(503, "Login queue is full, retry shortly.", headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(403, "Invalid credentials")
     return {"access_token": auth.create_access_token({"sub": user.username, "role": user.role}), "role": user.role, "username": user.username, "profile_photo": user.profile_photo}
 
 @app.get("/officer/me", response_model=OfficerDashboardData)
-def get_my_status(u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+async def get_my_status(u: models.User = Depends(auth.get_current_user_async)):
     status_msg, notif = "free", "AWAITING DEPLOYMENT"
-    t_lat, t_long, rad = None, None, None
+    t_lat, t_long, rad, polygon = None, None, None, None
+    cur_lat, cur_long = current_position(u)
 
     if u.is_on_leave: 
         status_msg, notif = "on_leave", "ON LEAVE STATUS ACTIVE"
     else:
-        dep = db.query(models.Deployment).filter(models.Deployment.officer_id == u.id, models.Deployment.is_active == True).first()
-        if dep:
-            t_lat, t_long, rad = dep.target_lat, dep.target_long, dep.radius_meters
+        zone = geofence_engine.get(u.id)
+        if zone:
+            t_lat, t_long, rad, polygon = zone.target_lat, zone.target_long, zone.radius, zone.polygon
             status_msg, notif = "risk", "GPS SIGNAL LOST"
-            if u.last_known_lat:
-                is_safe, dist = geofencing_service.is_inside_geofence(u.last_known_lat, u.last_known_long, dep.target_lat, dep.target_long, dep.radius_meters)
-                status_msg, notif = ("safe", "ZONE SECURE") if is_safe else ("risk", f"VIOLATION ({int(dist)}m)")
+            if zone.inside is not None:
+                status_msg, notif = ("safe", "ZONE SECURE") if zone.inside else ("risk", f"VIOLATION ({int(zone.distance)}m)")
     
     if u.leave_requested: status_msg, notif = "req_leave", "LEAVE PENDING"
 
     return OfficerDashboardData(
-        status=status_msg, message=notif, target_lat=t_lat, target_long=t_long, radius=rad,
-        current_lat=u.last_known_lat, current_long=u.last_known_long, profile_photo=u.profile_photo, pings_enabled=u.pings_enabled
+        id=u.id, status=status_msg, message=notif, target_lat=t_lat, target_long=t_long, radius=rad,
+        current_lat=cur_lat, current_long=cur_long, profile_photo=u.profile_photo, pings_enabled=u.pings_enabled,
+        zone_polygon=[list(p) for p in polygon] if polygon else None,
     )
 
 @app.get("/officer/logs", response_model=List[LogResponse])
-def get_officer_logs(u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    return db.query(models.NotificationLog).filter(or_(models.NotificationLog.user_id == u.id, models.NotificationLog.user_id == None)).order_by(desc(models.NotificationLog.timestamp)).limit(10).all()
+async def get_officer_logs(request: Request, limit: int = Query(10, ge=1, le=200), before: Optional[str] = None, since: Optional[str] = None, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    cursors = page_cursors(before, since)
+    return await serve_cached(request, [GLOBAL_LOGS, log_topic(u.id)], lambda: [log_row(l) for l in log_timeline(db, u.id, limit, *cursors)])
 
 @app.get("/pings/active", response_model=List[PingResponse])
-def get_pings(u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+async def get_pings(limit: int = Query(50, ge=1, le=200), before: Optional[str] = None, since: Optional[str] = None, u: models.User = Depends(auth.get_current_user_async), db=Depends(database.get_hot_db)):
     if not u.pings_enabled: return []
-    pings = db.query(models.Ping).filter(models.Ping.receiver_id == u.id, models.Ping.is_active == True).all()
-    res = []
-    for p in pings:
-        sender = db.query(models.User).get(p.sender_id)
-        res.append({"id": p.id, "sender": sender.username, "message": p.message, "lat": p.lat, "long": p.long, "timestamp": p.timestamp})
-    return res
+    rows = await database.run_db(db, active_pings, u.id, limit, page_cursors(before, since))
+    return [{"id": p.id, "sender": name or "UNKNOWN", "message": p.message, "lat": p.lat, "long": p.long, "timestamp": p.timestamp, "cursor": pagination.encode_cursor(p.timestamp, p.id)} for p, name in rows]
+
+def active_pings(db: Session, receiver_id: int, limit: int, cursors):
+    P = models.Ping
+    window = pagination.keyset(P.timestamp, P.id, *cursors)
+    # One round-trip: pings written before sender_username existed fall back to the joined users row
+    sender = func.coalesce(P.sender_username, models.User.username)
+    return pagination.as_newest_first(db.execute(
+        select(P, sender).outerjoin(models.User, models.User.id == P.sender_id)
+        .where(P.receiver_id == receiver_id, P.is_active == True, *window).order_by(*pagination.page_order(P.timestamp, P.id, cursors[1])).limit(limit)
+    ), cursors[1])
 
 @app.post("/ping/send")
 def send_ping(req: PingRequest, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
@@ -192,30 +347,38 @@ def send_ping(req: PingRequest, u: models.User = Depends(auth.get_current_user),
     
     # Check range for officers
     if u.role == "field_officer":
-        if not u.last_known_lat or not receiver.last_known_lat: raise HTTPException(400, "Location unknown.")
-        dist = calculate_distance(u.last_known_lat, u.last_known_long, receiver.last_known_lat, receiver.last_known_long)
+        (s_lat, s_long), (r_lat, r_long) = current_position(u), current_position(receiver)
+        if s_lat is None or r_lat is None: raise HTTPException(400, "Location unknown.")
+        dist = geofencing_service.calculate_distance(s_lat, s_long, r_lat, r_long)
         if dist > 5000: raise HTTPException(400, f"Target out of range ({int(dist)}m).")
 
-    db.add(models.Ping(sender_id=u.id, receiver_id=receiver.id, message=req.message, lat=u.last_known_lat or 0, long=u.last_known_long or 0))
-    db.commit()
+    lat, long = current_position(u)
+    ping = models.Ping(sender_id=u.id, sender_username=u.username, receiver_id=receiver.id, message=req.message, lat=lat or 0, long=long or 0, timestamp=datetime.utcnow())
+    db.add(ping); db.flush()
+    payload = ping_payload(ping, u.username); db.commit()
+    publish_pings([payload])
     return {"msg": "Ping Sent"}
 
 @app.post("/ping/broadcast")
 def broadcast_ping(req: BroadcastPingRequest, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    if not u.last_known_lat: raise HTTPException(400, "Location unknown.")
-    officers = db.query(models.User).filter(models.User.role == "field_officer", models.User.id != u.id, models.User.pings_enabled == True).all()
-    count = 0
-    for off in officers:
-        if off.last_known_lat:
-            if calculate_distance(u.last_known_lat, u.last_known_long, off.last_known_lat, off.last_known_long) <= 5000:
-                db.add(models.Ping(sender_id=u.id, receiver_id=off.id, message=req.message + " [BROADCAST]", lat=u.last_known_lat, long=u.last_known_long))
-                count += 1
+    lat, long = current_position(u)
+    if lat is None: raise HTTPException(400, "Location unknown.")
+    # Only officers in nearby grid cells are considered, so cost tracks local density, not force size
+    nearby = [oid for oid, _ in officer_index.within(lat, long, 5000) if oid != u.id]
+    officers = db.query(models.User.id).filter(models.User.id.in_(nearby), models.User.role == "field_officer", models.User.pings_enabled == True).all() if nearby else []
+    now, message = datetime.utcnow(), req.message + " [BROADCAST]"
+    rows = [{"sender_id": u.id, "sender_username": u.username, "receiver_id": oid, "message": message, "lat": lat, "long": long, "timestamp": now, "is_active": True} for (oid,) in officers]
+    # Single executemany for the whole fan-out
+    created = db.execute(insert(models.Ping).returning(models.Ping.id, models.Ping.receiver_id), rows).all() if rows else []
     db.commit()
+    publish_pings([(rid, {"id": i, "sender": u.username, "message": message, "lat": lat, "long": long, "timestamp": now}) for i, rid in created])
+    count = len(rows)
     return {"msg": f"Pinged {count} units."}
 
 @app.post("/ping/toggle")
 def toggle_pings(u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     u.pings_enabled = not u.pings_enabled; db.commit()
+    event_bus.publish("officer", {"id": u.id, "pings_enabled": u.pings_enabled}, officer_id=u.id, supervisor_id=u.supervisor_id)
     return {"enabled": u.pings_enabled}
 
 @app.post("/ping/dismiss/{pid}")
@@ -224,69 +387,228 @@ def dismiss_ping(pid: int, u: models.User = Depends(auth.get_current_user), db:
     return {"msg": "ok"}
 
 @app.post("/checkin")
-def check_in(loc: CheckInRequest, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    u.last_known_lat, u.last_known_long = loc.latitude, loc.longitude; db.commit()
-    dep = db.query(models.Deployment).filter(models.Deployment.officer_id == u.id, models.Deployment.is_active == True).first()
-    if dep:
-        dep.current_lat, dep.current_long, dep.last_checkin = loc.latitude, loc.longitude, datetime.utcnow()
-        safe, _ = geofencing_service.is_inside_geofence(loc.latitude, loc.longitude, dep.target_lat, dep.target_long, dep.radius_meters)
-        dep.status = "deployed" if safe else "out_of_bounds"
-        db.commit()
+async def check_in(loc: CheckInRequest, u: models.User = Depends(auth.get_current_user_async), db=Depends(database.get_hot_db)):
+    # Buffered: persisted by the background flusher, visible to reads immediately
+    now = datetime.utcnow()
+    location_buffer.record(u.id, loc.latitude, loc.longitude, now)
+    if u.role == "field_officer": officer_index.update(u.id, loc.latitude, loc.longitude)
+    event_bus.publish("officer", {"id": u.id, "current_lat": loc.latitude, "current_long": loc.longitude}, officer_id=u.id, supervisor_id=u.supervisor_id)
+    # Only boundary crossings touch the database synchronously
+    transition = geofence_engine.observe(u.id, loc.latitude, loc.longitude, now)
+    if transition:
+        events = await database.run_db(db, stage_transition_logs, [transition]); await database.commit_db(db)
+        publish_transition_events(events)
     return {"status": "ok"}
 
+@app.post("/checkin/batch")
+def check_in_batch(req: BatchCheckInRequest, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    # Gateways relay for a jurisdiction: supervisors for their own units, field officers only for themselves
+    if u.role == "supervisor": authorize = lambda row: row.supervisor_id == u.id
+    elif u.role == "field_officer": authorize = lambda row: row.id == u.id
+    else: authorize = None
+    results = checkin_service.apply_checkins(db, req.records, authorize=authorize, newest=location_buffer.timestamp)
+    for r in results:
+        if r["status"] == "applied": location_buffer.discard_older(r["officer_id"], r.pop("ts"))
+        else: r.pop("ts")
+    applied = sum(r["status"] == "applied" for r in results)
+    return {"received": len(results), "applied": applied, "results": results}
+
 @app.get("/status/all", response_model=List[OfficerStatusResponse])
-def get_all_status(u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    q = db.query(models.User).filter(models.User.role == "field_officer")
-    if u.role == "supervisor": q = q.filter(models.User.supervisor_id == u.id)
+async def get_all_status(request: Request, u: models.User = Depends(auth.get_current_user_async), db=Depends(database.get_hot_db)):
+    criteria = [models.User.supervisor_id == u.id] if u.role == "supervisor" else []
+    async def build(): return [row for _, row in await database.run_db(db, build_roster, criteria)]
+    return await serve_cached(request, [roster_topic(u.id) if u.role == "supervisor" else ROSTER_ALL], build)
+
+def build_roster(db: Session, criteria):
+    """(User, OfficerStatusResponse) pairs for field officers matching the extra SQL criteria."""
+    # One round-trip: officers left-joined to their active deployment, jurisdiction filtered in SQL
+    q = db.query(models.User, models.Deployment).outerjoin(
+        models.Deployment, (models.Deployment.officer_id == models.User.id) & (models.Deployment.is_active == True)
+    ).filter(models.User.role == "field_officer", *criteria)
+    rows, seen = [], set()
+    for o, d in q.order_by(models.User.id).all():
+        if o.id in seen: continue  # legacy rows may carry more than one active deployment
+        seen.add(o.id); rows.append((o, d))
+
     res = []
-    for o in q.all():
+    for o, d in rows:
+        lat, long = current_position(o)
         color = "yellow"
         if o.is_on_leave: color = "blue"
-        else:
-            d = db.query(models.Deployment).filter(models.Deployment.officer_id == o.id, models.Deployment.is_active == True).first()
-            if d: color = "green" if d.status == "deployed" else "red"
-        res.append(OfficerStatusResponse(id=o.id, username=o.username, current_lat=o.last_known_lat, current_long=o.last_known_long, status_color=color, leave_requested=o.leave_requested, profile_photo=o.profile_photo, pings_enabled=o.pings_enabled))
+        elif d is not None:
+            # Cached geofence state; officers without a fix keep the status recorded at their last check-in
+            zone = geofence_engine.get(o.id)
+            safe = zone.inside if zone is not None and zone.inside is not None else d.status == "deployed"
+            color = "green" if safe else "red"
+        res.append((o, OfficerStatusResponse(id=o.id, username=o.username, current_lat=lat, current_long=long, status_color=color, leave_requested=o.leave_requested, profile_photo=o.profile_photo, pings_enabled=o.pings_enabled)))
     return res
 
 @app.post("/deploy/bulk")
 def bulk_deploy(req: BulkDeployRequest, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    db.query(models.Deployment).filter(models.Deployment.officer_id.in_(req.officer_ids), models.Deployment.is_active == True).update({"is_active": False}, synchronize_session=False)
-    db.add_all([models.Deployment(officer_id=oid, target_lat=req.latitude, target_long=req.longitude, radius_meters=req.radius, status="deployed") for oid in req.officer_ids])
-    for oid in req.officer_ids: log_event(db, "INFO", "New Deployment Assigned", user_id=oid)
+    if req.polygon is not None and len(req.polygon) < 3: raise HTTPException(400, "Polygon needs at least 3 points.")
+    req.officer_ids = list(dict.fromkeys(req.officer_ids))  # one active deployment per officer
+    if not in_jurisdiction(u, req.latitude, req.longitude): raise HTTPException(400, "Target outside jurisdiction.")
+    zone, polygon = None, None
+    if req.polygon:
+        # Polygon geofence: the target circle becomes the polygon's centre and enclosing radius for display
+        polygon = [tuple(p) for p in req.polygon]
+        zone = new_zone(f"deployment@{req.latitude:.4f},{req.longitude:.4f}", "deployment", polygon, u.id)
+        db.add(zone); db.flush()
+        req.latitude, req.longitude, req.radius = zone_service.polygon_centre(polygon)
+    retired = end_deployments(db, req.officer_ids)
+    rows = [{"officer_id": oid, "target_lat": req.latitude, "target_long": req.longitude, "radius_meters": req.radius, "status": "deployed", "zone_id": zone.id if zone else None} for oid in req.officer_ids]
+    # executemany with RETURNING; ids are matched back by officer, not by row order
+    dep_ids = {oid: did for did, oid in db.execute(insert(models.Deployment).returning(models.Deployment.id, models.Deployment.officer_id), rows)} if rows else {}
+    officers = {o.id: o for o in db.query(models.User).filter(models.User.id.in_(req.officer_ids))}
+    # Zone and geofence state only reach the in-memory indexes once the commit succeeds
+    states = [geofence_engine.prepare(dep_id, off.id, off.supervisor_id, req.latitude, req.longitude, req.radius, *current_position(off), polygon)
+              for oid, dep_id in dep_ids.items() if (off := officers.get(oid)) is not None]
+    outside = [s.deployment_id for s in states if s.inside is False]
+    if outside: db.query(models.Deployment).filter(models.Deployment.id.in_(outside)).update({"status": "out_of_bounds"}, synchronize_session=False)
+    events = stage_logs(db, "INFO", "New Deployment Assigned", req.officer_ids)
     db.commit()
+    forget_deployments(req.officer_ids, retired)
+    if zone: index_zone(zone)
+    geofence_engine.install(states)
+    publish_logs(events); publish_officers(db, req.officer_ids)
     return {"msg": "ok"}
 
 @app.post("/leave/approve/{oid}")
 def approve_leave(oid: int, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     off = db.query(models.User).get(oid); off.is_on_leave = True; off.leave_requested = False
-    db.query(models.Deployment).filter(models.Deployment.officer_id == oid).update({"is_active": False})
-    log_event(db, "SUCCESS", "Leave Request APPROVED", user_id=oid); db.commit()
+    retired = end_deployments(db, [oid])
+    log_event(db, "SUCCESS", "Leave Request APPROVED", user_id=oid); db.commit(); forget_deployments([oid], retired)
+    publish_officers(db, [oid])
     return {"msg": "ok"}
 
 @app.post("/leave/deny/{oid}")
 def deny_leave(oid: int, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     off = db.query(models.User).get(oid); off.leave_requested = False
     log_event(db, "ALERT", "Leave Request DENIED", user_id=oid); db.commit()
+    publish_officers(db, [oid])
     return {"msg": "ok"}
 
 @app.post("/deploy/stop/{oid}")
 def stop_deploy(oid: int, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    db.query(models.Deployment).filter(models.Deployment.officer_id == oid).update({"is_active": False})
-    log_event(db, "INFO", "Patrol Ended by Command", user_id=oid); db.commit()
+    retired = end_deployments(db, [oid])
+    log_event(db, "INFO", "Patrol Ended by Command", user_id=oid); db.commit(); forget_deployments([oid], retired)
+    publish_officers(db, [oid])
     return {"msg": "ok"}
 
 @app.post("/leave/grant/{oid}")
 def grant_leave(oid: int, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    off = db.query(models.User).get(oid); off.is_on_leave = True; db.query(models.Deployment).filter(models.Deployment.officer_id == oid).update({"is_active": False})
-    log_event(db, "SUCCESS", "Leave GRANTED by Command", user_id=oid); db.commit()
+    off = db.query(models.User).get(oid); off.is_on_leave = True; retired = end_deployments(db, [oid])
+    log_event(db, "SUCCESS", "Leave GRANTED by Command", user_id=oid); db.commit(); forget_deployments([oid], retired)
+    publish_officers(db, [oid])
     return {"msg": "ok"}
 
 @app.post("/leave/revoke/{oid}")
 def revoke_leave(oid: int, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    db.query(models.User).filter(models.User.id == oid).update({"is_on_leave": False})
+    db.query(models.User).filter(models.User.id == oid).update({"is_on_leave": False}); auth.invalidate_on_commit(db, oid)
     log_event(db, "ALERT", "Leave REVOKED - Return to Duty", user_id=oid); db.commit()
+    publish_officers(db, [oid])
     return {"msg": "ok"}
 
-@app.get("/logs")
-def get_logs(db: Session = Depends(database.get_db)):
-    return db.query(models.NotificationLog).filter(models.NotificationLog.user_id == None).order_by(desc(models.NotificationLog.timestamp)).limit(20).all()
+@app.get("/logs", response_model=List[LogResponse])
+async def get_logs(request: Request, limit: int = Query(20, ge=1, le=200), before: Optional[str] = None, since: Optional[str] = None, db: Session = Depends(database.get_db)):
+    L = models.NotificationLog
+    cursors = page_cursors(before, since)
+    window, order = pagination.keyset(L.timestamp, L.id, *cursors), pagination.page_order(L.timestamp, L.id, cursors[1])
+    return await serve_cached(request, [GLOBAL_LOGS], lambda: [log_row(l) for l in pagination.as_newest_first(db.query(L).filter(L.user_id == None, *window).order_by(*order).limit(limit), cursors[1])])
+
+@app.get("/events/stream")
+async def event_stream(request: Request, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    """Server-Sent Events feed of roster, ping and log deltas scoped to the caller's jurisdiction."""
+    sub = event_bus.subscribe(u.id, u.role)
+    db.close()  # don't pin a pooled connection for the life of the stream
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                yield await sub.next_frame()
+        finally:
+            event_bus.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/zones", response_model=List[ZoneResponse])
+def list_zones(kind: Optional[str] = None, u: models.User = Depends(auth.get_current_user)):
+    # Deployment polygons are internal to their deployments; only jurisdictions are listed
+    zones = [z for z in zone_index.zones(kind) if z.kind != "deployment"]
+    if u.role == "supervisor": zones = [z for z in zones if z.supervisor_id == u.id]
+    return [ZoneResponse(id=z.id, name=z.name, kind=z.kind, polygon=[list(p) for p in z.polygon], supervisor_id=z.supervisor_id) for z in zones]
+
+@app.post("/zones", response_model=ZoneResponse)
+def create_zone(req: ZoneCreateRequest, u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    if u.role != "head_officer": raise HTTPException(403, "Only the head officer can define jurisdictions.")
+    if len(req.polygon) < 3: raise HTTPException(400, "Polygon needs at least 3 points.")
+    if req.supervisor_id is not None:
+        owner = db.query(models.User).get(req.supervisor_id)
+        if owner is None or owner.role != "supervisor": raise HTTPException(400, "supervisor_id is not a supervisor.")
+    zone = new_zone(req.name, "jurisdiction", req.polygon, req.supervisor_id)
+    db.add(zone); db.commit(); index_zone(zone)
+    return ZoneResponse(id=zone.id, name=zone.name, kind=zone.kind, polygon=req.polygon, supervisor_id=zone.supervisor_id)
+
+@app.get("/zones/containing")
+def zones_containing(lat: float, long: float, kind: Optional[str] = Query("jurisdiction"), u: models.User = Depends(auth.get_current_user)):
+    hits = zone_index.containing(lat, long, kind)
+    return {"zones": [{"id": z.id, "name": z.name, "kind": z.kind, "supervisor_id": z.supervisor_id} for z in hits], "in_jurisdiction": in_jurisdiction(u, lat, long)}
+
+@app.get("/dispatch/suggest", response_model=List[DispatchSuggestion])
+def suggest_units(lat: float, long: float, k: int = Query(5, ge=1, le=100), max_radius: float = Query(dispatch_service.DISPATCH_MAX_RADIUS_METERS, gt=0),
+                  u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    """Nearest free units in the caller's jurisdiction, ranked by distance (travel time is estimated from it)."""
+    if u.role == "field_officer": raise HTTPException(403, "Only command staff can dispatch units.")
+    if not in_jurisdiction(u, lat, long): raise HTTPException(400, "Target outside jurisdiction.")
+    hits = dispatch_index.nearest(lat, long, k, max_radius, supervisor_id=u.id if u.role == "supervisor" else None)
+    names = dict(db.query(models.User.id, models.User.username).filter(models.User.id.in_([oid for oid, _ in hits]))) if hits else {}
+    res = []
+    for oid, dist in hits:
+        p_lat, p_long = dispatch_index.positions.get(oid) or (None, None)
+        if oid in names and p_lat is not None:
+            res.append(DispatchSuggestion(id=oid, username=names[oid], lat=p_lat, long=p_long, distance_m=round(dist, 1), eta_minutes=round(dispatch_service.eta_minutes(dist), 1)))
+    return res
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return REGISTRY.render()
+
+@app.get("/track/{officer_id}")
+def get_track(officer_id: int, start: Optional[datetime] = Query(None, alias="from"), end: Optional[datetime] = Query(None, alias="to"),
+              tolerance: float = Query(0, ge=0, description="Douglas-Peucker tolerance in meters; 0 returns every fix"),
+              u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    """Recorded path of an officer as [timestamp, lat, long] points, oldest first."""
+    officer = db.query(models.User).get(officer_id)
+    if officer is None: raise HTTPException(404, "Officer not found.")
+    if (u.role == "field_officer" and u.id != officer_id) or (u.role == "supervisor" and officer.supervisor_id != u.id):
+        raise HTTPException(403, "Officer outside your command.")
+    P = models.PositionSample
+    q = select(P.timestamp, P.lat, P.long).where(P.officer_id == officer_id)
+    if start: q = q.where(P.timestamp >= checkin_service.utc_naive(start))
+    if end: q = q.where(P.timestamp <= checkin_service.utc_naive(end))
+    rows = db.execute(q.order_by(P.timestamp)).all()
+    if tolerance and rows: rows = [rows[i] for i in track_service.douglas_peucker([r[1] for r in rows], [r[2] for r in rows], tolerance)]
+    # Pre-encoded: running tens of thousands of points through jsonable_encoder costs more than the query
+    return JSONResponse({"officer_id": officer_id, "points": [[ts.isoformat(), lat, long] for ts, lat, long in rows]})
+
+@app.get("/map/clusters")
+def map_clusters(zoom: int = Query(..., ge=0, le=22), min_lat: Optional[float] = None, min_long: Optional[float] = None,
+                 max_lat: Optional[float] = None, max_long: Optional[float] = None,
+                 u: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    """Tactical map layer: per-cell status counts below MAP_CLUSTER_MAX_ZOOM, individual units from there on."""
+    scope = u.id if u.role == "supervisor" else "all"
+    criteria = [models.User.supervisor_id == u.id] if u.role == "supervisor" else []
+    bbox = (min_lat, min_long, max_lat, max_long) if None not in (min_lat, min_long, max_lat, max_long) else None
+    located = lambda: [row for _, row in build_roster(db, criteria) if row.current_lat is not None and row.current_long is not None]
+    version = event_bus.version
+    if zoom >= cluster_service.CLUSTER_MAX_ZOOM:
+        units = cluster_cache.get((scope, None), version, lambda: [
+            {"id": r.id, "username": r.username, "lat": r.current_lat, "long": r.current_long, "status_color": r.status_color} for r in located()
+        ])
+        # Plain JSON values only, so skip jsonable_encoder like /track does
+        return JSONResponse({"zoom": zoom, "clustered": False, "clusters": [], "units": [x for x in units if cluster_service.in_bbox(x["lat"], x["long"], bbox)]})
+    clusters = cluster_cache.get((scope, zoom), version, lambda: cluster_service.aggregate(
+        [(r.current_lat, r.current_long, r.status_color) for r in located()], zoom
+    ))
+    return JSONResponse({"zoom": zoom, "clustered": True, "clusters": [c for c in clusters if cluster_service.in_bbox(c["lat"], c["long"], bbox)], "units": []})
@@ -0,0 +1,51 @@
+from sqlalchemy import func, inspect, select, text, update
+
+from .database import Base
+
+
+def dedupe_active_deployments(conn):
+    """Keep only the newest active deployment per officer so the one-active unique index can be built."""
+    from .models import Deployment
+    newest = select(func.max(Deployment.id)).where(Deployment.is_active == True).group_by(Deployment.officer_id)
+    conn.execute(update(Deployment).where(Deployment.is_active == True, Deployment.id.not_in(newest)).values(is_active=False))
+
+
+# Data fixes that must run before a given index can be created
+INDEX_PREREQUISITES = {"uq_deployments_one_active": dedupe_active_deployments}
+
+# Indexes superseded by a wider one; dropped so the planner can't pick them
+RETIRED_INDEXES = {"pings": ["ix_pings_receiver_active"]}
+
+
+def upgrade(engine):
+    """
+    Bring an existing database up to the current models without dropping data.
+
+    create_all only creates missing tables, so columns added to existing
+    models are appended here with ALTER TABLE. New columns must be nullable.
+    Indexes declared on existing tables are created the same way, and
+    retired ones are dropped.
+    """
+    Base.metadata.create_all(bind=engine)
+    insp = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(col.name)} {col.type.compile(dialect=engine.dialect)}"
+                ))
+        for table in Base.metadata.sorted_tables:
+            existing = {i["name"] for i in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.name in INDEX_PREREQUISITES:
+                    INDEX_PREREQUISITES[index.name](conn)
+                index.create(conn)
+            for name in RETIRED_INDEXES.get(table.name, []):
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX {quote(name)}"))
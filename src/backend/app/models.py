@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 from .database import Base
@@ -14,6 +14,7 @@ class User(Base):
     supervisor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     last_known_lat = Column(Float, nullable=True)
     last_known_long = Column(Float, nullable=True)
+    last_known_at = Column(DateTime, nullable=True)  # time of the last_known_lat/long fix
     leave_requested = Column(Boolean, default=False)
     is_on_leave = Column(Boolean, default=False)
     profile_photo = Column(String, default=DEFAULT_PHOTO)
@@ -36,7 +37,44 @@ class Deployment(Base):
     last_checkin = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
     status = Column(String, default="deployed") 
+    # Optional polygon geofence; when set it replaces the target circle
+    zone_id = Column(Integer, ForeignKey("zones.id"), nullable=True)
     officer = relationship("User", back_populates="deployments")
+    zone = relationship("Zone")
+
+    __table_args__ = (
+        Index("ix_deployments_officer_active", officer_id, is_active),
+        # At most one active deployment per officer
+        Index("uq_deployments_one_active", officer_id, unique=True,
+              sqlite_where=is_active == True, postgresql_where=is_active == True),
+    )
+
+class Zone(Base):
+    __tablename__ = "zones"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    kind = Column(String, default="jurisdiction")  # "jurisdiction" or "deployment"
+    polygon = Column(String)  # JSON [[lat, long], ...]
+    # Bounding box, precomputed for cheap prefiltering
+    min_lat = Column(Float)
+    min_long = Column(Float)
+    max_lat = Column(Float)
+    max_long = Column(Float)
+    supervisor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class PositionSample(Base):
+    """Append-only GPS trail: one compact row per accepted fix, for track replay."""
+    __tablename__ = "position_history"
+    id = Column(Integer, primary_key=True)
+    officer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    lat = Column(Float, nullable=False)
+    long = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_position_history_officer_timestamp", officer_id, timestamp),
+        Index("ix_position_history_timestamp", timestamp),  # retention sweeps
+    )
 
 class NotificationLog(Base):
     __tablename__ = "notification_logs"
@@ -47,14 +85,27 @@ class NotificationLog(Base):
     # Optional: Link to specific user for filtering officer logs
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
+    __table_args__ = (
+        # Per-officer and global (user_id IS NULL) timelines, newest first
+        Index("ix_notification_logs_user_timestamp", user_id, timestamp),
+        Index("ix_notification_logs_timestamp", timestamp),
+    )
+
 # NEW: Ping System
 class Ping(Base):
     __tablename__ = "pings"
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"))
+    sender_username = Column(String, nullable=True)  # denormalized so reads skip the users join
     receiver_id = Column(Integer, ForeignKey("users.id"))
     message = Column(String)
     lat = Column(Float)
     long = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True) # Active until clicked/dismissed
\ No newline at end of file
+    is_active = Column(Boolean, default=True) # Active until clicked/dismissed
+
+    __table_args__ = (
+        # Timestamp included so an inbox is read newest-first straight off this index
+        Index("ix_pings_receiver_active_timestamp", receiver_id, is_active, timestamp),
+        Index("ix_pings_active_timestamp", is_active, timestamp),  # retention sweeps
+    )
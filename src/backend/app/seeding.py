@@ -0,0 +1,192 @@
+"""
+Bulk, non-interactive roster seeding.
+
+    python -m src.backend.app.seeding roster.csv [--reset] [--workers 8] [--share-hashes]
+
+A roster is a CSV file or a JSON list of objects with these fields:
+username, password, role (default field_officer), supervisor (a username),
+lat, long, status (safe | risk | free | on_leave | req_leave, default free),
+target_lat, target_long, radius and profile_photo. Staff rows are inserted
+before the officers that report to them, so one file can hold a whole
+command structure.
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import insert, select
+
+from . import auth, database, migrations, models
+from .services import geofencing_service
+
+SUP_PHOTO = "https://cdn-icons-png.flaticon.com/512/206/206853.png"
+OFFICER_PHOTO = "https://cdn-icons-png.flaticon.com/512/727/727399.png"
+
+STATUSES = ("safe", "risk", "free", "on_leave", "req_leave")
+DEFAULT_RADIUS_METERS = 500.0
+RISK_OFFSET_DEG = 0.02  # "risk" rows without a target are deployed this far north of their fix
+HASH_POOL_THRESHOLD = 8  # fewer distinct passwords than this are hashed inline
+LOOKUP_CHUNK = 500       # keeps IN (...) lists under every backend's bind-parameter limit
+
+FLOAT_FIELDS = ("lat", "long", "target_lat", "target_long", "radius")
+
+
+def load_roster(path):
+    """Rows from a .csv or .json roster, with blank values as None and coordinates as floats."""
+    with open(path, newline="", encoding="utf-8") as fh:
+        rows = json.load(fh) if path.lower().endswith(".json") else list(csv.DictReader(fh))
+    out = []
+    for row in rows:
+        row = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        row = {k: (None if v == "" else v) for k, v in row.items()}
+        for key in FLOAT_FIELDS:
+            if row.get(key) is not None:
+                row[key] = float(row[key])
+        out.append(row)
+    return out
+
+
+def hash_passwords(passwords, workers=None, share_hashes=False):
+    """
+    Argon2 hashes for `passwords`, in order.
+
+    Every user gets their own salt, so equal passwords can't be spotted by
+    equal hashes. With `share_hashes` each distinct password is hashed once
+    and the hash reused by every user with that password; that is only meant
+    for synthetic demo and load-test fleets, which use one or two passwords.
+    Either way the hashing is spread over a process pool once there is
+    enough of it to pay for the workers.
+    """
+    todo = list(dict.fromkeys(passwords)) if share_hashes else list(passwords)
+    if len(todo) < HASH_POOL_THRESHOLD or workers == 1:
+        hashed = [auth.get_password_hash(p) for p in todo]
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashed = list(pool.map(auth.get_password_hash, todo, chunksize=max(1, len(todo) // (workers * 4))))
+    if not share_hashes:
+        return hashed
+    by_password = dict(zip(todo, hashed))
+    return [by_password[p] for p in passwords]
+
+
+def resolve_user_ids(db, names):
+    """username -> id for the given usernames that already exist."""
+    ids, names = {}, list(names)
+    for start in range(0, len(names), LOOKUP_CHUNK):
+        chunk = names[start:start + LOOKUP_CHUNK]
+        ids.update((name, uid) for uid, name in db.execute(select(models.User.id, models.User.username).where(models.User.username.in_(chunk))))
+    return ids
+
+
+def user_row(row, hashed, supervisor_id):
+    role = row.get("role") or "field_officer"
+    status = row.get("status") or "free"
+    on_leave = status == "on_leave"
+    return {
+        "username": row["username"], "hashed_password": hashed, "role": role, "supervisor_id": supervisor_id,
+        "last_known_lat": None if on_leave else row.get("lat"), "last_known_long": None if on_leave else row.get("long"),
+        "is_on_leave": on_leave, "leave_requested": status == "req_leave",
+        "profile_photo": row.get("profile_photo") or (OFFICER_PHOTO if role == "field_officer" else SUP_PHOTO),
+    }
+
+
+def deployment_row(row, officer_id):
+    """Active deployment implied by a roster row, or None."""
+    status, lat, long = row.get("status") or "free", row.get("lat"), row.get("long")
+    if status == "on_leave" or lat is None or long is None:
+        return None
+    if row.get("target_lat") is not None and row.get("target_long") is not None:
+        target = (row["target_lat"], row["target_long"])
+    elif status in ("safe", "risk"):
+        target = (lat + RISK_OFFSET_DEG if status == "risk" else lat, long)
+    else:
+        return None
+    return {"officer_id": officer_id, "target_lat": target[0], "target_long": target[1],
+            "radius_meters": row.get("radius") or DEFAULT_RADIUS_METERS,
+            "current_lat": lat, "current_long": long, "is_active": True}
+
+
+def seed_roster(db, rows, workers=None, share_hashes=False):
+    """
+    Insert roster rows in bulk and commit; usernames already present are
+    skipped. Returns counts of users and deployments created and rows skipped.
+    """
+    for row in rows:
+        if not row.get("username") or (not row.get("password") and not row.get("hashed_password")):
+            raise ValueError(f"Roster row needs a username and a password: {row!r}")
+        if (row.get("status") or "free") not in STATUSES:
+            raise ValueError(f"Unknown status {row['status']!r} for {row['username']}")
+
+    skip = resolve_user_ids(db, (r["username"] for r in rows)).keys()
+    rows = [dict(r) for r in rows if r["username"] not in skip]
+    plain = [r for r in rows if not r.get("hashed_password")]
+    for row, hashed in zip(plain, hash_passwords([r["password"] for r in plain], workers, share_hashes)):
+        row["hashed_password"] = hashed
+
+    # Head officers, then supervisors, then officers, so each can reference the ones before it
+    rank = {"head_officer": 0, "field_officer": 2}
+    batches = [[r for r in rows if rank.get(r.get("role") or "field_officer", 1) == level] for level in range(3)]
+    officers, ids = batches[2], {}
+    for batch in batches:
+        if not batch:
+            continue
+        wanted = {r["supervisor"] for r in batch if r.get("supervisor")} - ids.keys()
+        ids.update(resolve_user_ids(db, wanted))
+        missing = wanted - ids.keys()
+        if missing:
+            raise ValueError(f"Unknown supervisor(s): {', '.join(sorted(missing))}")
+        values = [user_row(r, r["hashed_password"], ids.get(r.get("supervisor"))) for r in batch]
+        ids.update((n, i) for i, n in db.execute(insert(models.User).returning(models.User.id, models.User.username), values))
+
+    deployments = [d for d in (deployment_row(r, ids[r["username"]]) for r in officers) if d]
+    if deployments:
+        inside, _ = geofencing_service.evaluate_geofences(
+            [d["current_lat"] for d in deployments], [d["current_long"] for d in deployments],
+            [d["target_lat"] for d in deployments], [d["target_long"] for d in deployments],
+            [d["radius_meters"] for d in deployments],
+        )
+        for d, ok in zip(deployments, inside):
+            d["status"] = "deployed" if ok else "out_of_bounds"
+        db.execute(insert(models.Deployment), deployments)
+    db.commit()
+    return {"users": len(rows), "deployments": len(deployments), "skipped": len(skip)}
+
+
+def clear_tables(engine):
+    """Delete every row but keep the schema; portable replacement for TRUNCATE ... CASCADE."""
+    with engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+def recreate_tables(engine):
+    models.Base.metadata.drop_all(bind=engine)
+    migrations.upgrade(engine)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Bulk-import a roster CSV/JSON into the configured DATABASE_URL.")
+    p.add_argument("roster")
+    p.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    p.add_argument("--workers", type=int, help="hashing processes (default: CPU count)")
+    p.add_argument("--share-hashes", action="store_true", help="hash each distinct password once and reuse it (synthetic fleets only)")
+    args = p.parse_args(argv)
+
+    if args.reset:
+        recreate_tables(database.engine)
+    else:
+        migrations.upgrade(database.engine)
+    rows = load_roster(args.roster)
+    db = database.SessionLocal()
+    try:
+        result = seed_roster(db, rows, args.workers, args.share_hashes)
+    finally:
+        db.close()
+    print(f"Created {result['users']} users and {result['deployments']} deployments; skipped {result['skipped']} existing usernames.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import json
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func, insert, update
+
+from .. import models
+from ..auth import principal_cache
+from . import geofencing_service, zone_service
+from .position_index import officer_index
+from .event_service import event_bus
+from .geofence_state import geofence_engine, stage_transition_logs, publish_transition_events
+
+LOOKUP_CHUNK = 500  # stay well under SQLite's bound-parameter limit
+
+
+def utc_naive(ts):
+    if ts is None:
+        return datetime.utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _load_targets(db, officer_ids):
+    """officer_id -> user/active-deployment/zone-polygon/newest-fix-time row, in chunked joined queries."""
+    targets = {}
+    ids = list(officer_ids)
+    # Rows written before last_known_at existed fall back to the deployment's last recorded check-in
+    known_at = func.coalesce(models.User.last_known_at, case((models.Deployment.current_lat != None, models.Deployment.last_checkin)))
+    for i in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[i:i + LOOKUP_CHUNK]
+        q = db.query(models.User.id, models.User.role, models.User.supervisor_id,
+                     # Labelled so row.id stays the officer's id for authorize callbacks
+                     models.Deployment.id.label("deployment_id"), models.Deployment.target_lat, models.Deployment.target_long, models.Deployment.radius_meters,
+                     models.Zone.polygon, known_at).outerjoin(
+            models.Deployment, (models.Deployment.officer_id == models.User.id) & (models.Deployment.is_active == True)
+        ).outerjoin(models.Zone, models.Zone.id == models.Deployment.zone_id).filter(models.User.id.in_(chunk))
+        for row in q.all():
+            targets.setdefault(row[0], row)
+    return targets
+
+
+def _is_stale(ts, *known):
+    known = [k for k in known if k is not None]
+    return bool(known) and ts < max(known)
+
+
+def apply_checkins(db, records, authorize=None, live=True, history=None, newest=None):
+    """
+    Apply a burst of (officer_id, latitude, longitude, timestamp) records.
+
+    Geofences are evaluated for the whole batch in one vectorized pass, the
+    newest position per officer is written with bulk UPDATEs, and the session
+    is committed once. `authorize(user_row)` may reject officers outside the
+    caller's jurisdiction. Returns one result dict per input record, in order;
+    each carries the record timestamp as "ts". Every accepted record, including
+    superseded ones, is appended to the position history, unless the caller
+    passes the `history` records to append instead.
+
+    Records older than the officer's latest known fix (the persisted one, or
+    `newest(officer_id)` for fixes held outside the database) are "stale":
+    they reach the position history but never the live position or the
+    geofence state.
+
+    `live` marks positions the rest of the system has not seen yet: they are
+    fed to the geofence state engine (breach/return transitions are logged in
+    the same commit), pushed into the officer index and published as position
+    deltas. The write-behind flusher passes live=False since /checkin already
+    did all of that; it only persists the engine's current state.
+    """
+    records = [(r.officer_id, r.latitude, r.longitude, utc_naive(r.timestamp)) for r in records]
+    if history is not None:
+        history = [(r.officer_id, r.latitude, r.longitude, utc_naive(r.timestamp)) for r in history]
+    targets = _load_targets(db, {r[0] for r in records} | {r[0] for r in history or ()})
+
+    results = []
+    for i, (oid, lat, lon, ts) in enumerate(records):
+        row = targets.get(oid)
+        if row is None:
+            status = "unknown_officer"
+        elif authorize is not None and not authorize(row):
+            status = "forbidden"
+        elif _is_stale(ts, row[8], newest(oid) if newest else None):
+            status = "stale"
+        else:
+            status = "applied"
+        results.append({"index": i, "officer_id": oid, "status": status, "inside": None, "distance": None, "ts": ts})
+
+    history_only = [i for i, r in enumerate(results) if r["status"] == "stale"]
+    accepted = [i for i, r in enumerate(results) if r["status"] == "applied"]
+    deployed = [i for i in accepted if targets[records[i][0]][3] is not None]
+    inside, dists = geofencing_service.evaluate_geofences(
+        [records[i][1] for i in deployed], [records[i][2] for i in deployed],
+        [targets[records[i][0]][4] for i in deployed], [targets[records[i][0]][5] for i in deployed],
+        [targets[records[i][0]][6] for i in deployed],
+    )
+    for i, ok, dist in zip(deployed, inside.tolist(), dists.tolist()):
+        if not math.isnan(dist):
+            results[i]["inside"], results[i]["distance"] = ok, round(dist, 1)
+
+    # Polygon deployments: distance is measured to the boundary instead of the centre
+    polygons = {}
+    for i in deployed:
+        raw = targets[records[i][0]][7]
+        if raw:
+            polygon = polygons.setdefault(raw, json.loads(raw))
+            overshoot = zone_service.signed_distance_to_polygon(records[i][1], records[i][2], polygon)
+            results[i]["inside"], results[i]["distance"] = overshoot <= 0, round(max(overshoot, 0.0), 1)
+
+    # Coalesce: only the newest record per officer reaches the database
+    latest = {}
+    for i in accepted:
+        oid, ts = records[i][0], records[i][3]
+        if oid not in latest or ts >= records[latest[oid]][3]:
+            latest[oid] = i
+    for i in accepted:
+        if latest[records[i][0]] != i:
+            results[i]["status"] = "superseded"
+
+    transitions = []
+    if live:
+        for i in sorted(deployed, key=lambda i: records[i][3]):
+            t = geofence_engine.observe(*records[i])
+            if t is not None:
+                transitions.append(t)
+
+    user_rows, dep_rows = [], []
+    for oid, i in latest.items():
+        _, lat, lon, ts = records[i]
+        user_rows.append({"id": oid, "last_known_lat": lat, "last_known_long": lon, "last_known_at": ts})
+        dep_id = targets[oid][3]
+        if dep_id is not None:
+            # The engine's hysteresis-filtered state wins over the raw reading
+            state = geofence_engine.get(oid)
+            inside = state.inside if state is not None and state.deployment_id == dep_id else results[i]["inside"]
+            dep_rows.append({"id": dep_id, "current_lat": lat, "current_long": lon, "last_checkin": ts,
+                             "status": "deployed" if inside else "out_of_bounds"})
+
+    if user_rows:
+        db.execute(update(models.User), user_rows)
+    if dep_rows:
+        db.execute(update(models.Deployment), dep_rows)
+    # Samples for officers that no longer exist would fail the foreign key and the whole commit with it
+    trail = [records[i] for i in sorted(accepted + history_only)] if history is None else [r for r in history if r[0] in targets]
+    if trail:
+        db.execute(insert(models.PositionSample), [{"officer_id": oid, "timestamp": ts, "lat": lat, "long": lon} for oid, lat, lon, ts in trail])
+    events = stage_transition_logs(db, transitions)
+    db.commit()
+    for row in user_rows:
+        # Bulk UPDATEs bypass the ORM flush hook, so refresh cached principals directly
+        principal_cache.patch(row["id"], last_known_lat=row["last_known_lat"], last_known_long=row["last_known_long"], last_known_at=row["last_known_at"])
+
+    publish_transition_events(events)
+    if not live:
+        return results
+    for oid, i in latest.items():
+        if targets[oid][1] == "field_officer":
+            officer_index.update(oid, records[i][1], records[i][2])
+        event_bus.publish("officer", {"id": oid, "current_lat": records[i][1], "current_long": records[i][2]},
+                          officer_id=oid, supervisor_id=targets[oid][2])
+    return results
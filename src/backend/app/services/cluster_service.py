@@ -0,0 +1,78 @@
+import math
+import os
+import threading
+import time
+
+CLUSTER_MAX_ZOOM = int(os.getenv("MAP_CLUSTER_MAX_ZOOM", "14"))  # at or above this, units are drawn individually
+CELL_PIXELS = int(os.getenv("MAP_CLUSTER_CELL_PIXELS", "64"))
+MAX_STALENESS_SECONDS = float(os.getenv("MAP_CLUSTER_MAX_STALENESS", "1.0"))
+
+
+def cell_size_deg(zoom):
+    """Grid spacing that spans about CELL_PIXELS screen pixels at a web-mercator zoom level."""
+    return 360.0 / (2 ** zoom) * CELL_PIXELS / 256
+
+
+def aggregate(points, zoom):
+    """
+    Bucket (lat, long, status_color) points into a fixed grid for `zoom`.
+
+    The grid is anchored at (0, 0), so a unit stays in the same cell while
+    the map pans. Each cluster is placed at its members' centroid and
+    carries a count per status color.
+    """
+    size = cell_size_deg(zoom)
+    cells = {}
+    for lat, lon, color in points:
+        key = (math.floor(lat / size), math.floor(lon / size))
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = {"lat": 0.0, "long": 0.0, "count": 0, "colors": {}}
+        cell["lat"] += lat
+        cell["long"] += lon
+        cell["count"] += 1
+        cell["colors"][color] = cell["colors"].get(color, 0) + 1
+    for cell in cells.values():
+        cell["lat"] /= cell["count"]
+        cell["long"] /= cell["count"]
+    return list(cells.values())
+
+
+def in_bbox(lat, lon, bbox):
+    if bbox is None:
+        return True
+    min_lat, min_lon, max_lat, max_lon = bbox
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+class ClusterCache:
+    """
+    Built cluster layers per (scope, zoom).
+
+    An entry is reused while the event bus version is unchanged, and for up
+    to `max_staleness` seconds after it moves on, so a fleet checking in
+    every second rebuilds each layer at most once per interval however many
+    dashboards are polling.
+    """
+
+    def __init__(self, max_staleness=MAX_STALENESS_SECONDS):
+        self.max_staleness = max_staleness
+        self._entries = {}  # (scope, zoom) -> (version, built_at, layer)
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and (entry[0] == version or now - entry[1] < self.max_staleness):
+            return entry[2]
+        layer = build()
+        with self._lock:
+            self._entries[key] = (version, now, layer)
+        return layer
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cluster_cache = ClusterCache()
@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import defaultdict
+
+from .position_index import PositionIndex
+
+DISPATCH_MAX_RADIUS_METERS = float(os.getenv("DISPATCH_MAX_RADIUS", "50000"))
+DISPATCH_CELL_DEG = float(os.getenv("DISPATCH_CELL_DEG", "0.01"))     # ~1.1 km; finer than the broadcast index so dense areas stay cheap
+DISPATCH_SPEED_KMH = float(os.getenv("DISPATCH_SPEED_KMH", "30"))   # average response speed in traffic
+DISPATCH_DETOUR_FACTOR = float(os.getenv("DISPATCH_DETOUR", "1.3"))  # road distance / straight-line distance
+
+
+def eta_minutes(distance_meters):
+    """Rough travel time: straight-line distance stretched to road distance at a city response speed."""
+    return distance_meters * DISPATCH_DETOUR_FACTOR / (DISPATCH_SPEED_KMH * 1000 / 60)
+
+
+class DispatchIndex:
+    """
+    Positions of units free for dispatch: field officers with no active
+    deployment who are neither on leave nor waiting on a leave request (the
+    roster's yellow units the deployment panel offers).
+
+    Loaded from the database on startup and then kept current from the event
+    bus: every write that changes a unit's availability publishes its roster
+    row (with status_color), and check-ins publish the new position, so a
+    suggestion never touches the database. Units are indexed force-wide and
+    per supervisor, so a supervisor's query never wades through other
+    jurisdictions' units.
+    """
+
+    def __init__(self, cell_deg=DISPATCH_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.positions = PositionIndex(cell_deg)
+        self._by_supervisor = defaultdict(lambda: PositionIndex(self.cell_deg))
+        self._available = set()
+        self._supervisor = {}  # officer_id -> supervisor_id
+        self._lock = threading.Lock()
+
+    def _place(self, oid, lat, lon):
+        self.positions.update(oid, lat, lon)
+        self._by_supervisor[self._supervisor.get(oid)].update(oid, lat, lon)
+
+    def _remove(self, oid):
+        self.positions.remove(oid)
+        self._by_supervisor[self._supervisor.get(oid)].remove(oid)
+
+    def rebuild(self, rows):
+        """Reload from (officer_id, supervisor_id, lat, long, available) rows."""
+        with self._lock:
+            self.positions.clear()
+            self._by_supervisor.clear()
+            self._available.clear()
+            self._supervisor.clear()
+            for oid, supervisor_id, lat, lon, available in rows:
+                self._supervisor[oid] = supervisor_id
+                if available:
+                    self._available.add(oid)
+                    self._place(oid, lat, lon)
+
+    def on_event(self, ev):
+        """Event bus listener."""
+        if ev.kind != "officer":
+            return
+        data, oid = ev.data, ev.data["id"]
+        with self._lock:
+            if ev.supervisor_id is not None and self._supervisor.get(oid) != ev.supervisor_id:
+                position = self.positions.get(oid)
+                self._remove(oid)
+                self._supervisor[oid] = ev.supervisor_id
+                if position is not None:
+                    self._place(oid, *position)
+            if "status_color" in data:
+                if data["status_color"] == "yellow" and not data.get("leave_requested"):
+                    self._available.add(oid)
+                else:
+                    self._available.discard(oid)
+                    self._remove(oid)
+            if oid in self._available and "current_lat" in data:
+                self._place(oid, data["current_lat"], data.get("current_long"))
+
+    def nearest(self, lat, lon, k, max_radius_meters=DISPATCH_MAX_RADIUS_METERS, supervisor_id=None):
+        """Up to k free units [(officer_id, distance_m)], nearest first; supervisor_id limits them to one jurisdiction."""
+        if supervisor_id is None:
+            return self.positions.nearest(lat, lon, k, max_radius_meters)
+        index = self._by_supervisor.get(supervisor_id)
+        return index.nearest(lat, lon, k, max_radius_meters) if index is not None else []
+
+
+dispatch_index = DispatchIndex()
@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import json
+import threading
+from dataclasses import dataclass, field
+
+from fastapi.encoders import jsonable_encoder
+
+QUEUE_SIZE = 1000
+KEEPALIVE_SECONDS = 15
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+KEEPALIVE_FRAME = ": keepalive\n\n"
+
+
+@dataclass
+class Event:
+    seq: int
+    kind: str  # "officer" (partial roster row keyed by id), "ping" or "log"
+    data: dict
+    officer_id: int = None
+    supervisor_id: int = None
+    receiver_id: int = None
+
+    def to_sse(self):
+        return f"id: {self.seq}\nevent: {self.kind}\ndata: {json.dumps(jsonable_encoder(self.data))}\n\n"
+
+
+@dataclass(eq=False)
+class Subscriber:
+    user_id: int
+    role: str
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(QUEUE_SIZE))
+    overflowed: bool = False
+
+    def can_see(self, ev: Event):
+        if ev.receiver_id is not None:
+            return ev.receiver_id == self.user_id
+        if ev.officer_id is None:
+            return True  # global mission log
+        if ev.kind == "log":
+            return ev.officer_id == self.user_id  # personal logs mirror /officer/logs
+        if self.role == "supervisor":
+            return ev.supervisor_id == self.user_id
+        return True  # head officer and field units see the whole roster, like /status/all
+
+    def deliver(self, ev: Event):
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(ev)
+
+    async def next_frame(self, timeout=KEEPALIVE_SECONDS):
+        """Next SSE frame: a queued event, a keepalive after `timeout` idle seconds, or one resync after an overflow."""
+        if self.overflowed:
+            # Slow consumer: drop the backlog and ask the client to refetch a snapshot
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return RESYNC_FRAME
+        try:
+            ev = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return KEEPALIVE_FRAME
+        return ev.to_sse()
+
+
+class EventBus:
+    """
+    Fan-out of roster/ping/log deltas to streaming subscribers.
+
+    publish() is thread-safe and may be called from sync endpoints running in
+    the threadpool or from the location flusher; every subscriber whose
+    jurisdiction covers the event gets it queued on its own loop.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._listeners = []
+        self.version = 0
+
+    def add_listener(self, fn):
+        """Call fn(event) synchronously on every publish, e.g. to invalidate caches."""
+        self._listeners.append(fn)
+
+    def subscribe(self, user_id, role):
+        sub = Subscriber(user_id=user_id, role=role, loop=asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, kind, data, officer_id=None, supervisor_id=None, receiver_id=None):
+        with self._lock:
+            ev = Event(next(self._seq), kind, data, officer_id, supervisor_id, receiver_id)
+            self.version = ev.seq
+            targets = [s for s in self._subscribers if s.can_see(ev)]
+        for fn in self._listeners:
+            fn(ev)
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, ev)
+            except RuntimeError:
+                self.unsubscribe(sub)  # loop already closed
+        return ev
+
+
+event_bus = EventBus()
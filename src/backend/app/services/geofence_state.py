@@ -0,0 +1,164 @@
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from .. import models
+from . import geofencing_service, zone_service
+from .event_service import event_bus
+
+HYSTERESIS_METERS = float(os.getenv("GEOFENCE_HYSTERESIS_METERS", "20"))
+DWELL_SECONDS = float(os.getenv("GEOFENCE_DWELL_SECONDS", "0"))
+
+
+@dataclass
+class ZoneState:
+    deployment_id: int
+    officer_id: int
+    supervisor_id: Optional[int]
+    target_lat: float
+    target_long: float
+    radius: float
+    polygon: Optional[List] = None     # polygon geofence replacing the target circle
+    inside: Optional[bool] = None      # None until the first position fix
+    distance: Optional[float] = None
+    candidate: Optional[bool] = None   # pending flip waiting out the dwell time
+    candidate_since: Optional[datetime] = None
+
+
+@dataclass
+class Transition:
+    officer_id: int
+    supervisor_id: Optional[int]
+    inside: bool
+    distance: float
+
+
+class GeofenceStateEngine:
+    """
+    Inside/outside state of every active deployment, kept in memory.
+
+    Each new position is compared against the cached state; a breach only
+    counts once the officer is more than `hysteresis` meters past the
+    boundary (and a return once they are that far back inside), and the
+    flipped reading must persist for `dwell` seconds before it becomes a
+    transition. Reads use the cached state and never redo the distance math.
+
+    Polygon deployments use the signed distance to the polygon boundary in
+    place of the circle's distance-minus-radius; everything else is shared.
+    """
+
+    def __init__(self, hysteresis=HYSTERESIS_METERS, dwell=DWELL_SECONDS):
+        self.hysteresis = hysteresis
+        self.dwell = dwell
+        self._states = {}  # officer_id -> ZoneState
+        self._lock = threading.Lock()
+
+    def get(self, officer_id):
+        return self._states.get(officer_id)
+
+    @staticmethod
+    def _measure(state, lat, lon):
+        """(distance to report, meters past the boundary: negative while inside)."""
+        if state.polygon:
+            overshoot = zone_service.signed_distance_to_polygon(lat, lon, state.polygon)
+            return max(overshoot, 0.0), overshoot
+        dist = geofencing_service.calculate_distance(lat, lon, state.target_lat, state.target_long)
+        return dist, dist - state.radius
+
+    def load(self, rows):
+        """
+        Reset from (deployment_id, officer_id, supervisor_id, target_lat, target_long, radius, lat, long, polygon)
+        rows, evaluating every known position against a circle in one vectorized pass.
+        """
+        rows = list(rows)
+        inside, dists = geofencing_service.evaluate_geofences(
+            [r[6] for r in rows], [r[7] for r in rows], [r[3] for r in rows], [r[4] for r in rows], [r[5] for r in rows]
+        )
+        states = {}
+        for r, ok, dist in zip(rows, inside.tolist(), dists.tolist()):
+            state = ZoneState(r[0], r[1], r[2], r[3], r[4], r[5], polygon=r[8])
+            if r[6] is not None and r[7] is not None:
+                if state.polygon:
+                    dist, overshoot = self._measure(state, r[6], r[7])
+                    ok = overshoot <= 0
+                state.inside, state.distance = ok, dist
+            states[r[1]] = state
+        with self._lock:
+            self._states = states
+
+    def prepare(self, deployment_id, officer_id, supervisor_id, target_lat, target_long, radius, lat=None, lon=None, polygon=None):
+        """State for a new deployment, measured against the officer's position but not tracked until install()."""
+        state = ZoneState(deployment_id, officer_id, supervisor_id, target_lat, target_long, radius, polygon=polygon)
+        if lat is not None and lon is not None:
+            state.distance, overshoot = self._measure(state, lat, lon)
+            state.inside = overshoot <= 0
+        return state
+
+    def install(self, states):
+        """Start tracking prepared states, e.g. once their deployments are committed."""
+        with self._lock:
+            for state in states:
+                self._states[state.officer_id] = state
+
+    def register(self, *args, **kwargs):
+        state = self.prepare(*args, **kwargs)
+        self.install([state])
+        return state
+
+    def drop(self, officer_id):
+        with self._lock:
+            self._states.pop(officer_id, None)
+
+    def observe(self, officer_id, lat, lon, ts=None):
+        """Feed one position; returns a Transition when the officer crosses the boundary, else None."""
+        state = self._states.get(officer_id)
+        if state is None:
+            return None
+        ts = ts or datetime.utcnow()
+        dist, overshoot = self._measure(state, lat, lon)
+        with self._lock:
+            state.distance = dist
+            if state.inside is None:
+                # First fix after deployment: only an outside reading is worth an alert
+                state.inside = overshoot <= 0
+                return None if state.inside else Transition(officer_id, state.supervisor_id, False, dist)
+
+            if state.inside:
+                flipped = overshoot > self.hysteresis
+            else:
+                flipped = overshoot <= -min(self.hysteresis, state.radius)
+            if not flipped:
+                state.candidate, state.candidate_since = None, None
+                return None
+            if state.candidate is None:
+                state.candidate, state.candidate_since = not state.inside, ts
+            if (ts - state.candidate_since).total_seconds() < self.dwell:
+                return None
+            state.inside = not state.inside
+            state.candidate, state.candidate_since = None, None
+            return Transition(officer_id, state.supervisor_id, state.inside, dist)
+
+
+def stage_transition_logs(db, transitions):
+    """Add a NotificationLog row per transition (caller commits); returns events to publish afterwards."""
+    events = []
+    for t in transitions:
+        level, message = ("SUCCESS", "RETURNED TO ZONE") if t.inside else ("ALERT", f"BOUNDARY BREACH ({int(t.distance)}m)")
+        entry = models.NotificationLog(level=level, message=message, user_id=t.officer_id, timestamp=datetime.utcnow())
+        db.add(entry)
+        events.append((t, entry))
+    if events:
+        db.flush()
+    return [(t, {"id": e.id, "timestamp": e.timestamp, "level": e.level, "message": e.message}) for t, e in events]
+
+
+def publish_transition_events(events):
+    for t, log in events:
+        event_bus.publish("officer", {"id": t.officer_id, "status_color": "green" if t.inside else "red"},
+                          officer_id=t.officer_id, supervisor_id=t.supervisor_id)
+        event_bus.publish("log", log, officer_id=t.officer_id)
+
+
+geofence_engine = GeofenceStateEngine()
@@ -1,5 +1,10 @@
 import math
 
+import numpy as np
+
+from .request_metrics import timed
+
+@timed("haversine")
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
     Haversine formula to calculate distance between two points in meters.
@@ -22,4 +27,40 @@ def calculate_distance(lat1, lon1, lat2, lon2):
 
 def is_inside_geofence(current_lat, current_lon, target_lat, target_lon, radius_meters):
     distance = calculate_distance(current_lat, current_lon, target_lat, target_lon)
-    return distance <= radius_meters, distance
\ No newline at end of file
+    return distance <= radius_meters, distance
+
+@timed("haversine")
+def haversine_array(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine over NumPy arrays (or scalars that broadcast).
+    Returns distances in meters; NaN inputs yield NaN distances. Same
+    operation order as calculate_distance, so both agree to the last bit or two.
+    """
+    R = 6371000
+    lat1, lon1, lat2, lon2 = (np.asarray(x, dtype=np.float64) for x in (lat1, lon1, lat2, lon2))
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = np.radians(lat2 - lat1)
+    delta_lambda = np.radians(lon2 - lon1)
+
+    a = np.sin(delta_phi / 2.0) ** 2 + \
+        np.cos(phi1) * np.cos(phi2) * \
+        np.sin(delta_lambda / 2.0) ** 2
+
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+
+def evaluate_geofences(current_lats, current_lons, target_lats, target_lons, radii):
+    """
+    Batch counterpart of is_inside_geofence: one vectorized pass over N
+    officer positions against their N deployment centres/radii.
+    Returns (inside, distances) arrays. Missing positions (None/NaN) are
+    reported as outside with a NaN distance.
+    """
+    lats = np.asarray(current_lats, dtype=np.float64)
+    lons = np.asarray(current_lons, dtype=np.float64)
+    distances = haversine_array(lats, lons, target_lats, target_lons)
+    with np.errstate(invalid="ignore"):
+        inside = distances <= np.asarray(radii, dtype=np.float64)
+    return inside, distances
@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from . import checkin_service
+from .metrics_service import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.getenv("LOCATION_FLUSH_INTERVAL", "1.0"))
+FLUSH_BATCH_SIZE = int(os.getenv("LOCATION_FLUSH_BATCH", "500"))
+FLUSH_MAX_ATTEMPTS = int(os.getenv("LOCATION_FLUSH_MAX_ATTEMPTS", "5"))
+
+DROPPED = REGISTRY.counter("location_flush_dropped_total", "Buffered fixes discarded after repeated flush failures")
+
+PendingCheckin = namedtuple("PendingCheckin", "officer_id latitude longitude timestamp")
+
+
+class LocationBuffer:
+    """
+    Write-behind store for the newest position of each officer.
+
+    /checkin records into memory in O(1); a background thread persists the
+    pending fixes through checkin_service.apply_checkins every
+    `flush_interval` seconds, or sooner once `flush_batch` fixes are
+    pending. Every fix reaches the position history while only the newest
+    per officer updates the live rows. Entries stay readable until their
+    flush has committed, so reads never fall back to an older database value
+    mid-flush.
+
+    A batch that fails `max_attempts` flushes in a row is logged and
+    dropped, so one bad fix can't hold back every later position.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL_SECONDS, flush_batch=FLUSH_BATCH_SIZE, max_attempts=FLUSH_MAX_ATTEMPTS):
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_attempts = max_attempts
+        self._failures = 0  # consecutive failed flushes
+        self._pending = {}  # officer_id -> PendingCheckin
+        self._trail = []    # every PendingCheckin since the last flush, for the position history
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._session_factory = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, officer_id, lat, lon, ts=None):
+        entry = PendingCheckin(officer_id, lat, lon, ts or datetime.utcnow())
+        with self._lock:
+            current = self._pending.get(officer_id)
+            if current is None or entry.timestamp >= current.timestamp:
+                self._pending[officer_id] = entry
+            self._trail.append(entry)
+            size = len(self._trail)
+        if size >= self.flush_batch:
+            self._wake.set()
+
+    def position(self, officer_id, default=(None, None)):
+        """Newest (lat, long) for the officer if one is waiting to be flushed."""
+        entry = self._pending.get(officer_id)
+        return (entry.latitude, entry.longitude) if entry is not None else default
+
+    def timestamp(self, officer_id):
+        """Time of the officer's fix waiting to be flushed, or None."""
+        entry = self._pending.get(officer_id)
+        return entry.timestamp if entry is not None else None
+
+    def discard_older(self, officer_id, ts):
+        """Drop a pending entry superseded by a position already written elsewhere."""
+        with self._lock:
+            current = self._pending.get(officer_id)
+            if current is not None and current.timestamp <= ts:
+                del self._pending[officer_id]
+
+    def flush(self):
+        if self._session_factory is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                snapshot = list(self._pending.values())
+                trail, self._trail = self._trail, []
+            if not snapshot and not trail:
+                return 0
+            db = self._session_factory()
+            try:
+                checkin_service.apply_checkins(db, snapshot, live=False, history=trail)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.max_attempts:
+                    with self._lock:
+                        self._trail[:0] = trail  # retry with the next flush
+                else:
+                    self._failures = 0
+                    self._release(snapshot)
+                    DROPPED.inc(len(snapshot), kind="position")
+                    DROPPED.inc(len(trail), kind="history")
+                    logger.error("Dropping %d buffered positions and %d history samples after %d failed flushes (officers %s)",
+                                 len(snapshot), len(trail), self.max_attempts, sorted({e.officer_id for e in trail + snapshot})[:20])
+                raise
+            finally:
+                db.close()
+            self._failures = 0
+            self._release(snapshot)
+            return len(snapshot)
+
+    def _release(self, snapshot):
+        with self._lock:
+            for entry in snapshot:
+                # Keep anything that was overwritten by a newer check-in while we were writing
+                if self._pending.get(entry.officer_id) is entry:
+                    del self._pending[entry.officer_id]
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Location flush failed (%d of %d attempts)", self._failures or self.max_attempts, self.max_attempts)
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="location-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and persist whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+location_buffer = LocationBuffer()
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import and_, asc, desc, or_
+
+CURSOR_SEPARATOR = "~"
+
+
+def encode_cursor(ts, row_id):
+    """Opaque position of a row in a (timestamp, id) newest-first timeline."""
+    return f"{ts.isoformat()}{CURSOR_SEPARATOR}{row_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        ts, row_id = cursor.rsplit(CURSOR_SEPARATOR, 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def keyset(ts_col, id_col, before=None, since=None):
+    """
+    Criteria for rows strictly older than `before` and/or strictly newer than
+    `since` (decoded cursors). Written as a timestamp range plus a tie-break so
+    the timestamp index still drives the scan.
+    """
+    criteria = []
+    if before is not None:
+        ts, row_id = before
+        criteria.append(and_(ts_col <= ts, or_(ts_col < ts, id_col < row_id)))
+    if since is not None:
+        ts, row_id = since
+        criteria.append(and_(ts_col >= ts, or_(ts_col > ts, id_col > row_id)))
+    return criteria
+
+
+def newest_first(ts_col, id_col):
+    return desc(ts_col), desc(id_col)
+
+
+def page_order(ts_col, id_col, since=None):
+    """
+    ORDER BY for one page. A since= page is read oldest-first from the cursor,
+    so LIMIT keeps the rows right after it rather than the newest ones and a
+    caller can page forward through a gap; flip it back with `as_newest_first`.
+    """
+    return (asc(ts_col), asc(id_col)) if since is not None else newest_first(ts_col, id_col)
+
+
+def as_newest_first(rows, since=None):
+    rows = list(rows)
+    return rows[::-1] if since is not None else rows
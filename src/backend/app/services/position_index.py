@@ -0,0 +1,132 @@
+import math
+import os
+import threading
+
+import numpy as np
+
+from .geofencing_service import haversine_array
+
+METERS_PER_DEGREE_LAT = 111320.0
+CELL_SIZE_DEG = float(os.getenv("POSITION_INDEX_CELL_DEG", "0.05"))  # ~5.5 km of latitude
+
+
+class PositionIndex:
+    """
+    Grid bucket map of officer positions. Each officer lives in exactly one
+    lat/long cell, so a radius query only touches the cells overlapping the
+    search box instead of scanning the whole force.
+    """
+
+    def __init__(self, cell_deg=CELL_SIZE_DEG):
+        self.cell_deg = cell_deg
+        self._positions = {}  # officer_id -> (lat, long)
+        self._cells = {}      # (row, col) -> set(officer_id)
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def get(self, officer_id):
+        return self._positions.get(officer_id)
+
+    def update(self, officer_id, lat, lon):
+        if lat is None or lon is None:
+            self.remove(officer_id)
+            return
+        cell = self._cell(lat, lon)
+        with self._lock:
+            old = self._positions.get(officer_id)
+            if old is not None:
+                old_cell = self._cell(*old)
+                if old_cell != cell:
+                    self._discard(old_cell, officer_id)
+            self._positions[officer_id] = (lat, lon)
+            self._cells.setdefault(cell, set()).add(officer_id)
+
+    def remove(self, officer_id):
+        with self._lock:
+            old = self._positions.pop(officer_id, None)
+            if old is not None:
+                self._discard(self._cell(*old), officer_id)
+
+    def _discard(self, cell, officer_id):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(officer_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        with self._lock:
+            self._positions.clear()
+            self._cells.clear()
+
+    def within(self, lat, lon, radius_meters):
+        """Return [(officer_id, distance_m)] for officers within radius_meters, nearest first."""
+        dlat = radius_meters / METERS_PER_DEGREE_LAT
+        dlon = radius_meters / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        r0, c0 = self._cell(lat - dlat, lon - dlon)
+        r1, c1 = self._cell(lat + dlat, lon + dlon)
+        ids, coords = [], []
+        with self._lock:
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    for oid in self._cells.get((r, c), ()):
+                        ids.append(oid)
+                        coords.append(self._positions[oid])
+        if not ids:
+            return []
+        pts = np.asarray(coords, dtype=np.float64)
+        dists = haversine_array(lat, lon, pts[:, 0], pts[:, 1])
+        order = np.argsort(dists)
+        return [(ids[i], float(dists[i])) for i in order if dists[i] <= radius_meters]
+
+    def nearest(self, lat, lon, k, max_radius_meters):
+        """
+        Return up to k [(officer_id, distance_m)] within max_radius_meters,
+        nearest first.
+
+        Rings of cells are searched outwards from the target's cell; the
+        search stops once the k-th hit is closer than anything an unsearched
+        ring could hold, so a query touches a handful of cells however large
+        the force is.
+        """
+        r0, c0 = self._cell(lat, lon)
+        # Narrowest side of a cell; every point within ring * span of the target has been seen after that ring
+        span = self.cell_deg * METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6)
+        hits, visited = [], 0
+        for ring in range(int(max_radius_meters // span) + 2):
+            ids, coords = [], []
+            with self._lock:
+                for r in range(r0 - ring, r0 + ring + 1):
+                    edge = r in (r0 - ring, r0 + ring)
+                    for c in (range(c0 - ring, c0 + ring + 1) if edge else (c0 - ring, c0 + ring)):
+                        bucket = self._cells.get((r, c))
+                        if bucket:
+                            visited += 1
+                            for oid in bucket:
+                                ids.append(oid)
+                                coords.append(self._positions[oid])
+                exhausted = visited >= len(self._cells)
+            if ids:
+                pts = np.asarray(coords, dtype=np.float64)
+                dists = haversine_array(lat, lon, pts[:, 0], pts[:, 1])
+                hits.extend((float(d), oid) for d, oid in zip(dists, ids) if d <= max_radius_meters)
+                hits.sort()
+                del hits[k:]
+            if exhausted or (len(hits) >= k and hits[-1][0] <= ring * span):
+                break
+        return [(oid, d) for d, oid in hits]
+
+    def rebuild(self, rows):
+        """Reload from (officer_id, lat, long) rows, e.g. on startup."""
+        self.clear()
+        for oid, lat, lon in rows:
+            self.update(oid, lat, lon)
+
+
+# Process-wide index of field officer positions, fed by /checkin
+officer_index = PositionIndex()
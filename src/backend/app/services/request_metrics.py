@@ -0,0 +1,142 @@
+import contextvars
+import functools
+import logging
+import os
+import time
+
+from sqlalchemy import event
+
+from .metrics_service import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 disables the slow-request log
+SLOW_REQUEST_MAX_SQL = int(os.getenv("SLOW_REQUEST_MAX_SQL", "50"))
+
+PHASES = ("db", "argon2", "haversine")
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250)
+
+REQUESTS = REGISTRY.counter("http_requests_total", "Requests by route, method and status")
+LATENCY = REGISTRY.histogram("http_request_seconds", "Request latency by route")
+STATEMENTS = REGISTRY.histogram("http_request_db_statements", "SQL statements issued per request", STATEMENT_BUCKETS)
+PHASE_SECONDS = REGISTRY.histogram("http_request_phase_seconds", "Per-request time spent in the database, argon2 and haversine")
+
+
+class RequestStats:
+    """What one request spent, collected by the hooks below while it runs."""
+    __slots__ = ("statements", "seconds", "sql")
+
+    def __init__(self, capture_sql=False):
+        self.statements = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.sql = [] if capture_sql else None  # (seconds, statement) when the slow log is on
+
+
+# Copied into threadpool workers along with the rest of the request context,
+# so sync endpoints and dependencies report into the same object
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def current():
+    return _current.get()
+
+
+def timed(phase):
+    """Decorator adding a call's duration to the running request's `phase` time; free outside requests."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats.seconds[phase] += time.perf_counter() - started
+        return inner
+    return wrap
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("request_metrics_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats, started = _current.get(), conn.info.get("request_metrics_started")
+    if stats is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats.statements += 1
+    stats.seconds["db"] += elapsed
+    if stats.sql is not None and len(stats.sql) < SLOW_REQUEST_MAX_SQL:
+        stats.sql.append((elapsed, statement))
+
+
+def _on_error(exception_context):
+    started = exception_context.connection.info.get("request_metrics_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Count statements and database time per request on a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    event.listen(engine, "handle_error", _on_error)
+
+
+class RequestMetricsMiddleware:
+    """
+    Per-route latency, SQL statement count and time spent in the database,
+    argon2 and haversine, exported through REGISTRY. Routes are labelled by
+    their template (/leave/approve/{oid}), so label cardinality stays fixed.
+
+    With SLOW_REQUEST_MS set, requests slower than that are logged together
+    with the SQL they issued. Event streams are counted but not timed.
+    """
+
+    def __init__(self, app, slow_ms=SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(capture_sql=self.slow_ms > 0)
+        token = _current.set(stats)
+        response = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["streaming"] = any(k == b"content-type" and v.startswith(b"text/event-stream") for k, v in message.get("headers", ()))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self.record(scope, stats, response, time.perf_counter() - started)
+
+    def record(self, scope, stats, response, elapsed):
+        # The router leaves the matched route in the scope; anything else shares one label
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope["method"]
+        REQUESTS.inc(route=route, method=method, status=response["status"])
+        if response["streaming"]:
+            return
+        LATENCY.observe(elapsed, route=route, method=method)
+        STATEMENTS.observe(stats.statements, route=route, method=method)
+        for phase, seconds in stats.seconds.items():
+            PHASE_SECONDS.observe(seconds, route=route, method=method, phase=phase)
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            logger.warning(
+                "Slow request %s %s -> %s: %.1f ms, %d SQL statements (%.1f ms), argon2 %.1f ms, haversine %.1f ms%s",
+                method, route, response["status"], elapsed * 1000, stats.statements, stats.seconds["db"] * 1000,
+                stats.seconds["argon2"] * 1000, stats.seconds["haversine"] * 1000,
+                "".join(f"\n  [{s * 1000:.1f} ms] {sql}" for s, sql in stats.sql or ()),
+            )
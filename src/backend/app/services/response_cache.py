@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+from fastapi import Response
+
+from .metrics_service import REGISTRY
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+# Upper bound on staleness after writes that bypass the event bus (scripts, retention, manual SQL)
+RESPONSE_CACHE_MAX_AGE = float(os.getenv("RESPONSE_CACHE_MAX_AGE", "10"))
+
+ROSTER_ALL = "roster:all"
+LOG_TOPICS = "logs:"  # prefix shared by every log topic
+GLOBAL_LOGS = LOG_TOPICS + "global"
+
+
+def roster_topic(supervisor_id):
+    return f"roster:{supervisor_id}"
+
+
+def log_topic(user_id):
+    return f"{LOG_TOPICS}{user_id}"
+
+
+@dataclass
+class CachedResponse:
+    version: tuple
+    etag: str
+    body: bytes
+    stored_at: float
+
+
+class ResponseCache:
+    """
+    Serialized GET responses per jurisdiction, tagged with version counters.
+
+    Every response depends on a few topics (the whole roster, one
+    supervisor's roster, the global log, one officer's log). The event bus
+    bumps the matching counters on each publish, so an entry is current
+    exactly while its topics' versions are unchanged. A current entry
+    answers If-None-Match with 304 and everyone else with the stored bytes,
+    without touching the database or re-serializing. ETags are content
+    hashes, so they are strong.
+
+    Writes that never reach the event bus (the reset script, roster imports,
+    manual SQL) can't bump anything, so entries also expire `max_age`
+    seconds after they were built. A rebuild with unchanged content keeps
+    its ETag and still answers 304.
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, max_age=RESPONSE_CACHE_MAX_AGE):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._versions = defaultdict(int)  # topic -> counter
+        self._entries = OrderedDict()      # (topics, query) -> CachedResponse
+        self._lock = threading.Lock()
+        self.requests = REGISTRY.counter("response_cache_requests_total", "Cacheable GETs by outcome (not_modified, hit, miss)")
+
+    def bump(self, *topics):
+        with self._lock:
+            for topic in topics:
+                self._versions[topic] += 1
+
+    def bump_prefix(self, prefix):
+        """Invalidate every topic starting with `prefix`, e.g. all logs after a purge."""
+        with self._lock:
+            for topic in self._versions:
+                if topic.startswith(prefix):
+                    self._versions[topic] += 1
+
+    def on_event(self, ev):
+        """Event bus listener: invalidate whatever the published change is visible in."""
+        if ev.kind == "officer":
+            self.bump(ROSTER_ALL, *([roster_topic(ev.supervisor_id)] if ev.supervisor_id is not None else []))
+        elif ev.kind == "log":
+            self.bump(GLOBAL_LOGS if ev.officer_id is None else log_topic(ev.officer_id))
+
+    def version(self, topics):
+        return tuple(self._versions[t] for t in topics)
+
+    def lookup(self, topics, query=""):
+        """(current entry or None, version to store a fresh build under). Read the version before building."""
+        topics = tuple(topics)
+        with self._lock:
+            version = self.version(topics)
+            entry = self._entries.get((topics, query))
+            if entry is not None and entry.version == version and (self.max_age <= 0 or time.monotonic() - entry.stored_at < self.max_age):
+                self._entries.move_to_end((topics, query))
+                return entry, version
+        return None, version
+
+    def store(self, topics, query, version, body):
+        entry = CachedResponse(version, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"', body, time.monotonic())
+        with self._lock:
+            self._entries[(tuple(topics), query)] = entry
+            self._entries.move_to_end((tuple(topics), query))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, entry, if_none_match, outcome):
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if if_none_match and entry.etag in [t.strip() for t in if_none_match.split(",")]:
+            self.requests.inc(outcome="not_modified")
+            return Response(status_code=304, headers=headers)
+        self.requests.inc(outcome=outcome)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
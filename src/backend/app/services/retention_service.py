@@ -0,0 +1,177 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, desc, select
+
+from .. import models
+from .metrics_service import REGISTRY
+from .response_cache import response_cache, LOG_TOPICS
+
+logger = logging.getLogger(__name__)
+
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "90"))
+LOG_RETENTION_MAX_ROWS = int(os.getenv("LOG_RETENTION_MAX_ROWS", "1000000"))
+PING_RETENTION_DAYS = float(os.getenv("PING_RETENTION_DAYS", "7"))
+PING_RETENTION_MAX_ROWS = int(os.getenv("PING_RETENTION_MAX_ROWS", "200000"))
+HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "30"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH", "1000"))
+RETENTION_PAUSE_SECONDS = float(os.getenv("RETENTION_PAUSE", "0.05"))
+ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "./archive")  # empty string disables archiving
+
+DELETED = REGISTRY.counter("retention_rows_deleted_total", "Rows removed by the retention worker")
+ARCHIVED = REGISTRY.counter("retention_rows_archived_total", "Rows written to retention archives")
+
+
+@dataclass
+class RetentionPolicy:
+    """Rows of `model` expire once older than `max_age_days` or beyond the newest `max_rows` (0 disables either)."""
+    model: type
+    max_age_days: float
+    max_rows: int
+    criteria: list = field(default_factory=list)  # extra filters, e.g. only dismissed pings
+    cache_prefix: str = None  # cached responses showing these rows, invalidated as batches are deleted
+
+    @property
+    def table(self):
+        return self.model.__tablename__
+
+    def cutoff(self, db, now):
+        """Rows with a timestamp before this are expired; None when nothing is."""
+        ts = self.model.timestamp
+        cutoffs = []
+        if self.max_age_days:
+            cutoffs.append(now - timedelta(days=self.max_age_days))
+        if self.max_rows:
+            # Timestamp of the oldest row still inside the row budget (walks the timestamp index)
+            keep_from = db.execute(select(ts).where(*self.criteria).order_by(desc(ts)).offset(self.max_rows - 1).limit(1)).scalar()
+            if keep_from is not None:
+                cutoffs.append(keep_from)
+        return max(cutoffs) if cutoffs else None
+
+
+DEFAULT_POLICIES = [
+    RetentionPolicy(models.NotificationLog, LOG_RETENTION_DAYS, LOG_RETENTION_MAX_ROWS, cache_prefix=LOG_TOPICS),
+    # Active pings are still on someone's screen; only dismissed ones expire
+    RetentionPolicy(models.Ping, PING_RETENTION_DAYS, PING_RETENTION_MAX_ROWS, [models.Ping.is_active == False]),
+    RetentionPolicy(models.PositionSample, HISTORY_RETENTION_DAYS, 0),
+]
+
+
+def _row_dict(row):
+    return {c.key: getattr(row, c.key) for c in row.__mapper__.column_attrs}
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class RetentionWorker:
+    """
+    Background purge of expired logs, pings and position history.
+
+    Expired rows are deleted `batch_size` at a time, each batch in its own
+    short transaction, with a pause between batches so check-in writers are
+    never locked out for long. With an archive directory set, every batch is
+    appended to `<table>-<run timestamp>.jsonl.gz` before it is deleted; the
+    files are plain gzip JSON lines (one row per line) and can be read with
+    zcat, pandas.read_json(lines=True) or DuckDB. Archiving happens before
+    the delete, so a failed delete may archive the same rows again next run.
+    """
+
+    def __init__(self, policies=None, archive_dir=ARCHIVE_DIR, batch_size=RETENTION_BATCH_SIZE,
+                 interval=RETENTION_INTERVAL_SECONDS, pause=RETENTION_PAUSE_SECONDS):
+        self.policies = policies if policies is not None else DEFAULT_POLICIES
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread = None
+        self._session_factory = None
+
+    def _archive(self, policy, run_stamp, rows):
+        if not self.archive_dir:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{policy.table}-{run_stamp}.jsonl.gz")
+        # Appending adds a gzip member per batch; readers see one continuous stream
+        with gzip.open(path, "at", encoding="utf-8") as fh:
+            for row in rows:
+                fh.write(json.dumps(_row_dict(row), default=_json_default) + "\n")
+        ARCHIVED.inc(len(rows), table=policy.table)
+
+    def purge(self, db, policy, now=None, run_stamp=None):
+        """Delete (and archive) every expired row for one policy; returns the number removed."""
+        now = now or datetime.utcnow()
+        run_stamp = run_stamp or now.strftime("%Y%m%dT%H%M%S")
+        cutoff = policy.cutoff(db, now)
+        db.rollback()  # don't hold the read transaction open between batches
+        if cutoff is None:
+            return 0
+        model, removed = policy.model, 0
+        while not self._stop.is_set():
+            rows = db.execute(
+                select(model).where(model.timestamp < cutoff, *policy.criteria).order_by(model.timestamp).limit(self.batch_size)
+            ).scalars().all()
+            if not rows:
+                break
+            self._archive(policy, run_stamp, rows)
+            db.execute(delete(model).where(model.id.in_([r.id for r in rows])))
+            db.commit()
+            db.expunge_all()
+            if policy.cache_prefix:
+                response_cache.bump_prefix(policy.cache_prefix)
+            removed += len(rows)
+            DELETED.inc(len(rows), table=policy.table)
+            if len(rows) < self.batch_size:
+                break
+            self._stop.wait(self.pause)
+        return removed
+
+    def run_once(self, now=None):
+        if self._session_factory is None:
+            return {}
+        now = now or datetime.utcnow()
+        run_stamp = now.strftime("%Y%m%dT%H%M%S")
+        db = self._session_factory()
+        try:
+            removed = {p.table: self.purge(db, p, now, run_stamp) for p in self.policies}
+            if any(removed.values()) and db.get_bind().dialect.name == "sqlite":
+                # Hand the freed WAL pages back to the filesystem
+                db.connection().exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+                db.commit()
+        finally:
+            db.close()
+        if any(removed.values()):
+            logger.info("Retention purge removed %s", removed)
+        return removed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Retention purge failed; will retry next interval")
+
+    def start(self, session_factory):
+        self._session_factory = session_factory
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+retention_worker = RetentionWorker()
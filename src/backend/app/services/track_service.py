@@ -0,0 +1,43 @@
+import numpy as np
+
+from .zone_service import METERS_PER_DEGREE_LAT
+
+
+def douglas_peucker(lats, lons, tolerance):
+    """
+    Indices of the points kept when simplifying a track to within `tolerance`
+    meters (Douglas-Peucker). Coordinates are projected onto a local
+    equirectangular plane; the recursion runs on an explicit stack and each
+    segment's farthest point is found with one vectorized distance pass, so
+    tens of thousands of points simplify in milliseconds.
+    """
+    n = len(lats)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    y = (lats - lats[0]) * METERS_PER_DEGREE_LAT
+    x = (lons - lons[0]) * METERS_PER_DEGREE_LAT * np.cos(np.radians(lats.mean()))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        px, py = x[start + 1:end], y[start + 1:end]
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        seg = dx * dx + dy * dy
+        if seg == 0:
+            dists = np.hypot(px - x[start], py - y[start])
+        else:
+            # Distance to the segment (not the infinite line), so loops back to the start aren't dropped
+            t = np.clip(((px - x[start]) * dx + (py - y[start]) * dy) / seg, 0.0, 1.0)
+            dists = np.hypot(px - (x[start] + t * dx), py - (y[start] + t * dy))
+        far = int(np.argmax(dists))
+        if dists[far] > tolerance:
+            mid = start + 1 + far
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return np.flatnonzero(keep)
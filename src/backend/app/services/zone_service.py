@@ -0,0 +1,147 @@
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from .geofencing_service import calculate_distance
+
+METERS_PER_DEGREE_LAT = 111320.0
+CELL_SIZE_DEG = float(os.getenv("ZONE_INDEX_CELL_DEG", "0.1"))
+
+
+def bounding_box(polygon):
+    lats = [p[0] for p in polygon]
+    lons = [p[1] for p in polygon]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+def point_in_polygon(lat, lon, polygon):
+    """Even-odd ray casting over [[lat, long], ...] vertices (closed implicitly)."""
+    inside = False
+    n = len(polygon)
+    j = n - 1
+    for i in range(n):
+        yi, xi = polygon[i]
+        yj, xj = polygon[j]
+        if (yi > lat) != (yj > lat):
+            x_cross = xi + (lat - yi) * (xj - xi) / (yj - yi)
+            if lon < x_cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+def signed_distance_to_polygon(lat, lon, polygon):
+    """
+    Meters from the point to the polygon boundary: positive outside, negative
+    inside. Uses a local equirectangular projection, which is accurate to well
+    under a meter at deployment-zone scales.
+    """
+    kx = METERS_PER_DEGREE_LAT * math.cos(math.radians(lat))
+    ky = METERS_PER_DEGREE_LAT
+    best = float("inf")
+    n = len(polygon)
+    for i in range(n):
+        ay, ax = (polygon[i][0] - lat) * ky, (polygon[i][1] - lon) * kx
+        by, bx = (polygon[(i + 1) % n][0] - lat) * ky, (polygon[(i + 1) % n][1] - lon) * kx
+        dx, dy = bx - ax, by - ay
+        seg = dx * dx + dy * dy
+        t = 0.0 if seg == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / seg))
+        best = min(best, math.hypot(ax + t * dx, ay + t * dy))
+    return -best if point_in_polygon(lat, lon, polygon) else best
+
+
+def polygon_centre(polygon):
+    """Vertex centroid and the radius (meters) of the circle around it that encloses every vertex."""
+    lat = sum(p[0] for p in polygon) / len(polygon)
+    lon = sum(p[1] for p in polygon) / len(polygon)
+    return lat, lon, max(calculate_distance(lat, lon, p[0], p[1]) for p in polygon)
+
+
+@dataclass
+class IndexedZone:
+    id: int
+    name: str
+    kind: str
+    polygon: List[Tuple[float, float]]
+    supervisor_id: Optional[int] = None
+    bbox: Tuple[float, float, float, float] = field(init=False)
+
+    def __post_init__(self):
+        self.bbox = bounding_box(self.polygon)
+
+    def contains(self, lat, lon):
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            return False
+        return point_in_polygon(lat, lon, self.polygon)
+
+
+class ZoneIndex:
+    """
+    Grid over zone bounding boxes. A lookup visits one cell, then filters its
+    candidates by bounding box before running the point-in-polygon test, so
+    "which zones contain this point" stays cheap with thousands of zones.
+    """
+
+    def __init__(self, cell_deg=CELL_SIZE_DEG):
+        self.cell_deg = cell_deg
+        self._zones = {}  # zone_id -> IndexedZone
+        self._cells = {}  # (row, col) -> set(zone_id)
+        self._lock = threading.Lock()
+
+    def _cells_for(self, bbox):
+        min_lat, min_lon, max_lat, max_lon = bbox
+        r0, c0 = math.floor(min_lat / self.cell_deg), math.floor(min_lon / self.cell_deg)
+        r1, c1 = math.floor(max_lat / self.cell_deg), math.floor(max_lon / self.cell_deg)
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    def __len__(self):
+        return len(self._zones)
+
+    def add(self, zone: IndexedZone):
+        with self._lock:
+            self._remove(zone.id)
+            self._zones[zone.id] = zone
+            for cell in self._cells_for(zone.bbox):
+                self._cells.setdefault(cell, set()).add(zone.id)
+
+    def remove(self, zone_id):
+        with self._lock:
+            self._remove(zone_id)
+
+    def _remove(self, zone_id):
+        old = self._zones.pop(zone_id, None)
+        if old is None:
+            return
+        for cell in self._cells_for(old.bbox):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(zone_id)
+                if not bucket:
+                    del self._cells[cell]
+
+    def get(self, zone_id):
+        return self._zones.get(zone_id)
+
+    def zones(self, kind=None):
+        return [z for z in self._zones.values() if kind is None or z.kind == kind]
+
+    def containing(self, lat, lon, kind=None):
+        cell = (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+        with self._lock:
+            candidates = [self._zones[zid] for zid in self._cells.get(cell, ())]
+        return [z for z in candidates if (kind is None or z.kind == kind) and z.contains(lat, lon)]
+
+    def rebuild(self, rows):
+        """Reload from Zone model rows, e.g. on startup."""
+        with self._lock:
+            self._zones.clear()
+            self._cells.clear()
+        for row in rows:
+            self.add(IndexedZone(row.id, row.name, row.kind, [tuple(p) for p in json.loads(row.polygon)], row.supervisor_id))
+
+
+zone_index = ZoneIndex()
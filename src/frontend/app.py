@@ -6,6 +6,9 @@ import pandas as pd
 import time
 from datetime import datetime
 import os
+import json
+import threading
+from collections import deque
 
 # Defaults to localhost if not set, but allows Render to inject the real URL
 API_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
@@ -71,6 +74,133 @@ if 'map_zoom' not in st.session_state: st.session_state.map_zoom = 10
 if 'preview_coords' not in st.session_state: st.session_state.preview_coords = None
 if 'deploy_mode' not in st.session_state: st.session_state.deploy_mode = False
 if 'ping_target' not in st.session_state: st.session_state.ping_target = None
+if 'feed' not in st.session_state: st.session_state.feed = None
+if 'live' not in st.session_state: st.session_state.live = None
+if 'zones' not in st.session_state: st.session_state.zones = None
+if 'log_buffer' not in st.session_state: st.session_state.log_buffer = None
+if 'map_view' not in st.session_state: st.session_state.map_view = None
+if 'etags' not in st.session_state: st.session_state.etags = {}
+
+class LiveFeed:
+    """Background reader for the backend's /events/stream SSE feed; deltas are drained on each rerun."""
+    def __init__(self, token):
+        self.token = token
+        self.events = deque()
+        self.stopped = threading.Event()
+        self.connected = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                with requests.get(f"{API_URL}/events/stream", headers={"Authorization": f"Bearer {self.token}"}, stream=True, timeout=(5, 60)) as r:
+                    if r.status_code == 200:
+                        self.connected, kind = True, None
+                        for line in r.iter_lines(decode_unicode=True):
+                            if self.stopped.is_set(): return
+                            if line.startswith("event:"): kind = line[6:].strip()
+                            elif line.startswith("data:") and kind: self.events.append((kind, json.loads(line[5:]))); kind = None
+            except (requests.exceptions.RequestException, ValueError): pass
+            # Anything published while we were disconnected is lost, so ask for a fresh snapshot
+            if self.connected: self.events.append(("resync", {}))
+            self.connected = False
+            self.stopped.wait(3)
+
+    def drain(self):
+        out = []
+        while self.events: out.append(self.events.popleft())
+        return out
+
+    def close(self): self.stopped.set()
+
+def end_session():
+    if st.session_state.feed: st.session_state.feed.close()
+    st.session_state.token, st.session_state.feed, st.session_state.live, st.session_state.zones = None, None, None, None
+    st.session_state.log_buffer, st.session_state.map_view, st.session_state.etags = None, None, {}
+
+def jurisdiction_zones(headers):
+    """Server-side jurisdiction polygons; fetched once per session since they rarely change."""
+    if st.session_state.zones is None:
+        st.session_state.zones = requests.get(f"{API_URL}/zones", params={"kind": "jurisdiction"}, headers=headers).json()
+    return st.session_state.zones
+
+def invalidate_live():
+    """Force a snapshot on the next rerun, e.g. right after this client wrote something."""
+    st.session_state.live = None
+
+def conditional_get(path, headers, params=None):
+    """GET that revalidates with the last ETag; a 304 reuses the body we already hold."""
+    held = st.session_state.etags.get(path)  # one (params, etag, body) per path, so moving since= cursors don't pile up
+    etag = held[1] if held and held[0] == params else None
+    r = requests.get(f"{API_URL}{path}", params=params, headers={**headers, "If-None-Match": etag} if etag else headers)
+    if r.status_code == 304: return held[2]
+    body = r.json()
+    if r.headers.get("ETag"): st.session_state.etags[path] = (params, r.headers["ETag"], body)
+    return body
+
+def tail_logs(headers, path, limit):
+    """Local log buffer; after the first load only rows newer than the newest cursor we hold are fetched."""
+    buf = st.session_state.log_buffer
+    if buf is None or buf["path"] != path:
+        rows = conditional_get(path, headers, {"limit": limit})
+    else:
+        fresh = conditional_get(path, headers, {"limit": limit, "since": buf["cursor"]})
+        # since= returns the rows right after our cursor; a full page means there are newer ones still, so jump to the newest page
+        rows = conditional_get(path, headers, {"limit": limit}) if len(fresh) >= limit else fresh + [l for l in buf["rows"] if all(f['id'] != l['id'] for f in fresh)]
+    rows = rows[:limit]
+    cursor = next((l['cursor'] for l in rows if l.get('cursor')), buf["cursor"] if buf and buf["path"] == path else None)
+    st.session_state.log_buffer = {"path": path, "rows": rows, "cursor": cursor}
+    return list(rows)
+
+def suggest_units(headers, target, k):
+    """Nearest free units to the deployment target, from /dispatch/suggest; empty if the backend can't say."""
+    try:
+        r = requests.get(f"{API_URL}/dispatch/suggest", params={"lat": target[0], "long": target[1], "k": k}, headers=headers, timeout=5)
+        return r.json() if r.status_code == 200 else []
+    except requests.exceptions.RequestException: return []
+
+STATUS_HEX = {"green": "#2ea043", "red": "#da3633", "yellow": "#d29922", "blue": "#1f6feb"}
+
+def map_layer(headers):
+    """Server-side clusters (or individual units once zoomed in) for the view st_folium last reported."""
+    params = {"zoom": st.session_state.map_zoom}
+    view = st.session_state.map_view or {}
+    if view.get("zoom") != st.session_state.map_zoom: view = {}  # jumped elsewhere (e.g. LOCATE) since the last render
+    sw, ne = (view.get("bounds") or {}).get("_southWest") or {}, (view.get("bounds") or {}).get("_northEast") or {}
+    if sw.get("lat") is not None and ne.get("lat") is not None:
+        params.update(min_lat=sw["lat"], min_long=sw["lng"], max_lat=ne["lat"], max_long=ne["lng"])
+    return requests.get(f"{API_URL}/map/clusters", params=params, headers=headers).json()
+
+def fetch_snapshot(headers, field):
+    get = lambda path: requests.get(f"{API_URL}{path}", headers=headers).json()
+    log_limit = 10 if field else 20
+    snap = {"roster": {o['id']: dict(o) for o in conditional_get("/status/all", headers)}, "logs": tail_logs(headers, "/officer/logs" if field else "/logs", log_limit), "log_limit": log_limit}
+    if field: snap["me"], snap["pings"] = get("/officer/me"), get("/pings/active")
+    return snap
+
+def live_state(headers, field=False):
+    """Roster/log/ping view kept current from the event stream instead of refetching everything per rerun."""
+    ss = st.session_state
+    if ss.feed is None or ss.feed.token != ss.token:
+        if ss.feed: ss.feed.close()
+        ss.feed, ss.live = LiveFeed(ss.token), None
+    events = ss.feed.drain()
+    if ss.live is None or any(kind == "resync" for kind, _ in events):
+        ss.live = fetch_snapshot(headers, field)
+        return ss.live
+
+    live, refresh_me = ss.live, False
+    for kind, d in events:
+        if kind == "officer":
+            if d['id'] in live["roster"]: live["roster"][d['id']].update(d)
+            elif 'username' in d: live["roster"][d['id']] = d
+            if field and d['id'] == live["me"]['id']: refresh_me = True
+        elif kind == "ping" and field and live["me"]['pings_enabled']:
+            if all(p['id'] != d['id'] for p in live["pings"]): live["pings"].append(d)
+        elif kind == "log":
+            if all(l.get('id') != d['id'] for l in live["logs"]): live["logs"] = ([d] + live["logs"])[:live["log_limit"]]
+    if refresh_me: live["me"] = requests.get(f"{API_URL}/officer/me", headers=headers).json()
+    return live
 
 def do_login(u, p):
     if not u or not p: st.toast("CREDENTIALS REQUIRED"); return
@@ -118,11 +248,8 @@ def field_dashboard():
     load_css()
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
     try:
-        res = requests.get(f"{API_URL}/officer/me", headers=headers)
-        data = res.json()
-        pings = requests.get(f"{API_URL}/pings/active", headers=headers).json()
-        logs = requests.get(f"{API_URL}/officer/logs", headers=headers).json()
-        all_officers = requests.get(f"{API_URL}/status/all", headers=headers).json()
+        live = live_state(headers, field=True)
+        data, pings, logs, all_officers = live["me"], live["pings"], live["logs"], list(live["roster"].values())
     except requests.exceptions.RequestException:
         show_error("NET-001", "Network error")
         return
@@ -133,9 +260,9 @@ def field_dashboard():
         st.divider()
         st.markdown("#### PING NETWORK")
         if st.toggle("RECEIVE PINGS", value=data['pings_enabled']):
-            if not data['pings_enabled']: requests.post(f"{API_URL}/ping/toggle", headers=headers); st.rerun()
+            if not data['pings_enabled']: requests.post(f"{API_URL}/ping/toggle", headers=headers); invalidate_live(); st.rerun()
         else:
-            if data['pings_enabled']: requests.post(f"{API_URL}/ping/toggle", headers=headers); st.rerun()
+            if data['pings_enabled']: requests.post(f"{API_URL}/ping/toggle", headers=headers); invalidate_live(); st.rerun()
             
         with st.popover("SEND PING", use_container_width=True):
             avail = [o['username'] for o in all_officers if o['username'] != st.session_state.username and o['status_color'] != 'blue']
@@ -167,7 +294,7 @@ def field_dashboard():
                 update_loc(); st.toast("LOCATION UPDATED FROM DEVICE")
 
         st.divider()
-        if st.button("TERMINATE SESSION", type="secondary", use_container_width=True): st.session_state.token = None; st.rerun()
+        if st.button("TERMINATE SESSION", type="secondary", use_container_width=True): end_session(); st.rerun()
 
     st.markdown("### FIELD TERMINAL")
     if pings:
@@ -175,7 +302,8 @@ def field_dashboard():
             st.warning(f"藤 PING FROM {p['sender'].upper()}: {p['message']}")
             if st.button("LOCATE SIGNAL", key=f"p{p['id']}"):
                 st.session_state.ping_target = [p['lat'], p['long']]
-                requests.post(f"{API_URL}/ping/dismiss/{p['id']}", headers=headers); st.rerun()
+                requests.post(f"{API_URL}/ping/dismiss/{p['id']}", headers=headers)
+                live["pings"] = [x for x in pings if x['id'] != p['id']]; st.rerun()
 
     status, color = data['status'], "#1f6feb"
     if status == "safe": color = "#2ea043"
@@ -186,7 +314,8 @@ def field_dashboard():
     with c1:
         center = st.session_state.ping_target if st.session_state.ping_target else [st.session_state.lat_in, st.session_state.lng_in]
         m = folium.Map(location=center, zoom_start=14, tiles="CartoDB dark_matter")
-        if data['target_lat']: folium.Circle([data['target_lat'], data['target_long']], radius=data['radius'], color="#1f6feb", weight=1, fill=True, fill_opacity=0.15).add_to(m)
+        if data.get('zone_polygon'): folium.Polygon(data['zone_polygon'], color="#1f6feb", weight=1, fill=True, fill_opacity=0.15).add_to(m)
+        elif data['target_lat']: folium.Circle([data['target_lat'], data['target_long']], radius=data['radius'], color="#1f6feb", weight=1, fill=True, fill_opacity=0.15).add_to(m)
         folium.Marker([st.session_state.lat_in, st.session_state.lng_in], icon=folium.Icon(color="green" if status=="safe" else "red", icon="user")).add_to(m)
         if st.session_state.ping_target: folium.Marker(st.session_state.ping_target, icon=folium.Icon(color="purple", icon="bell", prefix="fa")).add_to(m)
         st_folium(m, height=400)
@@ -202,7 +331,7 @@ def field_dashboard():
         st.markdown("**ACTIONS**")
         if status not in ["on_leave", "req_leave"]:
             if st.button("SUBMIT LEAVE REQ", use_container_width=True):
-                requests.post(f"{API_URL}/leave/request", headers=headers); st.rerun()
+                requests.post(f"{API_URL}/leave/request", headers=headers); invalidate_live(); st.rerun()
 
 def supervisor_dashboard():
     load_css()
@@ -211,11 +340,13 @@ def supervisor_dashboard():
         st.image(st.session_state.photo, width=120)
         st.markdown(f"**CMDR:** {st.session_state.username.upper()}")
         st.divider()
-        if st.button("LOGOUT", type="secondary", use_container_width=True): st.session_state.token = None; st.rerun()
+        if st.button("LOGOUT", type="secondary", use_container_width=True): end_session(); st.rerun()
 
     c1, c2 = st.columns([6, 1])
     c1.markdown(f"### KARTAVYA HQ: {st.session_state.username.upper()}")
-    try: officers = requests.get(f"{API_URL}/status/all", headers=headers).json(); logs = requests.get(f"{API_URL}/logs", headers=headers).json()
+    try:
+        live = live_state(headers)
+        officers, logs = list(live["roster"].values()), live["logs"]
     except requests.exceptions.RequestException:
         show_error("NET-001", "Data link failure")
         return
@@ -229,9 +360,9 @@ def supervisor_dashboard():
                 cols[0].image(p['profile_photo'], width=35)
                 cols[1].markdown(f"**{p['username'].upper()}**")
                 if cols[2].button("AUTH", key=f"a{p['id']}", type="primary", use_container_width=True):
-                    requests.post(f"{API_URL}/leave/approve/{p['id']}", headers=headers); st.rerun()
+                    requests.post(f"{API_URL}/leave/approve/{p['id']}", headers=headers); invalidate_live(); st.rerun()
                 if cols[3].button("DENY", key=f"d{p['id']}", type="secondary", use_container_width=True):
-                    requests.post(f"{API_URL}/leave/deny/{p['id']}", headers=headers); st.rerun()
+                    requests.post(f"{API_URL}/leave/deny/{p['id']}", headers=headers); invalidate_live(); st.rerun()
 
     c_map, c_cmd = st.columns([2, 1])
     with c_map:
@@ -251,24 +382,30 @@ def supervisor_dashboard():
 
         st.session_state.deploy_mode = deploy_mode
         m = folium.Map(location=st.session_state.map_center, zoom_start=st.session_state.map_zoom, tiles="CartoDB dark_matter")
-        user = st.session_state.username
-        if user == "head" or "north" in user: folium.Polygon(ZONES["NORTH"]["bounds"], color="#2979FF", fill=True, fill_opacity=0.05).add_to(m)
-        if user == "head" or "south" in user: folium.Polygon(ZONES["SOUTH"]["bounds"], color="#FF6D00", fill=True, fill_opacity=0.05).add_to(m)
-        for o in officers:
-            if o['current_lat']:
-                c = "#2ea043" if o['status_color'] == "green" else "#da3633" if o['status_color'] == "red" else "#d29922" if o['status_color'] == "yellow" else "#1f6feb"
-                folium.CircleMarker([o['current_lat'], o['current_long']], radius=4, color="white", weight=1, fill=True, fill_color=c, fill_opacity=1, tooltip=o['username']).add_to(m)
+        for z in jurisdiction_zones(headers):
+            color = ZONES.get(z['name'], {}).get("color", "#8b949e")
+            folium.Polygon(z['polygon'], color=color, fill=True, fill_opacity=0.05, tooltip=z['name']).add_to(m)
+        layer = map_layer(headers)
+        for cl in layer['clusters']:
+            # Worst status in the cell sets the colour; size grows with the head count
+            worst = next((k for k in ("red", "green", "yellow", "blue") if cl['colors'].get(k)), "blue")
+            tip = f"{cl['count']} UNITS: " + ", ".join(f"{n} {k.upper()}" for k, n in cl['colors'].items())
+            folium.CircleMarker([cl['lat'], cl['long']], radius=min(4 + 2 * cl['count'] ** 0.5, 30), color="white", weight=1, fill=True, fill_color=STATUS_HEX[worst], fill_opacity=0.8, tooltip=tip).add_to(m)
+        for o in layer['units']:
+            folium.CircleMarker([o['lat'], o['long']], radius=4, color="white", weight=1, fill=True, fill_color=STATUS_HEX.get(o['status_color'], "#1f6feb"), fill_opacity=1, tooltip=o['username']).add_to(m)
         if st.session_state.preview_coords:
             folium.Circle(st.session_state.preview_coords, radius=500, color="#d29922", dash_array="5,5").add_to(m)
             folium.Marker(st.session_state.preview_coords, icon=folium.Icon(color="orange", icon="crosshairs", prefix="fa")).add_to(m)
         map_data = st_folium(m, height=500)
+        if map_data and map_data.get('zoom'):
+            # Keep the next render (and its cluster layer) on the view the user panned/zoomed to
+            st.session_state.map_view = {"zoom": map_data['zoom'], "bounds": map_data.get('bounds')}
+            st.session_state.map_zoom = map_data['zoom']
+            if map_data.get('center'): st.session_state.map_center = [map_data['center']['lat'], map_data['center']['lng']]
         if deploy_mode and map_data and map_data.get('last_clicked'):
             lc = map_data['last_clicked']
-            role = st.session_state.role
-            valid = True
-            if "north" in user and lc['lat'] < 15.44: valid = False
-            if "south" in user and lc['lat'] >= 15.44: valid = False
-            if valid:
+            check = requests.get(f"{API_URL}/zones/containing", params={"lat": lc['lat'], "long": lc['lng']}, headers=headers).json()
+            if check['in_jurisdiction']:
                 st.session_state.preview_coords = [lc['lat'], lc['lng']]; st.rerun()
             else: st.toast("JURISDICTION LIMIT")
 
@@ -292,22 +429,27 @@ def supervisor_dashboard():
                 msg = st.text_input("MSG"); 
                 if st.button("SEND"): requests.post(f"{API_URL}/ping/send", json={"receiver_id": unit['id'], "message": msg}, headers=headers); st.toast("PING SENT")
             if unit['status_color'] in ["green", "red"] and st.button("END PATROL", type="primary", use_container_width=True):
-                requests.post(f"{API_URL}/deploy/stop/{unit['id']}", headers=headers); st.rerun()
+                requests.post(f"{API_URL}/deploy/stop/{unit['id']}", headers=headers); invalidate_live(); st.rerun()
             if unit['status_color'] != "blue" and st.button("GRANT LEAVE", type="secondary", use_container_width=True):
-                requests.post(f"{API_URL}/leave/grant/{unit['id']}", headers=headers); st.rerun()
+                requests.post(f"{API_URL}/leave/grant/{unit['id']}", headers=headers); invalidate_live(); st.rerun()
             if unit['status_color'] == "blue" and st.button("RECALL", type="primary", use_container_width=True):
-                requests.post(f"{API_URL}/leave/revoke/{unit['id']}", headers=headers); st.rerun()
+                requests.post(f"{API_URL}/leave/revoke/{unit['id']}", headers=headers); invalidate_live(); st.rerun()
 
         st.divider()
         st.markdown("**DEPLOYMENT**")
         if st.session_state.preview_coords:
             st.caption(f"TARGET: {st.session_state.preview_coords}")
-            assign = st.multiselect("ASSIGN UNITS", [o['username'] for o in officers if o['status_color'] == 'yellow' and not o['leave_requested']])
+            free = [o['username'] for o in officers if o['status_color'] == 'yellow' and not o['leave_requested']]
+            k = st.number_input("UNITS NEEDED", 1, 20, 3)
+            nearest = suggest_units(headers, st.session_state.preview_coords, k)
+            for s in nearest: st.caption(f"{s['username'].upper()} · {s['distance_m'] / 1000:.1f} KM · ~{s['eta_minutes']:.0f} MIN")
+            # Keyed by target and count so a new click re-fills the nearest units instead of keeping the old picks
+            assign = st.multiselect("ASSIGN UNITS", free, default=[s['username'] for s in nearest if s['username'] in free], key=f"assign{st.session_state.preview_coords}{k}")
             rad = st.slider("RADIUS (M)", 100, 2000, 500)
             if st.button("EXECUTE", type="primary", use_container_width=True):
                 ids = [o['id'] for o in officers if o['username'] in assign]
                 if ids:
-                    requests.post(f"{API_URL}/deploy/bulk", json={"officer_ids":ids, "latitude":st.session_state.preview_coords[0], "longitude":st.session_state.preview_coords[1], "radius":rad}, headers=headers)
+                    requests.post(f"{API_URL}/deploy/bulk", json={"officer_ids":ids, "latitude":st.session_state.preview_coords[0], "longitude":st.session_state.preview_coords[1], "radius":rad}, headers=headers); invalidate_live()
                     st.session_state.map_center, st.session_state.map_zoom, st.session_state.preview_coords = st.session_state.preview_coords, 14, None; st.rerun()
                 else: st.warning("SELECT UNITS")
             if st.button("CANCEL"): st.session_state.preview_coords = None; st.rerun()
@@ -0,0 +1,101 @@
+"""
+Concurrency benchmark for the hot endpoints: 1k concurrent clients against a
+real uvicorn server, once on the sync engine (DB_ASYNC=0, sessions used from
+the threadpool) and once on the async engine (DB_ASYNC=1).
+
+    pytest tests/bench_concurrency.py --benchmark-json=concurrency.json
+    BENCH_CLIENTS=200 pytest tests/bench_concurrency.py
+
+The timed value is the wall time of one burst (every client sending
+REQUESTS_PER_CLIENT requests back to back, after a warm-up request that opens
+its connection); requests/s and p50/p99 latency go to each benchmark's
+extra_info and are printed. The response cache is disabled in the server so
+/status/all is rebuilt from the database on every request.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from fleet import headers, seed_fleet
+
+CLIENTS = int(os.getenv("BENCH_CLIENTS", "1000"))
+REQUESTS_PER_CLIENT = 3
+FLEET = 200
+PORT = int(os.getenv("BENCH_PORT", "8079"))
+ROOT = Path(__file__).resolve().parents[1]
+
+ENDPOINTS = {
+    "officer_me": ("GET", "/officer/me", "officers", None),
+    "pings_active": ("GET", "/pings/active", "officers", None),
+    "status_all": ("GET", "/status/all", "supervisors", None),
+    "checkin": ("POST", "/checkin", "officers", {"latitude": 15.53, "longitude": 73.80}),
+}
+
+
+@pytest.fixture(scope="module", params=["sync", "async"])
+def server(request):
+    officers = seed_fleet(FLEET)
+    env = dict(os.environ, DB_ASYNC="1" if request.param == "async" else "0", RESPONSE_CACHE_SIZE="0")
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "src.backend.app.main:app", "--port", str(PORT), "--timeout-keep-alive", "300", "--log-level", "warning"], cwd=ROOT, env=env)
+    url = f"http://127.0.0.1:{PORT}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            assert proc.poll() is None, "server exited during startup"
+            try:
+                if httpx.get(f"{url}/metrics").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.2)
+        yield SimpleNamespace(mode=request.param, url=url, tokens={
+            "officers": [headers(o.username) for o in officers],
+            "supervisors": [headers("sup_north"), headers("sup_south")],
+        })
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def burst(url, method, path, tokens, body):
+    """(wall seconds, sorted latencies, non-200 count) for CLIENTS clients sending REQUESTS_PER_CLIENT requests each."""
+    limits = httpx.Limits(max_connections=CLIENTS, max_keepalive_connections=CLIENTS)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=300) as client:
+        latencies, errors = [], []
+        send = lambda h: client.request(method, path, headers=h, json=body)
+        clients = [tokens[i % len(tokens)] for i in range(CLIENTS)]
+        await asyncio.gather(*(send(h) for h in clients))  # open every connection first
+
+        async def run(h):
+            for _ in range(REQUESTS_PER_CLIENT):
+                started = time.perf_counter()
+                r = await send(h)
+                latencies.append(time.perf_counter() - started)
+                if r.status_code != 200:
+                    errors.append(r.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(h) for h in clients))
+        return time.perf_counter() - started, sorted(latencies), len(errors)
+
+
+@pytest.mark.parametrize("endpoint", list(ENDPOINTS))
+def test_concurrent_clients(benchmark, server, endpoint):
+    method, path, who, body = ENDPOINTS[endpoint]
+    benchmark.group = f"concurrency-{endpoint}"
+    elapsed, latencies, errors = benchmark.pedantic(
+        lambda: asyncio.run(burst(server.url, method, path, server.tokens[who], body)), rounds=1, iterations=1)
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    stats = {"db": server.mode, "clients": CLIENTS, "requests": len(latencies), "rps": round(len(latencies) / elapsed, 1),
+             "p50_ms": round(pct(0.50), 1), "p99_ms": round(pct(0.99), 1), "errors": errors}
+    benchmark.extra_info.update(stats)
+    print(f"\n{method} {path} [{server.mode}] {stats}")
+    assert errors == 0
@@ -0,0 +1,64 @@
+"""
+Fan-out benchmarks: one request writing a row per recipient for 1k recipients.
+
+    pytest tests/bench_fanout.py --benchmark-json=fanout.json
+    BENCH_FANOUT=5000 pytest tests/bench_fanout.py
+
+Each round must commit exactly once however many recipients it reaches;
+commits and SQL statements per round go to the benchmark's extra_info.
+"""
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from fleet import count_commits, count_statements, headers, running_app, seed_fleet
+
+RECIPIENTS = int(os.getenv("BENCH_FANOUT", "1000"))
+CENTRE = (15.53, 73.80)
+ROUNDS = 5
+
+
+def clustered(n):
+    """Every officer within ~2 km of CENTRE, so one broadcast reaches the whole fleet."""
+    return "sup_north", CENTRE[0] + random.uniform(-0.01, 0.01), CENTRE[1] + random.uniform(-0.01, 0.01), "free"
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    officers = seed_fleet(RECIPIENTS + 1, place=clustered)  # the first officer sends, the rest receive
+    with running_app() as client:
+        yield SimpleNamespace(officers=officers, client=client)
+
+
+def fan_out(benchmark, fleet, method, path, headers, **kw):
+    """Benchmark one fan-out request; returns the (commits, statements) seen by each round."""
+    rounds = []
+
+    def run():
+        with count_commits() as commits, count_statements() as statements:
+            r = fleet.client.request(method, path, headers=headers, **kw)
+        assert r.status_code == 200, f"{method} {path}: {r.status_code} {r.text[:200]}"
+        rounds.append((len(commits), len(statements)))
+        return r
+
+    response = benchmark.pedantic(run, rounds=ROUNDS, warmup_rounds=1)
+    benchmark.extra_info.update(recipients=RECIPIENTS, commits=max(c for c, _ in rounds), statements=max(s for _, s in rounds))
+    return response, rounds
+
+
+@pytest.mark.benchmark(group="fanout")
+def test_ping_broadcast(benchmark, fleet):
+    response, rounds = fan_out(benchmark, fleet, "POST", "/ping/broadcast", headers(fleet.officers[0].username), json={"message": "fanout"})
+    assert response.json() == {"msg": f"Pinged {RECIPIENTS} units."}
+    assert all(commits == 1 for commits, _ in rounds)
+
+
+@pytest.mark.benchmark(group="fanout")
+def test_bulk_deploy(benchmark, fleet):
+    # Every round redeploys the same officers, so it also ends their previous deployments
+    ids = [o.id for o in fleet.officers[1:]]
+    body = {"officer_ids": ids, "latitude": CENTRE[0], "longitude": CENTRE[1], "radius": 500}
+    _, rounds = fan_out(benchmark, fleet, "POST", "/deploy/bulk", headers("head"), json=body)
+    assert all(commits == 1 for commits, _ in rounds)
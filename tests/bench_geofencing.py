@@ -0,0 +1,33 @@
+"""
+Geofence throughput at 100k officer positions: the vectorized batch pass
+against the scalar loop it replaces.
+
+    pytest tests/bench_geofencing.py --benchmark-json=geofencing.json
+"""
+import numpy as np
+import pytest
+
+from src.backend.app.services import geofencing_service
+
+POINTS = 100_000
+
+
+@pytest.fixture(scope="module")
+def fleet():
+    rng = np.random.default_rng(7)
+    t_lats, t_lons = rng.uniform(14.9, 15.8, POINTS), rng.uniform(73.6, 74.2, POINTS)
+    lats, lons = t_lats + rng.normal(0, 0.005, POINTS), t_lons + rng.normal(0, 0.005, POINTS)
+    return lats, lons, t_lats, t_lons, rng.uniform(100, 1000, POINTS)
+
+
+@pytest.mark.benchmark(group="geofencing-100k")
+def test_evaluate_geofences(benchmark, fleet):
+    inside, dists = benchmark(geofencing_service.evaluate_geofences, *fleet)
+    assert len(inside) == len(dists) == POINTS
+
+
+@pytest.mark.benchmark(group="geofencing-100k")
+def test_scalar_loop(benchmark, fleet):
+    rows = list(zip(*(a.tolist() for a in fleet)))
+    results = benchmark.pedantic(lambda: [geofencing_service.is_inside_geofence(*r) for r in rows], rounds=3)
+    assert len(results) == POINTS
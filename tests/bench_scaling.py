@@ -0,0 +1,152 @@
+"""
+Scaling benchmarks for geofencing, auth and the hot endpoints.
+
+    pytest tests/bench_scaling.py --benchmark-json=bench-new.json
+    pytest tests/bench_scaling.py --fleet-sizes=100,10000 --benchmark-autosave
+    pytest tests/bench_scaling.py --benchmark-compare          # against the last autosaved run
+
+Every benchmark runs once per fleet size (100, 10k and 100k officers by
+default), against a freshly seeded SQLite database with the app driven
+through FastAPI's TestClient. The JSON output records the commit it was
+measured on, so scaling regressions can be compared across commits.
+"""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from fleet import count_statements, headers, running_app, seed_fleet, seed_pings
+from src.backend.app import auth, database
+from src.backend.app.services import geofencing_service
+from src.backend.app.services.response_cache import response_cache
+
+PINGS_PER_RECEIVER = 50
+GEOFENCE_CALLS = 10_000  # scalar calls per timed round
+
+# SQL statements per request with a warm principal cache; independent of fleet size
+EXPECTED_STATEMENTS = {"/status/all": 1, "/pings/active": 1}
+
+
+@pytest.fixture(scope="module")
+def fleet(fleet_size):
+    officers = seed_fleet(fleet_size, seed=fleet_size)
+    # A fixed inbox for the /pings/active receiver on top of background ping volume
+    seed_pings(officers[0], officers, PINGS_PER_RECEIVER)
+    seed_pings(officers[-1], officers, fleet_size)
+    with running_app() as client:
+        yield SimpleNamespace(size=fleet_size, officers=officers, client=client)
+
+
+def call(fleet, method, path, headers, expect=200, **kw):
+    r = fleet.client.request(method, path, headers=headers, **kw)
+    assert r.status_code == expect, f"{method} {path}: {r.status_code} {r.text[:200]}"
+    return r
+
+
+# --- GEOFENCING ---
+
+@pytest.mark.benchmark(group="geofencing")
+def test_calculate_distance(benchmark, fleet):
+    sample = [(o.last_known_lat, o.last_known_long) for o in random.choices(fleet.officers, k=GEOFENCE_CALLS)]
+    benchmark(lambda: [geofencing_service.calculate_distance(a, b, 15.5, 73.8) for a, b in sample])
+
+
+@pytest.mark.benchmark(group="geofencing")
+def test_is_inside_geofence(benchmark, fleet):
+    sample = [(o.last_known_lat, o.last_known_long) for o in random.choices(fleet.officers, k=GEOFENCE_CALLS)]
+    benchmark(lambda: [geofencing_service.is_inside_geofence(a, b, 15.5, 73.8, 500.0) for a, b in sample])
+
+
+@pytest.mark.benchmark(group="geofencing")
+def test_evaluate_geofences_fleet(benchmark, fleet):
+    lats, lons = [o.last_known_lat for o in fleet.officers], [o.last_known_long for o in fleet.officers]
+    inside, _ = benchmark(geofencing_service.evaluate_geofences, lats, lons, lats, lons, [500.0] * len(lats))
+    assert inside.all()
+
+
+# --- AUTH ---
+
+@pytest.mark.benchmark(group="auth")
+def test_create_access_token(benchmark, fleet):
+    benchmark(auth.create_access_token, {"sub": fleet.officers[0].username, "role": "field_officer"})
+
+
+@pytest.mark.benchmark(group="auth")
+def test_token_decode(benchmark, fleet):
+    token = auth.create_access_token({"sub": fleet.officers[0].username})
+    assert benchmark(auth.token_subject, token) == fleet.officers[0].username
+
+
+@pytest.mark.benchmark(group="auth")
+def test_get_current_user(benchmark, fleet):
+    token = auth.create_access_token({"sub": fleet.officers[0].username})
+
+    def current_user():
+        db = database.SessionLocal()
+        try:
+            return auth.get_current_user(token, db).id
+        finally:
+            db.close()
+    assert benchmark(current_user) == fleet.officers[0].id
+
+
+# --- ENDPOINTS ---
+
+@pytest.mark.benchmark(group="endpoints")
+def test_checkin(benchmark, fleet):
+    # Rotate through the fleet so principal lookups and geofence state see many officers
+    pool = [headers(o.username) for o in random.sample(fleet.officers, min(len(fleet.officers), 500))]
+    benchmark(lambda: call(fleet, "POST", "/checkin", random.choice(pool),
+                           json={"latitude": 15.5 + random.uniform(-0.05, 0.05), "longitude": 73.85 + random.uniform(-0.05, 0.05)}))
+
+
+@pytest.mark.benchmark(group="endpoints")
+@pytest.mark.parametrize("viewer", ["head", "sup_north"])
+def test_status_all_rebuilt(benchmark, fleet, viewer):
+    h = headers(viewer)
+    rows = benchmark.pedantic(lambda: call(fleet, "GET", "/status/all", h).json(), setup=response_cache.clear, rounds=5, warmup_rounds=1)
+    assert len(rows) == (fleet.size if viewer == "head" else (fleet.size + 1) // 2)
+
+
+@pytest.mark.benchmark(group="endpoints")
+def test_status_all_not_modified(benchmark, fleet):
+    h = headers("head")
+    etag = call(fleet, "GET", "/status/all", h).headers["etag"]
+    benchmark(lambda: call(fleet, "GET", "/status/all", {**h, "If-None-Match": etag}, expect=304))
+
+
+@pytest.mark.benchmark(group="endpoints")
+def test_pings_active(benchmark, fleet):
+    h = headers(fleet.officers[0].username)
+    assert len(benchmark(lambda: call(fleet, "GET", "/pings/active", h).json())) == PINGS_PER_RECEIVER
+
+
+@pytest.mark.benchmark(group="endpoints")
+def test_dispatch_suggest(benchmark, fleet):
+    h = headers("head")
+    benchmark(lambda: call(fleet, "GET", "/dispatch/suggest", h, params={"lat": 15.55, "long": 73.80, "k": 5}))
+
+
+@pytest.mark.benchmark(group="endpoints")
+def test_ping_broadcast(benchmark, fleet):
+    h = headers(fleet.officers[len(fleet.officers) // 2].username)
+    benchmark(lambda: call(fleet, "POST", "/ping/broadcast", h, json={"message": "bench"}))
+
+
+# --- QUERY COUNTS ---
+
+def test_status_all_statement_count(fleet):
+    h = headers("head")
+    call(fleet, "GET", "/status/all", h)  # warm the principal cache
+    response_cache.clear()
+    with count_statements() as statements:
+        call(fleet, "GET", "/status/all", h)
+    assert len(statements) == EXPECTED_STATEMENTS["/status/all"]
+
+
+def test_pings_active_statement_count(fleet):
+    h = headers(fleet.officers[0].username)
+    call(fleet, "GET", "/pings/active", h)
+    with count_statements() as statements:
+        call(fleet, "GET", "/pings/active", h)
+    assert len(statements) == EXPECTED_STATEMENTS["/pings/active"]
@@ -0,0 +1,32 @@
+"""
+Session setup for the tests and benchmarks.
+
+The app binds its engines when it is imported, so the database is pointed at
+a throwaway SQLite file before anything from src.backend.app is loaded.
+Helpers for seeding fleets into it live in fleet.py.
+"""
+import os
+import shutil
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="kartavya-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["RETENTION_INTERVAL"] = "0"
+os.environ["RETENTION_ARCHIVE_DIR"] = ""
+
+DEFAULT_FLEET_SIZES = "100,10000,100000"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--fleet-sizes", default=DEFAULT_FLEET_SIZES, help="comma-separated fleet sizes for the scaling benchmarks")
+
+
+def pytest_generate_tests(metafunc):
+    if "fleet_size" in metafunc.fixturenames:
+        sizes = [int(n) for n in metafunc.config.getoption("fleet_sizes").split(",")]
+        metafunc.parametrize("fleet_size", sizes, scope="module", ids=[f"fleet{n}" for n in sizes])
+
+
+def pytest_sessionfinish(session):
+    shutil.rmtree(_TMP, ignore_errors=True)
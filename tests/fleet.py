@@ -0,0 +1,100 @@
+"""
+Synthetic fleets for the tests and benchmarks: each is seeded into the
+session's throwaway database, and the app is started against it afterwards
+so its in-memory indexes are loaded from what was seeded.
+"""
+import contextlib
+import random
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from reset_and_create import get_random_coords
+from src.backend.app import auth, database, main, models, seeding
+from src.backend.app.services.cluster_service import cluster_cache
+from src.backend.app.services.response_cache import response_cache
+
+STAFF = [
+    {"username": "head", "password": "admin", "role": "head_officer"},
+    {"username": "sup_north", "password": "sup1", "role": "supervisor"},
+    {"username": "sup_south", "password": "sup2", "role": "supervisor"},
+]
+
+
+def random_officer(n):
+    """(supervisor, lat, long, status) for the n-th synthetic officer, alternating North and South Goa."""
+    region = "north" if n % 2 == 0 else "south"
+    lat, long = get_random_coords(region)
+    return f"sup_{region}", lat, long, random.choice(["safe", "safe", "risk", "free"])
+
+
+def seed_fleet(size, place=random_officer, seed=0):
+    """
+    Replace every row with the command staff plus `size` field officers placed
+    by `place(n)`; returns the officers' (id, username, last_known_lat,
+    last_known_long) rows in id order.
+    """
+    random.seed(seed)
+    seeding.clear_tables(database.engine)
+    roster = list(STAFF)
+    for n in range(size):
+        supervisor, lat, long, status = place(n)
+        roster.append({"username": f"unit_{n:06d}", "password": "pass", "supervisor": supervisor, "status": status, "lat": lat, "long": long})
+    db = database.SessionLocal()
+    try:
+        seeding.seed_roster(db, roster, share_hashes=True)
+        return db.query(models.User.id, models.User.username, models.User.last_known_lat, models.User.last_known_long).filter(
+            models.User.role == "field_officer").order_by(models.User.id).all()
+    finally:
+        db.close()
+
+
+def seed_pings(receiver, senders, count):
+    """`count` active pings to `receiver` from randomly picked officers."""
+    now = datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        db.execute(insert(models.Ping), [
+            {"sender_id": s.id, "sender_username": s.username, "receiver_id": receiver.id, "message": "test",
+             "lat": 15.5, "long": 73.8, "timestamp": now, "is_active": True} for s in random.choices(senders, k=count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+@contextlib.contextmanager
+def running_app():
+    """TestClient with startup run against the current database contents and no stale caches."""
+    response_cache.clear()
+    auth.principal_cache.clear()
+    cluster_cache.clear()
+    with TestClient(main.app) as client:
+        yield client
+
+
+def headers(username):
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': username})}"}
+
+
+@contextlib.contextmanager
+def engine_events(name):
+    """Record `name` events (e.g. before_cursor_execute, commit) from every engine; yields the list of event args."""
+    seen = []
+    listener = lambda *args: seen.append(args)
+    for engine in database.engines:
+        event.listen(engine, name, listener)
+    try:
+        yield seen
+    finally:
+        for engine in database.engines:
+            event.remove(engine, name, listener)
+
+
+def count_statements():
+    return engine_events("before_cursor_execute")
+
+
+def count_commits():
+    return engine_events("commit")
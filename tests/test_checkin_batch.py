@@ -0,0 +1,103 @@
+"""/checkin/batch: per-record statuses, per-role authorization and one commit per batch."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from fleet import count_commits, headers, running_app, seed_fleet
+from src.backend.app import database, models
+
+T0 = datetime.utcnow().replace(microsecond=0) + timedelta(minutes=1)
+
+
+@pytest.fixture
+def client():
+    seed_fleet(6)  # alternating sup_north / sup_south units
+    with running_app() as c:
+        yield c
+
+
+def units(supervisor):
+    db = database.SessionLocal()
+    try:
+        sup = db.query(models.User).filter(models.User.username == supervisor).one()
+        return db.query(models.User.id, models.User.username).filter(models.User.supervisor_id == sup.id).order_by(models.User.id).all()
+    finally:
+        db.close()
+
+
+def position(officer_id):
+    db = database.SessionLocal()
+    try:
+        u = db.query(models.User).get(officer_id)
+        return u.last_known_lat, u.last_known_long
+    finally:
+        db.close()
+
+
+def trail(officer_id):
+    db = database.SessionLocal()
+    try:
+        return db.query(models.PositionSample).filter(models.PositionSample.officer_id == officer_id).count()
+    finally:
+        db.close()
+
+
+def record(officer_id, lat, ts):
+    return {"officer_id": officer_id, "latitude": lat, "longitude": 73.8, "timestamp": ts.isoformat()}
+
+
+def send(client, username, records):
+    r = client.post("/checkin/batch", json={"records": records}, headers=headers(username))
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_record_statuses(client):
+    a, b = units("sup_north")[:2]
+    send(client, "head", [record(b.id, 15.60, T0)])
+    body = send(client, "head", [
+        record(a.id, 15.50, T0),
+        record(a.id, 15.51, T0 + timedelta(seconds=10)),   # newest for a
+        record(999_999, 15.50, T0),
+        record(b.id, 15.59, T0 - timedelta(minutes=5)),    # older than b's stored fix
+    ])
+    assert [r["status"] for r in body["results"]] == ["superseded", "applied", "unknown_officer", "stale"]
+    assert body["received"] == 4 and body["applied"] == 1
+    assert position(a.id) == (15.51, 73.8)
+    assert position(b.id) == (15.60, 73.8)  # the stale fix never reaches the live position...
+    assert trail(b.id) == 2                   # ...but it is kept in the history
+    assert trail(a.id) == 2
+
+
+def test_supervisor_only_moves_their_own_units(client):
+    north, south = units("sup_north")[0], units("sup_south")[0]
+    before = position(south.id)
+    body = send(client, "sup_north", [record(north.id, 15.70, T0), record(south.id, 15.20, T0)])
+    assert [r["status"] for r in body["results"]] == ["applied", "forbidden"]
+    assert position(north.id) == (15.70, 73.8)
+    assert position(south.id) == before
+    assert trail(south.id) == 0
+
+
+def test_field_officer_only_moves_themselves(client):
+    me, other = units("sup_north")[:2]
+    before = position(other.id)
+    body = send(client, me.username, [record(me.id, 15.55, T0), record(other.id, 15.56, T0)])
+    assert [r["status"] for r in body["results"]] == ["applied", "forbidden"]
+    assert position(other.id) == before
+
+
+def test_head_officer_may_move_anyone(client):
+    ids = [u.id for u in units("sup_north") + units("sup_south")]
+    body = send(client, "head", [record(oid, 15.5, T0) for oid in ids])
+    assert body["applied"] == len(ids)
+
+
+def test_one_commit_per_batch(client):
+    ids = [u.id for u in units("sup_north") + units("sup_south")]
+    send(client, "head", [record(ids[0], 15.5, T0)])  # warm the principal cache
+    records = [record(oid, 15.5 + n * 0.001, T0 + timedelta(seconds=n)) for n in range(5) for oid in ids]
+    with count_commits() as commits:
+        body = send(client, "head", records)
+    assert body["applied"] == len(ids)
+    assert len(commits) == 1
@@ -0,0 +1,74 @@
+"""Tactical map clusters: counts add up to the roster, the viewport filters, and supervisors only see their own units."""
+import random
+from collections import Counter
+
+import pytest
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app.services import cluster_service
+
+NORTH_BOX = {"min_lat": 15.44, "min_long": 73.6, "max_lat": 15.8, "max_long": 74.2}
+
+
+def test_aggregate_keeps_every_point_once():
+    rng = random.Random(1)
+    points = [(rng.uniform(14.9, 15.8), rng.uniform(73.6, 74.3), rng.choice(["green", "red", "grey"])) for _ in range(5000)]
+    for zoom in (4, 9, 12):
+        clusters = cluster_service.aggregate(points, zoom)
+        assert sum(c["count"] for c in clusters) == len(points)
+        assert sum((Counter(c["colors"]) for c in clusters), Counter()) == Counter(color for _, _, color in points)
+        size = cluster_service.cell_size_deg(zoom)
+        assert len({(int(c["lat"] // size), int(c["long"] // size)) for c in clusters}) == len(clusters)  # centroids stay in their cell
+
+
+@pytest.fixture
+def client():
+    officers = seed_fleet(60)
+    with running_app() as c:
+        c.roster = {u: c.get("/status/all", headers=headers(u)).json() for u in ("head", "sup_north", "sup_south")}
+        c.officers = officers
+        yield c
+
+
+def layer(client, zoom, username="head", **bbox):
+    r = client.get("/map/clusters", params={"zoom": zoom, **bbox}, headers=headers(username))
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def located(rows, bbox=None):
+    return [r for r in rows if r["current_lat"] is not None and cluster_service.in_bbox(r["current_lat"], r["current_long"], bbox)]
+
+
+@pytest.mark.parametrize("username", ["head", "sup_north", "sup_south"])
+@pytest.mark.parametrize("zoom", [6, 10, 13])
+def test_status_counts_sum_to_the_roster(client, zoom, username):
+    body = layer(client, zoom, username)
+    assert body["clustered"] is True and body["units"] == []
+    rows = located(client.roster[username])
+    assert sum(c["count"] for c in body["clusters"]) == len(rows) > 0
+    assert sum((Counter(c["colors"]) for c in body["clusters"]), Counter()) == Counter(r["status_color"] for r in rows)
+
+
+def test_bbox_filters_clusters_and_units(client):
+    box = tuple(NORTH_BOX.values())
+    clusters = layer(client, 13, **NORTH_BOX)["clusters"]
+    assert clusters and all(cluster_service.in_bbox(c["lat"], c["long"], box) for c in clusters)
+    assert len(clusters) < len(layer(client, 13)["clusters"])
+    units = layer(client, cluster_service.CLUSTER_MAX_ZOOM, **NORTH_BOX)["units"]
+    assert sorted(x["id"] for x in units) == sorted(r["id"] for r in located(client.roster["head"], box))
+
+
+def test_max_zoom_returns_individual_units(client):
+    for zoom in (cluster_service.CLUSTER_MAX_ZOOM, 22):
+        body = layer(client, zoom)
+        assert body["clustered"] is False and body["clusters"] == []
+        assert sorted(x["id"] for x in body["units"]) == sorted(r["id"] for r in located(client.roster["head"]))
+
+
+def test_supervisor_layer_excludes_other_jurisdictions(client):
+    north = {o.id for n, o in enumerate(client.officers) if n % 2 == 0}
+    units = layer(client, cluster_service.CLUSTER_MAX_ZOOM, "sup_north")["units"]
+    assert {x["id"] for x in units} == north
+    clusters = layer(client, 10, "sup_north")["clusters"]
+    assert sum(c["count"] for c in clusters) == len(north)
@@ -0,0 +1,88 @@
+"""Dispatch suggestions: the ring search matches a brute-force scan, and availability follows deployments and leave."""
+import random
+
+import numpy as np
+import pytest
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app.services.geofencing_service import haversine_array
+from src.backend.app.services.position_index import PositionIndex
+
+TARGET = (15.5, 73.8)
+
+
+def brute_force(points, lat, lon, k, radius):
+    ids = list(points)
+    dists = haversine_array(lat, lon, np.array([points[i][0] for i in ids]), np.array([points[i][1] for i in ids]))
+    return sorted(((ids[n], float(d)) for n, d in enumerate(dists) if d <= radius), key=lambda hit: hit[1])[:k]
+
+
+@pytest.mark.parametrize("cell_deg", [0.01, 0.1])
+def test_nearest_matches_brute_force(cell_deg):
+    rng = random.Random(cell_deg)
+    index, points = PositionIndex(cell_deg), {}
+    for oid in range(3000):
+        points[oid] = (rng.uniform(14.9, 15.8), rng.uniform(73.6, 74.3))
+        index.update(oid, *points[oid])
+    for _ in range(300):
+        lat, lon = rng.uniform(14.8, 15.9), rng.uniform(73.5, 74.4)  # some queries start outside the fleet
+        k, radius = rng.randint(1, 25), rng.choice([300, 2000, 10000, 50000])
+        got, want = index.nearest(lat, lon, k, radius), brute_force(points, lat, lon, k, radius)
+        assert [oid for oid, _ in got] == [oid for oid, _ in want]
+        assert [d for _, d in got] == pytest.approx([d for _, d in want])
+
+
+def near_target(n):
+    """Free units 100 m apart going north of TARGET, alternating supervisors."""
+    return ("sup_north" if n % 2 == 0 else "sup_south"), TARGET[0] + n * 0.0009, TARGET[1], "free"
+
+
+@pytest.fixture
+def client():
+    officers = seed_fleet(6, place=near_target)
+    with running_app() as c:
+        c.officers = officers
+        yield c
+
+
+def suggested(client, username="head"):
+    r = client.get("/dispatch/suggest", params={"lat": TARGET[0], "long": TARGET[1], "k": 20}, headers=headers(username))
+    assert r.status_code == 200, r.text
+    return [s["id"] for s in r.json()]
+
+
+def test_suggestions_are_nearest_first(client):
+    assert suggested(client) == [o.id for o in client.officers]
+
+
+def test_deploy_and_stop_toggle_availability(client):
+    unit = client.officers[1].id
+    body = {"officer_ids": [unit], "latitude": TARGET[0], "longitude": TARGET[1], "radius": 300}
+    assert client.post("/deploy/bulk", json=body, headers=headers("head")).status_code == 200
+    assert unit not in suggested(client)
+    assert client.post(f"/deploy/stop/{unit}", headers=headers("head")).status_code == 200
+    assert unit in suggested(client)
+
+
+def test_leave_toggles_availability(client):
+    unit = client.officers[2].id
+    assert client.post(f"/leave/grant/{unit}", headers=headers("head")).status_code == 200
+    assert unit not in suggested(client)
+    assert client.post(f"/leave/revoke/{unit}", headers=headers("head")).status_code == 200
+    assert unit in suggested(client)
+
+
+def test_approved_leave_removes_the_unit(client):
+    unit = client.officers[3].id
+    assert client.post(f"/leave/approve/{unit}", headers=headers("head")).status_code == 200
+    assert unit not in suggested(client)
+
+
+def test_supervisor_only_gets_their_own_units(client):
+    north = [o.id for n, o in enumerate(client.officers) if n % 2 == 0]
+    assert suggested(client, "sup_north") == north
+
+
+def test_field_officers_cannot_dispatch(client):
+    r = client.get("/dispatch/suggest", params={"lat": TARGET[0], "long": TARGET[1]}, headers=headers(client.officers[0].username))
+    assert r.status_code == 403
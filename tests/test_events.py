@@ -0,0 +1,81 @@
+"""Event stream fan-out: each subscriber only gets what its role may see, and a slow one gets a single resync."""
+import asyncio
+import json
+
+import pytest
+
+from src.backend.app.services import event_service
+from src.backend.app.services.event_service import EventBus
+
+HEAD, NORTH, SOUTH, UNIT_N, UNIT_S = 1, 2, 3, 10, 11
+ROLES = {HEAD: "head_officer", NORTH: "supervisor", SOUTH: "supervisor", UNIT_N: "field_officer", UNIT_S: "field_officer"}
+
+EVENTS = [
+    ("roster_north", "officer", {"officer_id": UNIT_N, "supervisor_id": NORTH}),
+    ("roster_south", "officer", {"officer_id": UNIT_S, "supervisor_id": SOUTH}),
+    ("ping_to_north_unit", "ping", {"receiver_id": UNIT_N}),
+    ("log_for_south_unit", "log", {"officer_id": UNIT_S}),
+    ("mission_log", "log", {}),
+]
+
+VISIBLE = {
+    HEAD: {"roster_north", "roster_south", "mission_log"},
+    NORTH: {"roster_north", "mission_log"},
+    SOUTH: {"roster_south", "mission_log"},
+    UNIT_N: {"roster_north", "roster_south", "ping_to_north_unit", "mission_log"},
+    UNIT_S: {"roster_north", "roster_south", "log_for_south_unit", "mission_log"},
+}
+
+
+async def drain(sub):
+    out = []
+    while not sub.queue.empty():
+        out.append(sub.queue.get_nowait().data["name"])
+    return out
+
+
+async def fan_out():
+    bus = EventBus()
+    subs = {uid: bus.subscribe(uid, role) for uid, role in ROLES.items()}
+    for name, kind, target in EVENTS:
+        bus.publish(kind, {"name": name}, **target)
+    await asyncio.sleep(0)  # deliveries are scheduled onto the loop
+    return {uid: await drain(sub) for uid, sub in subs.items()}
+
+
+@pytest.mark.parametrize("user_id", list(ROLES), ids=[f"{ROLES[u]}_{u}" for u in ROLES])
+def test_subscriber_sees_only_its_jurisdiction(user_id):
+    got = asyncio.run(fan_out())[user_id]
+    assert got == [name for name, _, _ in EVENTS if name in VISIBLE[user_id]]
+
+
+def test_overflow_sends_one_resync_then_resumes():
+    async def run():
+        bus = EventBus()
+        sub = bus.subscribe(NORTH, "supervisor")
+        for n in range(event_service.QUEUE_SIZE + 500):
+            bus.publish("log", {"n": n})
+        await asyncio.sleep(0)
+        assert sub.queue.qsize() == event_service.QUEUE_SIZE and sub.overflowed
+        frames = [await sub.next_frame(timeout=0.01) for _ in range(2)]
+        bus.publish("log", {"n": "after"})
+        await asyncio.sleep(0)
+        frames.append(await sub.next_frame(timeout=0.01))
+        return frames
+
+    resync, idle, after = asyncio.run(run())
+    assert resync == event_service.RESYNC_FRAME
+    assert idle == event_service.KEEPALIVE_FRAME  # the backlog was dropped, not replayed
+    assert after.startswith("id: ") and json.loads(after.split("data: ", 1)[1]) == {"n": "after"}
+
+
+def test_unsubscribed_client_gets_nothing():
+    async def run():
+        bus = EventBus()
+        sub = bus.subscribe(HEAD, "head_officer")
+        bus.unsubscribe(sub)
+        bus.publish("log", {"name": "mission_log"})
+        await asyncio.sleep(0)
+        return sub.queue.qsize()
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,82 @@
+"""Geofence state engine: hysteresis keeps boundary jitter quiet and dwell suppresses brief excursions."""
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.backend.app.services.geofence_state import GeofenceStateEngine
+from src.backend.app.services.geofencing_service import calculate_distance
+
+CENTRE = (15.5, 73.8)
+RADIUS = 200.0
+OFFICER = 7
+T0 = datetime(2026, 5, 1, 8, 0, 0)
+
+
+def at(meters):
+    """Point `meters` due north of CENTRE."""
+    return CENTRE[0] + math.degrees(meters / 6371000), CENTRE[1]
+
+
+def engine(hysteresis=20, dwell=0, start=150):
+    e = GeofenceStateEngine(hysteresis=hysteresis, dwell=dwell)
+    e.register(1, OFFICER, 3, *CENTRE, RADIUS, *at(start))
+    return e
+
+
+def feed(e, distances, step=timedelta(seconds=5), start=T0):
+    """Transitions produced by a walk through `distances` (meters from CENTRE), one fix per `step`."""
+    out = []
+    for n, d in enumerate(distances):
+        t = e.observe(OFFICER, *at(d), ts=start + n * step)
+        if t is not None:
+            out.append(t)
+    return out
+
+
+def test_helper_places_points_at_the_requested_distance():
+    assert calculate_distance(*at(215), *CENTRE) == pytest.approx(215, abs=0.01)
+
+
+def test_jitter_inside_the_hysteresis_band_is_silent():
+    e = engine()
+    assert feed(e, [185, 215, 190, 214, 200, 186, 215] * 3) == []
+    assert e.get(OFFICER).inside is True
+
+
+def test_breach_and_return_fire_once_each():
+    e = engine()
+    breach = feed(e, [210, 225, 230, 260, 240, 225])
+    assert [t.inside for t in breach] == [False]
+    assert breach[0].distance == pytest.approx(225, abs=0.5)
+    assert e.get(OFFICER).inside is False
+    # Outside now: jitter around the radius stays quiet until 20 m back inside
+    assert feed(e, [215, 190, 205, 185]) == []
+    back = feed(e, [175, 150, 100, 175])
+    assert [t.inside for t in back] == [True]
+
+
+def test_dwell_suppresses_a_brief_excursion():
+    e = engine(dwell=30)
+    # 10 s outside, then back: never confirmed
+    assert feed(e, [260, 260, 150], step=timedelta(seconds=5)) == []
+    # Outside long enough: one breach, stamped on the first fix past the dwell
+    out = [e.observe(OFFICER, *at(260), ts=T0 + timedelta(minutes=1, seconds=s)) for s in (0, 10, 20, 30, 40)]
+    assert [t is not None for t in out] == [False, False, False, True, False]
+    assert e.get(OFFICER).inside is False
+
+
+def test_first_fix_only_reports_an_outside_reading():
+    e = GeofenceStateEngine(hysteresis=20, dwell=0)
+    e.register(1, OFFICER, 3, *CENTRE, RADIUS)
+    assert e.observe(OFFICER, *at(100), ts=T0) is None
+    e.register(2, OFFICER, 3, *CENTRE, RADIUS)
+    t = e.observe(OFFICER, *at(205), ts=T0)  # past the radius, within hysteresis: still worth the alert
+    assert t is not None and t.inside is False
+
+
+def test_dropped_officer_stops_emitting():
+    e = engine()
+    e.drop(OFFICER)
+    assert e.get(OFFICER) is None
+    assert feed(e, [260, 100, 260]) == []
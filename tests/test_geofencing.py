@@ -0,0 +1,73 @@
+"""evaluate_geofences must agree with the scalar is_inside_geofence, edge cases included."""
+import math
+import random
+
+import numpy as np
+import pytest
+
+from src.backend.app.services import geofencing_service
+
+
+def scalar(points):
+    return [geofencing_service.is_inside_geofence(*p) for p in points]
+
+
+def batch(points):
+    lats, lons, t_lats, t_lons, radii = zip(*points) if points else ([],) * 5
+    inside, dists = geofencing_service.evaluate_geofences(lats, lons, t_lats, t_lons, radii)
+    return list(zip(inside.tolist(), dists.tolist()))
+
+
+def assert_equivalent(points):
+    for p, (ok, dist), (b_ok, b_dist) in zip(points, scalar(points), batch(points)):
+        assert b_dist == pytest.approx(dist, rel=1e-9, abs=1e-6), p
+        if abs(dist - p[4]) > 1e-6:  # a last-bit difference may only flip a point sitting on the boundary
+            assert b_ok == ok, p
+
+
+def test_random_points_match_scalar():
+    rng = random.Random(3)
+    points = []
+    for _ in range(5000):
+        t_lat, t_lon = rng.uniform(-89, 89), rng.uniform(-180, 180)
+        points.append((t_lat + rng.gauss(0, 0.01), t_lon + rng.gauss(0, 0.01), t_lat, t_lon, rng.uniform(10, 2000)))
+    assert_equivalent(points)
+
+
+def test_points_on_the_boundary_count_as_inside():
+    points = [(lat + 0.003, lon, lat, lon, 0.0) for lat, lon in [(15.53, 73.80), (-33.9, 151.2), (60.0, 10.0)]]
+    on_edge = [p[:4] + (dist,) for p, (_, dist) in zip(points, batch(points))]
+    assert all(ok for ok, _ in batch(on_edge))
+    assert all(ok for ok, _ in scalar([p[:4] + (dist,) for p, (_, dist) in zip(points, scalar(points))]))
+    assert_equivalent(on_edge)
+
+
+def test_zero_coordinates_are_positions_not_missing():
+    points = [(0.0, 0.0, 0.0, 0.0, 1.0), (0.0, 73.8, 0.001, 73.8, 500.0), (15.5, 0.0, 15.5, 0.002, 100.0)]
+    results = batch(points)
+    assert results[0] == (True, 0.0)
+    assert results[1][0] and results[1][1] == pytest.approx(111.2, abs=0.1)
+    assert not results[2][0]
+    assert_equivalent(points)
+
+
+def test_antimeridian_wraps():
+    # ~111 m apart across the ±180° line, not a trip around the globe
+    points = [(0.0, 179.9995, 0.0, -179.9995, 500.0), (10.0, -179.9999, 10.0, 179.9999, 50.0)]
+    results = batch(points)
+    assert results[0][0] and results[0][1] == pytest.approx(111.2, abs=0.1)
+    assert results[1][0]
+    assert_equivalent(points)
+
+
+@pytest.mark.parametrize("lat, lon", [(None, 73.8), (15.5, None), (math.nan, 73.8), (15.5, math.nan)])
+def test_missing_positions_are_outside_with_nan_distance(lat, lon):
+    inside, dists = geofencing_service.evaluate_geofences([lat, 15.5], [lon, 73.8], [15.5, 15.5], [73.8, 73.8], [500.0, 500.0])
+    assert inside.tolist() == [False, True]
+    assert math.isnan(dists[0]) and dists[1] == 0.0
+
+
+def test_empty_batch():
+    inside, dists = geofencing_service.evaluate_geofences([], [], [], [], [])
+    assert inside.shape == dists.shape == (0,)
+    assert inside.dtype == np.bool_
@@ -0,0 +1,149 @@
+"""
+Write-behind location buffer: positions are readable before they are
+flushed, coalesce per officer without losing trail samples, survive
+transient flush failures and are persisted on shutdown.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from fleet import seed_fleet
+from src.backend.app import database, models
+from src.backend.app.services import checkin_service
+from src.backend.app.services.location_buffer import DROPPED, LocationBuffer
+
+T0 = datetime.utcnow() + timedelta(minutes=1)  # newer than any seeded fix
+
+
+@pytest.fixture
+def officers():
+    return seed_fleet(2)
+
+
+@pytest.fixture
+def buffer():
+    # Flushed by hand: the background thread only wakes after an hour or 10k fixes
+    buf = LocationBuffer(flush_interval=3600, flush_batch=10_000, max_attempts=3)
+    buf.start(database.SessionLocal)
+    yield buf
+    buf.stop()
+
+
+def stored(officer_id):
+    """(persisted (lat, long), trail as [(lat, long)] in time order) for one officer."""
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).get(officer_id)
+        trail = db.query(models.PositionSample.lat, models.PositionSample.long).filter(
+            models.PositionSample.officer_id == officer_id).order_by(models.PositionSample.timestamp).all()
+        return (user.last_known_lat, user.last_known_long), [tuple(p) for p in trail]
+    finally:
+        db.close()
+
+
+def fixes(n, lat=15.5):
+    return [(lat + i * 0.001, 73.8, T0 + timedelta(seconds=i)) for i in range(n)]
+
+
+def test_latest_fix_wins_and_trail_keeps_every_sample(officers, buffer):
+    a, b = officers[0].id, officers[1].id
+    samples = fixes(3)
+    for lat, lon, ts in [samples[0], samples[2], samples[1]]:  # one arrives out of order
+        buffer.record(a, lat, lon, ts)
+    buffer.record(b, 15.6, 73.9, T0)
+    assert len(buffer) == 2
+    assert buffer.position(a) == samples[2][:2]
+    assert buffer.flush() == 2
+    assert len(buffer) == 0
+    position, trail = stored(a)
+    assert position == samples[2][:2]
+    assert trail == [s[:2] for s in samples]
+    assert stored(b)[0] == (15.6, 73.9)
+
+
+def test_position_is_served_before_the_flush(officers, buffer):
+    a = officers[0].id
+    persisted, _ = stored(a)
+    buffer.record(a, 15.45, 73.85, T0)
+    assert buffer.position(a, persisted) == (15.45, 73.85)
+    assert buffer.timestamp(a) == T0
+    assert stored(a)[0] == persisted
+    assert buffer.position(officers[1].id, ("db", "db")) == ("db", "db")
+
+
+def test_fix_recorded_during_a_flush_is_kept(officers, buffer, monkeypatch):
+    a = officers[0].id
+    buffer.record(a, 15.5, 73.8, T0)
+    apply = checkin_service.apply_checkins
+
+    def apply_while_officer_moves(db, records, **kw):
+        buffer.record(a, 15.51, 73.81, T0 + timedelta(seconds=5))
+        return apply(db, records, **kw)
+
+    monkeypatch.setattr(checkin_service, "apply_checkins", apply_while_officer_moves)
+    buffer.flush()
+    assert stored(a)[0] == (15.5, 73.8)
+    assert len(buffer) == 1 and buffer.position(a) == (15.51, 73.81)
+    monkeypatch.setattr(checkin_service, "apply_checkins", apply)
+    buffer.flush()
+    assert stored(a) == ((15.51, 73.81), [(15.5, 73.8), (15.51, 73.81)])
+
+
+def test_failed_flush_is_retried(officers, buffer, monkeypatch):
+    a = officers[0].id
+    apply, calls = checkin_service.apply_checkins, []
+
+    def flaky(db, records, **kw):
+        calls.append(len(kw["history"]))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return apply(db, records, **kw)
+
+    monkeypatch.setattr(checkin_service, "apply_checkins", flaky)
+    buffer.record(a, 15.5, 73.8, T0)
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.position(a) == (15.5, 73.8)
+    buffer.record(a, 15.52, 73.8, T0 + timedelta(seconds=1))
+    assert buffer.flush() == 1
+    assert calls == [1, 2]  # the failed sample went out again with the new one
+    assert stored(a) == ((15.52, 73.8), [(15.5, 73.8), (15.52, 73.8)])
+
+
+def test_batch_is_dropped_after_max_attempts(officers, buffer, monkeypatch):
+    a, b = officers[0].id, officers[1].id
+
+    def broken(db, records, **kw):
+        raise RuntimeError("constraint failed")
+
+    monkeypatch.setattr(checkin_service, "apply_checkins", broken)
+    for lat, lon, ts in fixes(2):
+        buffer.record(a, lat, lon, ts)
+    buffer.record(b, 15.6, 73.9, T0)
+    dropped = DROPPED.value(kind="position"), DROPPED.value(kind="history")
+    for attempt in range(buffer.max_attempts):
+        with pytest.raises(RuntimeError):
+            buffer.flush()
+        if attempt < buffer.max_attempts - 1:
+            assert len(buffer) == 2 and len(buffer._trail) == 3
+    assert len(buffer) == 0 and buffer._trail == []
+    assert DROPPED.value(kind="position") == dropped[0] + 2
+    assert DROPPED.value(kind="history") == dropped[1] + 3
+    # Later positions flow again once the poisoned batch is gone
+    monkeypatch.undo()
+    buffer.record(a, 15.7, 73.7, T0 + timedelta(minutes=1))
+    assert buffer.flush() == 1
+    assert stored(a)[0] == (15.7, 73.7)
+
+
+def test_stop_flushes_pending_positions(officers):
+    buf = LocationBuffer(flush_interval=3600, flush_batch=10_000)
+    buf.start(database.SessionLocal)
+    a = officers[0].id
+    for lat, lon, ts in fixes(4):
+        buf.record(a, lat, lon, ts)
+    buf.stop()
+    assert len(buf) == 0
+    position, trail = stored(a)
+    assert position == fixes(4)[-1][:2]
+    assert len(trail) == 4
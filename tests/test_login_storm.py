@@ -0,0 +1,51 @@
+"""
+A login storm is bounded by the argon2 pool: logins beyond its queue get 503
+with Retry-After straight away, and the roster keeps answering meanwhile.
+"""
+import asyncio
+import time
+
+import httpx
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app import auth, main
+from src.backend.app.services.response_cache import response_cache
+
+LOGINS = 200
+WORKERS, QUEUE = 2, 16
+POLLS = 20
+# Generous for one shared CPU: a quiet roster poll takes ~20 ms, ~150 ms mid-storm
+MEDIAN_POLL_SECONDS, MAX_POLL_SECONDS = 0.5, 3.0
+
+
+async def storm(officers, supervisor):
+    """(login responses, /status/all latencies) with every login fired at once while the roster is polled."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test", timeout=60) as client:
+        async def poll():
+            latencies = []
+            for _ in range(POLLS):
+                response_cache.clear()  # rebuild from the database every time
+                started = time.perf_counter()
+                assert (await client.get("/status/all", headers=supervisor)).status_code == 200
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+            return latencies
+
+        logins = [client.post("/auth/login", json={"username": officers[n % len(officers)].username, "password": "pass"}) for n in range(LOGINS)]
+        latencies, *responses = await asyncio.gather(poll(), *logins)
+        return responses, latencies
+
+
+def test_login_storm_sheds_overflow_and_keeps_roster_responsive(monkeypatch):
+    officers = seed_fleet(200)
+    monkeypatch.setattr(auth, "hash_pool", auth.PasswordHashPool(workers=WORKERS, queue=QUEUE))
+    with running_app() as client:
+        responses, latencies = client.portal.call(storm, officers, headers("head"))
+    codes = [r.status_code for r in responses]
+    assert set(codes) <= {200, 503}
+    assert codes.count(200) >= WORKERS + QUEUE
+    assert codes.count(503) > 0
+    assert all(r.headers.get("Retry-After") == "1" for r in responses if r.status_code == 503)
+    latencies.sort()
+    assert latencies[len(latencies) // 2] < MEDIAN_POLL_SECONDS
+    assert latencies[-1] < MAX_POLL_SECONDS
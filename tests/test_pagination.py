@@ -0,0 +1,98 @@
+"""
+Keyset paging for /logs, /officer/logs and /pings/active: before= walks back
+and since= walks forward through the timeline, each row exactly once, with
+the id breaking ties between equal timestamps.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app import database, models
+
+BASE = datetime(2026, 3, 1, 9, 0, 0)
+# Three rows share each timestamp, so every page boundary lands inside a tie
+TIMESTAMPS = [BASE + timedelta(seconds=n // 3) for n in range(20)]
+LIMIT = 4
+
+
+@pytest.fixture(scope="module")
+def client():
+    officers = seed_fleet(2)
+    officer = officers[0]
+    db = database.SessionLocal()
+    try:
+        db.execute(insert(models.NotificationLog), [
+            {"level": "INFO", "message": f"log {n}", "timestamp": ts, "user_id": None if n % 2 else officer.id} for n, ts in enumerate(TIMESTAMPS)
+        ])
+        db.execute(insert(models.Ping), [
+            {"sender_id": officers[1].id, "sender_username": officers[1].username, "receiver_id": officer.id, "message": f"ping {n}",
+             "lat": 15.5, "long": 73.8, "timestamp": ts, "is_active": True} for n, ts in enumerate(TIMESTAMPS)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    with running_app() as c:
+        c.headers.update(headers(officer.username))
+        yield c
+
+
+def timeline(client, path):
+    """Every row of `path` in one page, newest first."""
+    return client.get(path, params={"limit": 200}).json()
+
+
+def key(row):
+    return row["timestamp"], row["id"]
+
+
+ENDPOINTS = ["/logs", "/officer/logs", "/pings/active"]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_full_timeline_is_newest_first_with_id_tie_break(client, path):
+    rows = timeline(client, path)
+    assert rows and [key(r) for r in rows] == sorted((key(r) for r in rows), reverse=True)
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_before_pages_back_through_ties(client, path):
+    rows, pages, cursor = timeline(client, path), [], None
+    while True:
+        page = client.get(path, params={"limit": LIMIT, **({"before": cursor} if cursor else {})}).json()
+        if not page:
+            break
+        assert len(page) <= LIMIT
+        pages += page
+        cursor = page[-1]["cursor"]
+    assert [r["id"] for r in pages] == [r["id"] for r in rows]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_since_pages_forward_through_a_gap(client, path):
+    rows = timeline(client, path)
+    start = len(rows) - 2  # far more than LIMIT rows are newer than this cursor
+    cursor, seen = rows[start]["cursor"], []
+    while True:
+        page = client.get(path, params={"limit": LIMIT, "since": cursor}).json()
+        if not page:
+            break
+        assert [key(r) for r in page] == sorted((key(r) for r in page), reverse=True)
+        seen = page + seen
+        cursor = page[0]["cursor"]  # newest row of the page
+    assert [r["id"] for r in seen] == [r["id"] for r in rows[:start]]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_since_returns_the_rows_right_after_the_cursor(client, path):
+    rows = timeline(client, path)
+    page = client.get(path, params={"limit": LIMIT, "since": rows[-1]["cursor"]}).json()
+    assert [r["id"] for r in page] == [r["id"] for r in rows[-1 - LIMIT:-1]]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+@pytest.mark.parametrize("param", ["before", "since"])
+@pytest.mark.parametrize("cursor", ["garbage", "2026-03-01T09:00:00~x", "~5"])
+def test_bad_cursor_is_rejected(client, path, param, cursor):
+    assert client.get(path, params={param: cursor}).status_code == 400
@@ -0,0 +1,63 @@
+"""Cached principals are dropped when a user row change commits, so /officer/me never serves the old row."""
+import pytest
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app import database, models
+from src.backend.app.auth import principal_cache
+
+
+@pytest.fixture
+def client():
+    officers = seed_fleet(2)
+    with running_app() as c:
+        c.officer = officers[0]
+        yield c
+
+
+def me(client):
+    r = client.get("/officer/me", headers=headers(client.officer.username))
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_ping_toggle_shows_immediately(client):
+    before = me(client)["pings_enabled"]
+    assert client.post("/ping/toggle", headers=headers(client.officer.username)).json() == {"enabled": not before}
+    assert me(client)["pings_enabled"] is (not before)
+
+
+def test_leave_shows_immediately(client):
+    me(client)
+    assert client.post(f"/leave/grant/{client.officer.id}", headers=headers("head")).status_code == 200
+    assert me(client)["status"] == "on_leave"
+    assert client.post(f"/leave/revoke/{client.officer.id}", headers=headers("head")).status_code == 200
+    assert me(client)["status"] != "on_leave"
+
+
+def test_read_between_flush_and_commit_is_not_cached(client):
+    me(client)
+    db = database.SessionLocal()
+    try:
+        db.query(models.User).get(client.officer.id).is_on_leave = True
+        db.flush()
+        # A concurrent request that misses the cache (e.g. expired) reads and caches the committed row...
+        principal_cache.invalidate(user_id=client.officer.id)
+        assert me(client)["status"] != "on_leave"
+        db.commit()
+    finally:
+        db.close()
+    # ...but the commit drops it again
+    assert me(client)["status"] == "on_leave"
+
+
+def test_rollback_keeps_the_cached_principal(client):
+    me(client)
+    db = database.SessionLocal()
+    try:
+        db.query(models.User).get(client.officer.id).is_on_leave = True
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+    snapshot, _ = principal_cache.lookup(client.officer.username)
+    assert snapshot is not None and snapshot["is_on_leave"] is False
@@ -0,0 +1,89 @@
+"""
+Query-plan regression tests: the hot read endpoints must be answered from
+their indexes, never by scanning a whole table.
+
+Each endpoint is called once and every statement it issued is replayed
+under EXPLAIN QUERY PLAN on a database analyzed with a realistically skewed
+log and ping history, so the planner has statistics to choose from.
+"""
+import random
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+from fleet import count_statements, headers, running_app, seed_fleet, seed_pings
+from src.backend.app import auth, database, migrations, models
+from src.backend.app.services.response_cache import response_cache
+
+LOG_ROWS = 100_000
+GLOBAL_LOG_SHARE = 0.3
+PINGS = 20_000
+
+# Indexes each endpoint's statements must use (principal lookups go through ix_users_username)
+EXPECTED_INDEXES = {
+    "/officer/me": {"ix_users_username"},
+    "/pings/active": {"ix_users_username", "ix_pings_receiver_active_timestamp"},
+    "/officer/logs": {"ix_users_username", "ix_notification_logs_user_timestamp"},
+    "/logs": {"ix_notification_logs_user_timestamp"},
+}
+FULL_SCAN = re.compile(r"^SCAN (users|deployments|notification_logs|pings)\b")
+
+
+@pytest.fixture(scope="module")
+def client():
+    officers = seed_fleet(200)
+    now = datetime.utcnow()
+    db = database.SessionLocal()
+    try:
+        db.execute(insert(models.NotificationLog), [
+            {"level": "INFO", "message": "test", "timestamp": now - timedelta(seconds=i),
+             "user_id": None if random.random() < GLOBAL_LOG_SHARE else random.choice(officers).id}
+            for i in range(LOG_ROWS)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    seed_pings(officers[0], officers, PINGS // 2)
+    for receiver in random.sample(officers, 10):
+        seed_pings(receiver, officers, PINGS // 20)
+    with database.engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    with running_app() as c:
+        c.officer = officers[0]
+        yield c
+
+
+def query_plans(client, path):
+    """Plan lines (EXPLAIN QUERY PLAN detail column) of every statement `path` issues on a cold request."""
+    auth.principal_cache.clear()
+    response_cache.clear()
+    with count_statements() as statements:
+        r = client.get(path, headers=headers(client.officer.username))
+    assert r.status_code == 200, r.text
+    assert statements, f"{path} issued no SQL"
+    plans = []
+    with database.engine.connect() as conn:
+        for _, _, statement, parameters, *_ in statements:
+            plans.append([row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, tuple(parameters)).all()])
+    return plans
+
+
+@pytest.mark.parametrize("path", sorted(EXPECTED_INDEXES))
+def test_endpoint_uses_indexes(client, path):
+    lines = [line for plan in query_plans(client, path) for line in plan]
+    used = {m.group(1) for line in lines for m in [re.search(r"USING (?:COVERING )?INDEX (\w+)", line)] if m}
+    assert EXPECTED_INDEXES[path] <= used, f"{path} plan: {lines}"
+    assert not [line for line in lines if FULL_SCAN.match(line)], f"{path} scans a whole table: {lines}"
+
+
+def test_upgrade_retires_superseded_ping_index():
+    # (receiver_id, is_active) was widened with timestamp; an upgraded database must not keep the old index for the planner
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_pings_receiver_active ON pings (receiver_id, is_active)")
+    migrations.upgrade(database.engine)
+    with database.engine.connect() as conn:
+        names = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(pings)")}
+    assert "ix_pings_receiver_active" not in names
+    assert "ix_pings_receiver_active_timestamp" in names
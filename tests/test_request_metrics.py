@@ -0,0 +1,65 @@
+"""Per-request metrics as scraped from /metrics: routes are labelled by template and SQL statements are counted."""
+import re
+
+import pytest
+
+from fleet import headers, running_app, seed_fleet
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def scrape(client):
+    """{(name, frozenset of label pairs): value} for every sample on /metrics."""
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    out = {}
+    for line in r.text.splitlines():
+        m = SAMPLE.match(line)
+        if m:
+            out[(m[1], frozenset(LABEL.findall(m[2] or "")))] = float(m[3])
+    return out
+
+
+def sample(samples, name, **labels):
+    return samples.get((name, frozenset((k, str(v)) for k, v in labels.items())), 0.0)
+
+
+def routes(samples):
+    return {dict(labels).get("route") for name, labels in samples if name == "http_requests_total"}
+
+
+@pytest.fixture
+def client():
+    officers = seed_fleet(4)
+    with running_app() as c:
+        c.officers = officers
+        yield c
+
+
+def test_status_all_is_counted_with_its_sql(client):
+    before = scrape(client)
+    assert client.get("/status/all", headers=headers("head")).status_code == 200
+    after = scrape(client)
+    labels = {"route": "/status/all", "method": "GET"}
+    assert sample(after, "http_requests_total", **labels, status=200) - sample(before, "http_requests_total", **labels, status=200) == 1
+    assert sample(after, "http_request_db_statements_count", **labels) - sample(before, "http_request_db_statements_count", **labels) == 1
+    assert sample(after, "http_request_db_statements_sum", **labels) > sample(before, "http_request_db_statements_sum", **labels)
+    assert sample(after, "http_request_seconds_count", **labels) > sample(before, "http_request_seconds_count", **labels)
+
+
+def test_path_parameters_use_the_route_template(client):
+    for o in client.officers[:3]:
+        assert client.post(f"/leave/approve/{o.id}", headers=headers("head")).status_code == 200
+    samples = scrape(client)
+    assert sample(samples, "http_requests_total", route="/leave/approve/{oid}", method="POST", status=200) >= 3
+    assert not any(r and r.startswith("/leave/approve/") and "{" not in r for r in routes(samples))
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = sample(scrape(client), "http_requests_total", route="unmatched", method="GET", status=404)
+    for path in ("/no/such/page", "/wp-login.php", "/status/all/extra/123"):
+        assert client.get(path).status_code == 404
+    samples = scrape(client)
+    assert sample(samples, "http_requests_total", route="unmatched", method="GET", status=404) - before == 3
+    assert not {"/no/such/page", "/wp-login.php", "/status/all/extra/123"} & routes(samples)
@@ -0,0 +1,57 @@
+"""Conditional GETs: a current ETag answers 304 without SQL, and writes only invalidate the jurisdictions they touch."""
+import pytest
+
+from fleet import count_statements, headers, running_app, seed_fleet
+from src.backend.app import database, models
+
+
+@pytest.fixture
+def client():
+    seed_fleet(6)  # alternating sup_north / sup_south units
+    with running_app() as c:
+        yield c
+
+
+def unit_of(supervisor):
+    db = database.SessionLocal()
+    try:
+        sup = db.query(models.User).filter(models.User.username == supervisor).one()
+        return db.query(models.User).filter(models.User.supervisor_id == sup.id).order_by(models.User.id).first()
+    finally:
+        db.close()
+
+
+def etag(client, path, username):
+    r = client.get(path, headers=headers(username))
+    assert r.status_code == 200 and r.headers["ETag"]
+    return r.headers["ETag"]
+
+
+def revalidate(client, path, username, tag):
+    return client.get(path, headers={**headers(username), "If-None-Match": tag}).status_code
+
+
+@pytest.mark.parametrize("path, username", [("/status/all", "head"), ("/status/all", "sup_north"), ("/logs", "head")])
+def test_current_etag_is_answered_without_sql(client, path, username):
+    tag = etag(client, path, username)
+    with count_statements() as statements:
+        r = client.get(path, headers={**headers(username), "If-None-Match": tag})
+    assert r.status_code == 304 and r.content == b"" and r.headers["ETag"] == tag
+    assert statements == []
+
+
+def test_checkin_invalidates_only_its_supervisors_roster(client):
+    north = unit_of("sup_north")
+    tags = {u: etag(client, "/status/all", u) for u in ("head", "sup_north", "sup_south")}
+    assert client.post("/checkin", json={"latitude": 15.61, "longitude": 73.81}, headers=headers(north.username)).status_code == 200
+    assert revalidate(client, "/status/all", "head", tags["head"]) == 200
+    assert revalidate(client, "/status/all", "sup_north", tags["sup_north"]) == 200
+    assert revalidate(client, "/status/all", "sup_south", tags["sup_south"]) == 304
+
+
+def test_officer_logs_ignore_other_officers_logs(client):
+    a, b = unit_of("sup_north"), unit_of("sup_south")
+    tag_a, tag_b = etag(client, "/officer/logs", a.username), etag(client, "/officer/logs", b.username)
+    assert client.post(f"/deploy/stop/{b.id}", headers=headers("head")).status_code == 200  # logs "Patrol Ended" for b
+    assert revalidate(client, "/officer/logs", a.username, tag_a) == 304
+    assert revalidate(client, "/officer/logs", b.username, tag_b) == 200
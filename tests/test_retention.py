@@ -0,0 +1,133 @@
+"""
+Retention purge: expired logs and dismissed pings are archived and then
+deleted in batches; everything else is left alone.
+"""
+import dataclasses
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from fleet import count_commits
+from src.backend.app import database, models, seeding
+from src.backend.app.services import retention_service
+from src.backend.app.services.response_cache import GLOBAL_LOGS, ROSTER_ALL, log_topic, response_cache
+from src.backend.app.services.retention_service import RetentionPolicy, RetentionWorker
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+BATCH = 10
+
+
+@pytest.fixture
+def db():
+    seeding.clear_tables(database.engine)
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def worker(tmp_path):
+    return RetentionWorker(policies=[], archive_dir=str(tmp_path), batch_size=BATCH, interval=0, pause=0)
+
+
+def add_logs(db, ages_days):
+    """One log per age (days before NOW); returns their ids in the same order."""
+    rows = db.execute(insert(models.NotificationLog).returning(models.NotificationLog.id, models.NotificationLog.timestamp), [
+        {"level": "INFO", "message": f"log {i}", "timestamp": NOW - timedelta(days=age), "user_id": None} for i, age in enumerate(ages_days)
+    ]).all()
+    db.commit()
+    by_ts = {ts: i for i, ts in rows}
+    return [by_ts[NOW - timedelta(days=age)] for age in ages_days]
+
+
+def default_policy(model):
+    return next(p for p in retention_service.DEFAULT_POLICIES if p.model is model)
+
+
+def remaining_ids(db, model):
+    return set(db.execute(select(model.id)).scalars())
+
+
+def archived_ids(archive_dir, table):
+    """Ids of every row written to `table`'s archives, in file order."""
+    ids = []
+    for path in sorted(archive_dir.glob(f"{table}-*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            ids += [json.loads(line)["id"] for line in fh]
+    return ids
+
+
+def test_age_cutoff_removes_only_expired_rows(db, worker, tmp_path):
+    old = add_logs(db, [120 + i * 0.01 for i in range(15)])
+    fresh = add_logs(db, [10 + i * 0.01 for i in range(5)])
+    removed = worker.purge(db, RetentionPolicy(models.NotificationLog, 90, 0), NOW)
+    assert removed == len(old)
+    assert remaining_ids(db, models.NotificationLog) == set(fresh)
+    assert sorted(archived_ids(tmp_path, "notification_logs")) == sorted(old)
+
+
+def test_row_budget_keeps_the_newest_rows(db, worker, tmp_path):
+    ids = add_logs(db, [i * 0.01 for i in range(40)])  # ids[0] is the newest
+    removed = worker.purge(db, RetentionPolicy(models.NotificationLog, 0, 12), NOW)
+    assert removed == 28
+    assert remaining_ids(db, models.NotificationLog) == set(ids[:12])
+    assert sorted(archived_ids(tmp_path, "notification_logs")) == sorted(ids[12:])
+
+
+def test_batches_cover_every_row_once(db, worker, tmp_path):
+    expired = add_logs(db, [100 + i * 0.01 for i in range(int(2.5 * BATCH))])
+    with count_commits() as commits:
+        removed = worker.purge(db, RetentionPolicy(models.NotificationLog, 90, 0), NOW)
+    assert removed == len(expired)
+    assert len(commits) == 3  # 10 + 10 + 5, one short transaction each
+    archived = archived_ids(tmp_path, "notification_logs")
+    assert sorted(archived) == sorted(expired) and len(set(archived)) == len(archived)
+    assert remaining_ids(db, models.NotificationLog) == set()
+
+
+def test_archive_is_written_before_the_delete(db, worker, monkeypatch):
+    add_logs(db, [100 + i * 0.01 for i in range(25)])
+    write = worker._archive
+    still_present = []
+
+    def archive(policy, run_stamp, rows):
+        check = database.SessionLocal()
+        try:
+            ids = [r.id for r in rows]
+            still_present.append(check.scalar(select(func.count()).where(models.NotificationLog.id.in_(ids))) == len(ids))
+        finally:
+            check.close()
+        write(policy, run_stamp, rows)
+
+    monkeypatch.setattr(worker, "_archive", archive)
+    worker.purge(db, RetentionPolicy(models.NotificationLog, 90, 0), NOW)
+    assert still_present == [True, True, True]
+
+
+@pytest.mark.parametrize("budget", [dict(max_age_days=7, max_rows=0), dict(max_age_days=0, max_rows=1)])
+def test_active_pings_are_never_purged(db, worker, tmp_path, budget):
+    rows = [{"sender_id": 1, "receiver_id": 2, "message": "m", "lat": 15.5, "long": 73.8,
+             "timestamp": NOW - timedelta(days=30, minutes=i), "is_active": i % 2 == 0} for i in range(20)]
+    db.execute(insert(models.Ping), rows)
+    db.commit()
+    active = set(db.execute(select(models.Ping.id).where(models.Ping.is_active == True)).scalars())
+    policy = dataclasses.replace(default_policy(models.Ping), **budget)
+    removed = worker.purge(db, policy, NOW)
+    assert removed == (10 if budget["max_age_days"] else 9)  # the budget counts dismissed pings only
+    assert active <= remaining_ids(db, models.Ping)
+    assert not set(archived_ids(tmp_path, "pings")) & active
+
+
+def test_purge_invalidates_cached_log_responses(db, worker):
+    add_logs(db, [100, 101])
+    topics = (GLOBAL_LOGS, log_topic(42), ROSTER_ALL)
+    before = response_cache.version(topics)
+    worker.purge(db, dataclasses.replace(default_policy(models.NotificationLog), max_age_days=90, max_rows=0), NOW)
+    after = response_cache.version(topics)
+    assert after[0] > before[0] and after[1] > before[1]
+    assert after[2] == before[2]
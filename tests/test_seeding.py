@@ -0,0 +1,77 @@
+"""Roster seeding: per-user salted hashes unless shared on purpose, and deployment statuses as the geofence check sees them."""
+import pytest
+
+from fleet import STAFF
+from src.backend.app import auth, database, models, seeding
+from src.backend.app.services import geofencing_service
+
+FIX = (15.5, 73.8)
+
+
+@pytest.mark.parametrize("workers", [1, 2])  # inline, and through the process pool
+def test_equal_passwords_get_distinct_hashes(workers):
+    hashed = seeding.hash_passwords(["pass"] * seeding.HASH_POOL_THRESHOLD, workers=workers)
+    assert len(hashed) == seeding.HASH_POOL_THRESHOLD
+    assert len(set(hashed)) == len(hashed)
+    assert all(auth.verify_password("pass", h) for h in hashed)
+
+
+def test_shared_hashes_reuse_one_hash_per_password():
+    hashed = seeding.hash_passwords(["pass", "other", "pass", "pass"], share_hashes=True)
+    assert hashed[0] == hashed[2] == hashed[3] != hashed[1]
+    assert auth.verify_password("pass", hashed[0]) and auth.verify_password("other", hashed[1])
+
+
+def officer(name, status, **extra):
+    return {"username": name, "password": "pass", "supervisor": "sup_north", "status": status, "lat": FIX[0], "long": FIX[1], **extra}
+
+
+ROSTER = STAFF + [
+    officer("on_target", "safe"),
+    officer("drifted", "risk"),
+    officer("near_target", "free", target_lat=FIX[0] + 0.003, target_long=FIX[1], radius=500),  # ~330 m away
+    officer("far_target", "safe", target_lat=FIX[0], target_long=FIX[1] + 0.01, radius=500),     # ~1.07 km away
+    officer("idle", "free"),
+    officer("away", "on_leave"),
+]
+
+
+@pytest.fixture
+def db():
+    seeding.clear_tables(database.engine)
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_seed_roster_deploys_with_the_computed_status(db):
+    assert seeding.seed_roster(db, ROSTER) == {"users": len(ROSTER), "deployments": 4, "skipped": 0}
+    rows = db.query(models.User.username, models.Deployment).join(models.Deployment, models.Deployment.officer_id == models.User.id).all()
+    deployments = {name: d for name, d in rows}
+    assert set(deployments) == {"on_target", "drifted", "near_target", "far_target"}
+
+    ds = list(deployments.values())
+    inside, _ = geofencing_service.evaluate_geofences(
+        [d.current_lat for d in ds], [d.current_long for d in ds], [d.target_lat for d in ds], [d.target_long for d in ds],
+        [d.radius_meters for d in ds])
+    assert [d.status for d in ds] == ["deployed" if ok else "out_of_bounds" for ok in inside]
+    assert {n: d.status for n, d in deployments.items()} == {
+        "on_target": "deployed", "drifted": "out_of_bounds", "near_target": "deployed", "far_target": "out_of_bounds"}
+    assert all(d.is_active for d in ds)
+
+
+def test_seed_roster_sets_user_flags_and_skips_existing(db):
+    seeding.seed_roster(db, ROSTER, share_hashes=True)
+    away = db.query(models.User).filter(models.User.username == "away").one()
+    assert away.is_on_leave and away.last_known_lat is None
+    assert away.supervisor.username == "sup_north"
+    assert seeding.seed_roster(db, ROSTER + [officer("late", "free")]) == {"users": 1, "deployments": 0, "skipped": len(ROSTER)}
+
+
+def test_seed_roster_rejects_bad_rows(db):
+    with pytest.raises(ValueError, match="Unknown status"):
+        seeding.seed_roster(db, [officer("x", "asleep")])
+    with pytest.raises(ValueError, match="Unknown supervisor"):
+        seeding.seed_roster(db, [officer("x", "free")])
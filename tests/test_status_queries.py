@@ -0,0 +1,29 @@
+"""/status/all builds the roster from a constant number of queries, however many officers it covers."""
+import pytest
+
+from fleet import count_statements, headers, running_app, seed_fleet
+from src.backend.app.services.response_cache import response_cache
+
+SIZES = (50, 500)
+
+
+def roster_statements(viewer):
+    """(rows returned, statements issued) for a cold /status/all, per fleet size."""
+    results = []
+    for size in SIZES:
+        seed_fleet(size, seed=size)
+        with running_app() as client:
+            h = headers(viewer)
+            client.get("/status/all", headers=h)  # warm the principal cache
+            response_cache.clear()
+            with count_statements() as statements:  # before_cursor_execute on every engine
+                rows = client.get("/status/all", headers=h).json()
+        results.append((len(rows), len(statements)))
+    return results
+
+
+@pytest.mark.parametrize("viewer", ["head", "sup_north"])
+def test_query_count_is_independent_of_roster_size(viewer):
+    (small_rows, small_queries), (large_rows, large_queries) = roster_statements(viewer)
+    assert large_rows > small_rows * 5
+    assert small_queries == large_queries
@@ -0,0 +1,113 @@
+"""Track replay: Douglas-Peucker stays within its tolerance, and /track respects time bounds and command scope."""
+import math
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app import database, models
+from src.backend.app.services.track_service import douglas_peucker
+from src.backend.app.services.zone_service import METERS_PER_DEGREE_LAT
+
+T0 = datetime(2026, 4, 1, 6, 0, 0)
+
+
+def random_walk(n, seed=0, step_m=15):
+    rng = random.Random(seed)
+    lats, lons, heading = [15.5], [73.8], 0.0
+    for _ in range(n - 1):
+        heading += rng.gauss(0, 0.6)
+        lats.append(lats[-1] + step_m * math.cos(heading) / METERS_PER_DEGREE_LAT)
+        lons.append(lons[-1] + step_m * math.sin(heading) / (METERS_PER_DEGREE_LAT * math.cos(math.radians(15.5))))
+    return lats, lons
+
+
+def deviation(lats, lons, kept):
+    """Largest distance (m) from any original point to the simplified polyline segment spanning it."""
+    kx = METERS_PER_DEGREE_LAT * math.cos(math.radians(np.mean(lats)))
+    pts = [(lon * kx, lat * METERS_PER_DEGREE_LAT) for lat, lon in zip(lats, lons)]
+    worst = 0.0
+    for a, b in zip(kept, kept[1:]):
+        (ax, ay), (bx, by) = pts[a], pts[b]
+        seg = (bx - ax) ** 2 + (by - ay) ** 2
+        for px, py in pts[a + 1:b]:
+            t = 0.0 if seg == 0 else max(0.0, min(1.0, ((px - ax) * (bx - ax) + (py - ay) * (by - ay)) / seg))
+            worst = max(worst, math.hypot(px - (ax + t * (bx - ax)), py - (ay + t * (by - ay))))
+    return worst
+
+
+def test_zero_tolerance_keeps_every_point():
+    lats, lons = random_walk(200)
+    assert douglas_peucker(lats, lons, 0).tolist() == list(range(200))
+
+
+def test_straight_line_collapses_to_its_endpoints():
+    lats = [15.5 + i * 1e-4 for i in range(100)]
+    lons = [73.8 + i * 2e-4 for i in range(100)]
+    assert douglas_peucker(lats, lons, 1).tolist() == [0, 99]
+
+
+@pytest.mark.parametrize("tolerance", [2, 10, 50])
+def test_simplified_track_stays_within_tolerance(tolerance):
+    lats, lons = random_walk(2000, seed=tolerance)
+    kept = douglas_peucker(lats, lons, tolerance).tolist()
+    assert kept[0] == 0 and kept[-1] == 1999 and kept == sorted(set(kept))
+    assert len(kept) < 2000
+    assert deviation(lats, lons, kept) <= tolerance + 1e-6
+
+
+def test_loop_back_to_start_is_kept():
+    # Out and back: the endpoints coincide, so the turnaround must be measured to that point, not dropped as collinear
+    lats = [15.5, 15.501, 15.502, 15.501, 15.5]
+    lons = [73.8] * 5
+    assert 2 in douglas_peucker(lats, lons, 10).tolist()
+
+
+@pytest.fixture
+def client():
+    officers = seed_fleet(4)  # units 0 and 2 report to sup_north, 1 and 3 to sup_south
+    lats, lons = random_walk(60)
+    db = database.SessionLocal()
+    try:
+        db.execute(insert(models.PositionSample), [
+            {"officer_id": officers[0].id, "timestamp": T0 + timedelta(minutes=i), "lat": lat, "long": lon}
+            for i, (lat, lon) in enumerate(zip(lats, lons))
+        ])
+        db.commit()
+    finally:
+        db.close()
+    with running_app() as c:
+        c.officers = officers
+        yield c
+
+
+def track(client, officer_id, username="head", **params):
+    return client.get(f"/track/{officer_id}", params=params, headers=headers(username))
+
+
+def test_time_bounds_are_inclusive(client):
+    oid = client.officers[0].id
+    assert len(track(client, oid).json()["points"]) == 60
+    points = track(client, oid, **{"from": (T0 + timedelta(minutes=10)).isoformat(), "to": (T0 + timedelta(minutes=19)).isoformat()}).json()["points"]
+    stamps = [datetime.fromisoformat(p[0]) for p in points]
+    assert stamps == [T0 + timedelta(minutes=i) for i in range(10, 20)]
+
+
+def test_tolerance_thins_the_track(client):
+    oid = client.officers[0].id
+    points = track(client, oid, tolerance=25).json()["points"]
+    assert 2 <= len(points) < 60
+    assert points[0][0] == T0.isoformat() and points[-1][0] == (T0 + timedelta(minutes=59)).isoformat()
+
+
+def test_track_is_scoped_to_the_callers_command(client):
+    mine, peer, other_jurisdiction = client.officers[0], client.officers[2], client.officers[1]
+    assert track(client, mine.id, mine.username).status_code == 200
+    assert track(client, mine.id, peer.username).status_code == 403
+    assert track(client, mine.id, "sup_north").status_code == 200
+    assert track(client, mine.id, "sup_south").status_code == 403
+    assert track(client, other_jurisdiction.id, "sup_north").status_code == 403
+    assert track(client, 999_999).status_code == 404
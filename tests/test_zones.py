@@ -0,0 +1,89 @@
+"""Polygon geometry, the zone index, and bulk deployments only touching the in-memory indexes once committed."""
+import pytest
+from sqlalchemy import event
+
+from fleet import headers, running_app, seed_fleet
+from src.backend.app import database, main
+from src.backend.app.services.zone_service import IndexedZone, ZoneIndex, point_in_polygon, signed_distance_to_polygon
+
+# ~1.1 km square around (15.5, 73.8), as [lat, long] vertices
+SQUARE = [(15.495, 73.795), (15.495, 73.805), (15.505, 73.805), (15.505, 73.795)]
+CONCAVE = [(15.0, 73.0), (15.0, 73.3), (15.3, 73.3), (15.3, 73.2), (15.1, 73.2), (15.1, 73.0)]  # L shape
+
+
+@pytest.mark.parametrize("point, inside", [
+    ((15.5, 73.8), True),
+    ((15.51, 73.8), False),
+    ((15.5, 73.81), False),
+    ((15.05, 73.1), True),   # foot of the L
+    ((15.2, 73.1), False),   # the notch
+    ((15.2, 73.25), True),   # upright of the L
+])
+def test_point_in_polygon(point, inside):
+    polygon = CONCAVE if point[0] < 15.4 else SQUARE
+    assert point_in_polygon(*point, polygon) is inside
+
+
+def test_signed_distance_to_polygon():
+    # 0.001 deg of latitude is ~111 m; of longitude, ~107 m at this latitude
+    assert signed_distance_to_polygon(15.5, 73.8, SQUARE) == pytest.approx(-536, abs=2)  # nearest edge is east/west
+    assert signed_distance_to_polygon(15.506, 73.8, SQUARE) == pytest.approx(111, abs=2)
+    assert signed_distance_to_polygon(15.504, 73.8, SQUARE) == pytest.approx(-111, abs=2)
+    assert abs(signed_distance_to_polygon(15.505, 73.8, SQUARE)) < 0.01  # on an edge
+    assert abs(signed_distance_to_polygon(15.505, 73.805, SQUARE)) < 0.01  # on a vertex
+
+
+def test_zone_index_containing():
+    index = ZoneIndex(cell_deg=0.1)
+    index.add(IndexedZone(1, "square", "jurisdiction", SQUARE, supervisor_id=7))
+    index.add(IndexedZone(2, "L", "jurisdiction", CONCAVE))
+    index.add(IndexedZone(3, "patrol", "deployment", SQUARE))  # same shape, other kind
+    assert {z.id for z in index.containing(15.5, 73.8)} == {1, 3}
+    assert [z.id for z in index.containing(15.5, 73.8, "jurisdiction")] == [1]
+    assert [z.id for z in index.containing(15.2, 73.25, "jurisdiction")] == [2]  # spans several grid cells
+    assert index.containing(15.2, 73.1) == []
+    assert index.containing(15.51, 73.8) == []
+    index.remove(1)
+    assert [z.id for z in index.containing(15.5, 73.8)] == [3]
+    assert len(index) == 2
+
+
+@pytest.fixture
+def client():
+    seed_fleet(4)
+    with running_app() as c:
+        yield c
+
+
+def deploy(client, officer_ids, polygon=None):
+    body = {"officer_ids": officer_ids, "latitude": 15.5, "longitude": 73.8, "radius": 300, "polygon": polygon}
+    return client.post("/deploy/bulk", json=body, headers=headers("head"))
+
+
+def test_failed_bulk_deploy_leaves_in_memory_state_alone(client):
+    ids = [u["id"] for u in client.get("/status/all", headers=headers("head")).json() if u["username"].startswith("unit_")]
+    assert deploy(client, ids[:2]).status_code == 200
+    before = {oid: main.geofence_engine.get(oid) for oid in ids}
+    zones_before = {z.id for z in main.zone_index.zones()}
+
+    def fail(session):
+        raise RuntimeError("commit refused")
+
+    event.listen(database.SessionLocal, "before_commit", fail)
+    try:
+        with pytest.raises(RuntimeError):
+            deploy(client, ids, [list(p) for p in SQUARE])
+    finally:
+        event.remove(database.SessionLocal, "before_commit", fail)
+    assert {oid: main.geofence_engine.get(oid) for oid in ids} == before
+    assert {z.id for z in main.zone_index.zones()} == zones_before
+
+    assert deploy(client, ids, [list(p) for p in SQUARE]).status_code == 200
+    states = [main.geofence_engine.get(oid) for oid in ids]
+    assert all(s is not None and s.polygon for s in states)
+    assert len({z.id for z in main.zone_index.zones("deployment")}) == 1
+    # Ending every deployment retires the polygon from the index as well
+    for oid in ids:
+        assert client.post(f"/deploy/stop/{oid}", headers=headers("head")).status_code == 200
+    assert all(main.geofence_engine.get(oid) is None for oid in ids)
+    assert main.zone_index.zones("deployment") == []